@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Benchmark: per-file ``git show`` subprocesses vs one GitObjectReader.
+
+Reads every file at a revision (default HEAD) both ways and reports the
+wall time of each.
+
+Usage:
+    python benchmarks/bench_git_objects.py [--rev HEAD] [--limit 500] [--repo .]
+"""
+
+import argparse
+import subprocess
+import time
+from pathlib import Path
+
+from code_review_pack.gitobjects import GitObjectReader
+
+
+def list_files(repo: Path, rev: str, limit: int) -> list[str]:
+    result = subprocess.run(
+        ["git", "ls-tree", "-r", "--name-only", rev],
+        cwd=repo,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.splitlines()[:limit]
+
+
+def read_with_subprocess(repo: Path, rev: str, files: list[str]) -> int:
+    total = 0
+    for path in files:
+        result = subprocess.run(
+            ["git", "show", f"{rev}:{path}"], cwd=repo, capture_output=True, check=True
+        )
+        total += len(result.stdout)
+    return total
+
+
+def read_with_batch(repo: Path, rev: str, files: list[str]) -> int:
+    total = 0
+    with GitObjectReader(repo) as reader:
+        for path in files:
+            total += len(reader.read(f"{rev}:{path}"))
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repo", type=Path, default=Path("."))
+    parser.add_argument("--rev", default="HEAD")
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    files = list_files(args.repo, args.rev, args.limit)
+    print(f"Reading {len(files)} files at {args.rev}, best of {args.repeat}\n")
+
+    results = {}
+    for name, reader in (
+        ("subprocess per file", read_with_subprocess),
+        ("cat-file --batch", read_with_batch),
+    ):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            size = reader(args.repo, args.rev, files)
+            best = min(best, time.perf_counter() - start)
+        results[name] = best
+        print(f"{name:>20}: {best * 1000:8.1f} ms  ({size:,} bytes)")
+
+    speedup = results["subprocess per file"] / results["cat-file --batch"]
+    print(f"\n{'speedup':>20}: {speedup:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,28 @@ import subprocess
 import sys
 import urllib.error
 import urllib.request
-
-from anthropic import Anthropic
+from pathlib import Path
+
+import yaml
+
+try:
+    from code_review_pack import ledger
+    from code_review_pack.backends import ReviewSettings, get_backend
+    from code_review_pack.classify import FilterRules, classify_diff
+    from code_review_pack.clustering import ClusterSettings, cluster_diff
+    from code_review_pack.gitobjects import GitObjectReader
+except ImportError:
+    # Installed by `code-review-pack init` next to this script
+    import ledger
+    from backends import ReviewSettings, get_backend
+    from classify import FilterRules, classify_diff
+    from clustering import ClusterSettings, cluster_diff
+    from gitobjects import GitObjectReader
 
 # Maximum diff size to send to the API (characters)
 # Note: Intentionally duplicated from reviewer.py since this script runs standalone in GitHub Actions
 MAX_DIFF_SIZE = 100_000
 
-# Timeout for API calls (seconds)
-API_TIMEOUT = 120.0
-
 
 def get_diff() -> str:
     """Get the diff for the PR."""
@@ -46,6 +58,25 @@ def get_changed_files() -> list[str]:
     return [f for f in result.stdout.strip().split("\n") if f]
 
 
+def find_pack_config() -> Path | None:
+    """Find pack.yaml: copied next to this script by init, or the pack root in-repo."""
+    script_dir = Path(__file__).resolve().parent
+    for candidate in (script_dir / "pack.yaml", script_dir.parents[1] / "pack.yaml"):
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def load_pack_config() -> dict:
+    """Load the ``pack`` block of pack.yaml, or an empty dict if there is none."""
+    pack_yaml = find_pack_config()
+    if pack_yaml is None:
+        return {}
+    with open(pack_yaml, encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    return config.get("pack", {})
+
+
 def build_review_prompt(diff: str, files: list[str]) -> str:
     """Build the review prompt."""
     files_list = "\n".join(f"- {f}" for f in files)
@@ -115,35 +146,84 @@ For each finding, use this format:
 
 def run_review() -> None:
     """Run the AI code review."""
-    client = Anthropic()
-
-    diff = get_diff()
-    files = get_changed_files()
+    pack = load_pack_config()
+    settings = ReviewSettings.from_config(pack.get("review_settings"))
+    record = ledger.ReviewRecord(
+        source="action",
+        repo=os.environ.get("GITHUB_REPOSITORY"),
+        pack=pack.get("name"),
+        pack_version=str(pack.get("version", "")) or None,
+        model=settings.model,
+    )
+    try:
+        review_pr(pack, settings, record)
+    except SystemExit:
+        # post_pr_comment exits on GitHub API failures
+        record.outcome = "error:publish"
+        raise
+    except Exception as e:
+        record.outcome = f"error:{type(e).__name__}"
+        raise
+    finally:
+        ledger.append(record)
+
+
+def review_pr(pack: dict, settings: "ReviewSettings", record: "ledger.ReviewRecord") -> None:
+    """Review the PR diff, filling in ``record`` as it goes."""
+    backend = get_backend(settings)
+
+    with record.phase("diff"):
+        diff = get_diff()
+        files = get_changed_files()
 
     if not diff.strip():
         print("No changes to review")
+        record.outcome = "empty"
         return
 
+    with record.phase("filter"), GitObjectReader() as objects:
+        classified = classify_diff(
+            diff,
+            FilterRules.from_config(pack.get("diff_filter")),
+            # The checkout is the PR head, the end of the diff
+            objects.head_reader("HEAD"),
+        )
+    print(classified.report())
+
+    with record.phase("cluster"):
+        clustered = cluster_diff(
+            classified.diff, ClusterSettings.from_config(pack.get("hunk_clustering"))
+        )
+    print(clustered.report())
+    diff = clustered.diff
+    record.diff_size = len(diff)
+
     if len(diff) > MAX_DIFF_SIZE:
         print(f"Diff too large ({len(diff):,} characters, max {MAX_DIFF_SIZE:,}). Skipping AI review.")
         print("Consider breaking the PR into smaller changes.")
+        record.outcome = "too_large"
         return
 
     prompt = build_review_prompt(diff, files)
 
-    message = client.messages.create(
-        model="claude-opus-4-5-20250514",
-        max_tokens=8192,
-        messages=[{"role": "user", "content": prompt}],
-        timeout=API_TIMEOUT,
-    )
+    with record.phase("model"):
+        completion = backend.complete(prompt)
+
+    record.model = completion.model
+    record.tokens_in = completion.tokens_in
+    record.tokens_out = completion.tokens_out
+    record.tokens_cached = completion.tokens_cached
+    record.retries = completion.retries
 
-    review = message.content[0].text
+    review = completion.text
+    if clustered.clusters:
+        review = f"{review}\n\n{clustered.report_section()}"
 
     # Post as PR comment
     pr_number = os.environ.get("PR_NUMBER")
     if pr_number:
-        post_pr_comment(review, pr_number)
+        with record.phase("publish"):
+            post_pr_comment(review, pr_number)
     else:
         print(review)
 
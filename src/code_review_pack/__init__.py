@@ -1,12 +1,19 @@
 """Code Review Pack - AI-tool-agnostic code review frameworks."""
 
+from code_review_pack.classify import ClassifiedDiff, FilterRules, classify_diff
+from code_review_pack.gitobjects import GitObjectReader
 from code_review_pack.reviewer import (
     GitError,
+    ReviewSession,
     review_code,
+    review_code_async,
     get_staged_diff,
+    get_staged_diff_async,
     get_working_diff,
+    get_working_diff_async,
     load_overlay,
     load_checklists,
+    load_filter_rules,
 )
 
 __version__ = "0.0.1"
@@ -14,9 +21,18 @@ __version__ = "0.0.1"
 __all__ = [
     "__version__",
     "GitError",
+    "ReviewSession",
     "review_code",
+    "review_code_async",
     "get_staged_diff",
+    "get_staged_diff_async",
     "get_working_diff",
+    "get_working_diff_async",
     "load_overlay",
     "load_checklists",
+    "load_filter_rules",
+    "ClassifiedDiff",
+    "FilterRules",
+    "classify_diff",
+    "GitObjectReader",
 ]
@@ -0,0 +1,434 @@
+"""Model backends selected from a pack's ``review_settings``.
+
+Two providers are supported:
+
+- ``anthropic``: the hosted Claude API (needs the ``anthropic`` package).
+- ``openai-compatible``: any server exposing ``POST /v1/chat/completions``,
+  such as a llama.cpp or vLLM server on the build host.
+
+Every backend returns a Completion with usage and timing in the same shape.
+Each provider also has an async backend for services running on asyncio;
+the async ``openai-compatible`` backend keeps a pool of keep-alive
+connections in an ``httpx.AsyncClient``.
+
+Standard library only at import time; see ACTION_SUPPORT_MODULES in cli.py.
+"""
+
+import asyncio
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+import weakref
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, fields
+from typing import Any, Protocol, TypeVar
+
+ANTHROPIC = "anthropic"
+OPENAI_COMPATIBLE = "openai-compatible"
+PROVIDERS = (ANTHROPIC, OPENAI_COMPATIBLE)
+
+DEFAULT_MODEL = "claude-opus-4-5-20250514"
+DEFAULT_MAX_TOKENS = 8192
+
+# Timeout for API calls (seconds)
+API_TIMEOUT = 120.0
+
+# Retries for transient API failures, with exponential backoff (seconds)
+MAX_RETRIES = 2
+RETRY_BACKOFF = 1.0
+
+# Keep-alive connections per async openai-compatible backend
+MAX_CONNECTIONS = 10
+
+# Environment variables overriding review_settings, e.g. to point CI at a local server
+SETTINGS_ENV = {
+    "ai_provider": "CODE_REVIEW_PACK_PROVIDER",
+    "model": "CODE_REVIEW_PACK_MODEL",
+    "base_url": "CODE_REVIEW_PACK_BASE_URL",
+}
+
+T = TypeVar("T")
+
+
+class BackendError(Exception):
+    """Raised when a model backend request fails."""
+
+    pass
+
+
+@dataclass
+class ReviewSettings:
+    """The ``review_settings`` block of pack.yaml.
+
+    Attributes:
+        ai_provider: One of PROVIDERS.
+        model: Model id sent to the provider.
+        max_tokens: Maximum output tokens.
+        temperature: Sampling temperature, or None for the provider default.
+        base_url: Server URL for ``openai-compatible``, e.g. ``http://localhost:8080/v1``.
+        api_key_env: Environment variable holding the ``openai-compatible`` API key.
+        timeout: Request timeout in seconds.
+    """
+
+    ai_provider: str = ANTHROPIC
+    model: str = DEFAULT_MODEL
+    max_tokens: int = DEFAULT_MAX_TOKENS
+    temperature: float | None = None
+    base_url: str | None = None
+    api_key_env: str | None = None
+    timeout: float = API_TIMEOUT
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any] | None) -> "ReviewSettings":
+        """Build settings from pack.yaml, applying environment overrides.
+
+        Raises:
+            ValueError: If the provider is unknown or required settings are missing.
+        """
+        config = dict(config or {})
+        for key, env in SETTINGS_ENV.items():
+            if os.environ.get(env):
+                config[key] = os.environ[env]
+        known = {f.name for f in fields(cls)}
+        settings = cls(**{k: v for k, v in config.items() if k in known})
+        if settings.ai_provider not in PROVIDERS:
+            raise ValueError(
+                f"Unknown ai_provider: {settings.ai_provider}. "
+                f"Supported providers: {', '.join(PROVIDERS)}"
+            )
+        if settings.ai_provider == OPENAI_COMPATIBLE and not settings.base_url:
+            raise ValueError(
+                f"ai_provider {OPENAI_COMPATIBLE} requires base_url "
+                f"(or {SETTINGS_ENV['base_url']})"
+            )
+        return settings
+
+
+@dataclass
+class Completion:
+    """A model response with usage and timing, common to all backends."""
+
+    text: str
+    model: str
+    tokens_in: int = 0
+    tokens_out: int = 0
+    tokens_cached: int = 0
+    retries: int = 0
+    latency_ms: float = 0.0
+
+
+class ReviewBackend(Protocol):
+    """A model that turns a prompt into a Completion."""
+
+    settings: ReviewSettings
+
+    def complete(self, prompt: str) -> Completion: ...
+
+
+class AsyncReviewBackend(Protocol):
+    """A model that turns a prompt into a Completion without blocking the event loop."""
+
+    settings: ReviewSettings
+
+    async def complete(self, prompt: str) -> Completion: ...
+
+
+def with_retries(
+    request: Callable[[], T],
+    retryable: Callable[[Exception], bool],
+    max_retries: int = MAX_RETRIES,
+) -> tuple[T, int]:
+    """Call ``request``, retrying transient failures. Returns (result, retries)."""
+    for attempt in range(max_retries + 1):
+        try:
+            return request(), attempt
+        except Exception as e:
+            if attempt == max_retries or not retryable(e):
+                raise
+            time.sleep(RETRY_BACKOFF * 2**attempt)
+    raise AssertionError("unreachable")
+
+
+async def async_with_retries(
+    request: Callable[[], Awaitable[T]],
+    retryable: Callable[[Exception], bool],
+    max_retries: int = MAX_RETRIES,
+) -> tuple[T, int]:
+    """Await ``request()``, retrying transient failures. Returns (result, retries)."""
+    for attempt in range(max_retries + 1):
+        try:
+            return await request(), attempt
+        except Exception as e:
+            if attempt == max_retries or not retryable(e):
+                raise
+            await asyncio.sleep(RETRY_BACKOFF * 2**attempt)
+    raise AssertionError("unreachable")
+
+
+def _anthropic_retryable(error: Exception) -> bool:
+    from anthropic import APIConnectionError, InternalServerError, RateLimitError
+
+    return isinstance(error, APIConnectionError | InternalServerError | RateLimitError)
+
+
+def _anthropic_request(settings: ReviewSettings, prompt: str) -> dict[str, Any]:
+    kwargs: dict[str, Any] = {
+        "model": settings.model,
+        "max_tokens": settings.max_tokens,
+        "messages": [{"role": "user", "content": prompt}],
+        "timeout": settings.timeout,
+    }
+    if settings.temperature is not None:
+        kwargs["temperature"] = settings.temperature
+    return kwargs
+
+
+def _anthropic_completion(
+    settings: ReviewSettings, message: Any, retries: int, latency_ms: float
+) -> Completion:
+    usage = message.usage
+    return Completion(
+        text=message.content[0].text,
+        model=settings.model,
+        tokens_in=usage.input_tokens,
+        tokens_out=usage.output_tokens,
+        tokens_cached=getattr(usage, "cache_read_input_tokens", None) or 0,
+        retries=retries,
+        latency_ms=latency_ms,
+    )
+
+
+class AnthropicBackend:
+    """Hosted Claude API.
+
+    Args:
+        settings: Review settings.
+        client: An ``anthropic.Anthropic`` client. Created if not given; it
+            should have ``max_retries=0`` so retries are counted here.
+    """
+
+    def __init__(self, settings: ReviewSettings, client: Any = None) -> None:
+        self.settings = settings
+        if client is None:
+            from anthropic import Anthropic
+
+            client = Anthropic(max_retries=0)
+        self.client = client
+
+    def complete(self, prompt: str) -> Completion:
+        kwargs = _anthropic_request(self.settings, prompt)
+        start = time.perf_counter()
+        message, retries = with_retries(
+            lambda: self.client.messages.create(**kwargs), _anthropic_retryable
+        )
+        latency_ms = (time.perf_counter() - start) * 1000
+        return _anthropic_completion(self.settings, message, retries, latency_ms)
+
+    def close(self) -> None:
+        """Close the client's HTTP connections."""
+        self.client.close()
+
+
+class AsyncAnthropicBackend:
+    """Hosted Claude API through ``anthropic.AsyncAnthropic``.
+
+    The client keeps a connection pool, so one backend should be shared by
+    concurrent reviews.
+
+    Args:
+        settings: Review settings.
+        client: An ``anthropic.AsyncAnthropic`` client. Created if not given;
+            it should have ``max_retries=0`` so retries are counted here.
+    """
+
+    def __init__(self, settings: ReviewSettings, client: Any = None) -> None:
+        self.settings = settings
+        if client is None:
+            from anthropic import AsyncAnthropic
+
+            client = AsyncAnthropic(max_retries=0)
+        self.client = client
+
+    async def complete(self, prompt: str) -> Completion:
+        kwargs = _anthropic_request(self.settings, prompt)
+        start = time.perf_counter()
+        message, retries = await async_with_retries(
+            lambda: self.client.messages.create(**kwargs), _anthropic_retryable
+        )
+        latency_ms = (time.perf_counter() - start) * 1000
+        return _anthropic_completion(self.settings, message, retries, latency_ms)
+
+    async def aclose(self) -> None:
+        """Close the client's HTTP connections."""
+        await self.client.close()
+
+
+def _chat_request(settings: ReviewSettings, prompt: str) -> tuple[bytes, dict[str, str]]:
+    payload: dict[str, Any] = {
+        "model": settings.model,
+        "max_tokens": settings.max_tokens,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    if settings.temperature is not None:
+        payload["temperature"] = settings.temperature
+    headers = {"Content-Type": "application/json"}
+    if settings.api_key_env and os.environ.get(settings.api_key_env):
+        headers["Authorization"] = f"Bearer {os.environ[settings.api_key_env]}"
+    return json.dumps(payload).encode(), headers
+
+
+def _chat_completion(
+    settings: ReviewSettings, url: str, data: Any, retries: int, latency_ms: float
+) -> Completion:
+    try:
+        text = data["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError) as e:
+        raise BackendError(f"Unexpected response from {url}: {data!r:.200}") from e
+    usage = data.get("usage") or {}
+    details = usage.get("prompt_tokens_details") or {}
+    return Completion(
+        text=text,
+        model=data.get("model") or settings.model,
+        tokens_in=usage.get("prompt_tokens", 0),
+        tokens_out=usage.get("completion_tokens", 0),
+        tokens_cached=details.get("cached_tokens", 0),
+        retries=retries,
+        latency_ms=latency_ms,
+    )
+
+
+class OpenAICompatibleBackend:
+    """A local or self-hosted server speaking the OpenAI chat completions API."""
+
+    def __init__(self, settings: ReviewSettings) -> None:
+        self.settings = settings
+        self.url = f"{(settings.base_url or '').rstrip('/')}/chat/completions"
+
+    @staticmethod
+    def _retryable(error: Exception) -> bool:
+        if isinstance(error, urllib.error.HTTPError):
+            return error.code == 429 or error.code >= 500
+        return isinstance(error, urllib.error.URLError | TimeoutError | ConnectionError)
+
+    def _post(self, body: bytes, headers: dict[str, str]) -> dict[str, Any]:
+        req = urllib.request.Request(self.url, data=body, headers=headers, method="POST")
+        with urllib.request.urlopen(req, timeout=self.settings.timeout) as response:
+            return json.load(response)
+
+    def complete(self, prompt: str) -> Completion:
+        body, headers = _chat_request(self.settings, prompt)
+        start = time.perf_counter()
+        try:
+            data, retries = with_retries(lambda: self._post(body, headers), self._retryable)
+        except urllib.error.HTTPError as e:
+            raise BackendError(f"{self.url} returned {e.code} {e.reason}") from e
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise BackendError(f"Could not reach {self.url}: {e}") from e
+        latency_ms = (time.perf_counter() - start) * 1000
+        return _chat_completion(self.settings, self.url, data, retries, latency_ms)
+
+
+class AsyncOpenAICompatibleBackend:
+    """The OpenAI chat completions API over ``httpx.AsyncClient`` keep-alive connections.
+
+    Connections belong to the event loop that opened them, so the backend
+    keeps one client per loop; it can be shared by concurrent reviews and
+    reused by later ``asyncio.run`` calls. Proxies are taken from the
+    environment (``HTTPS_PROXY`` and friends).
+
+    Args:
+        settings: Review settings.
+        client: An ``httpx.AsyncClient`` to use instead of building one per
+            loop; it belongs to the caller, who closes it.
+        max_connections: Connections per loop when building clients.
+    """
+
+    def __init__(
+        self, settings: ReviewSettings, client: Any = None, max_connections: int = MAX_CONNECTIONS
+    ) -> None:
+        self.settings = settings
+        self.url = f"{(settings.base_url or '').rstrip('/')}/chat/completions"
+        self.max_connections = max_connections
+        self._client = client
+        self._clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def client(self) -> Any:
+        """The ``httpx.AsyncClient`` for the running event loop."""
+        if self._client is not None:
+            return self._client
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            import httpx
+
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            )
+            client = httpx.AsyncClient(timeout=self.settings.timeout, limits=limits)
+            self._clients[loop] = client
+        return client
+
+    @staticmethod
+    def _retryable(error: Exception) -> bool:
+        import httpx
+
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code == 429 or error.response.status_code >= 500
+        # Includes a kept-alive connection the server closed under us
+        return isinstance(error, httpx.TransportError)
+
+    async def _post(self, body: bytes, headers: dict[str, str]) -> Any:
+        response = await self.client.post(self.url, content=body, headers=headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def complete(self, prompt: str) -> Completion:
+        import httpx
+
+        body, headers = _chat_request(self.settings, prompt)
+        start = time.perf_counter()
+        try:
+            data, retries = await async_with_retries(
+                lambda: self._post(body, headers), self._retryable
+            )
+        except httpx.HTTPStatusError as e:
+            response = e.response
+            raise BackendError(
+                f"{self.url} returned {response.status_code} {response.reason_phrase}"
+            ) from e
+        except httpx.TransportError as e:
+            raise BackendError(f"Could not reach {self.url}: {e}") from e
+        latency_ms = (time.perf_counter() - start) * 1000
+        return _chat_completion(self.settings, self.url, data, retries, latency_ms)
+
+    async def aclose(self) -> None:
+        """Close the client this backend built for the running loop.
+
+        Clients of loops that have already been closed can no longer be
+        closed cleanly and are dropped.
+        """
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        for loop in [loop for loop in self._clients if loop.is_closed()]:
+            del self._clients[loop]
+        if client is not None:
+            await client.aclose()
+
+
+def get_backend(settings: ReviewSettings, anthropic_client: Any = None) -> ReviewBackend:
+    """Build the backend named by ``settings.ai_provider``."""
+    if settings.ai_provider == OPENAI_COMPATIBLE:
+        return OpenAICompatibleBackend(settings)
+    return AnthropicBackend(settings, client=anthropic_client)
+
+
+def get_async_backend(settings: ReviewSettings, anthropic_client: Any = None) -> AsyncReviewBackend:
+    """Build the async backend named by ``settings.ai_provider``."""
+    if settings.ai_provider == OPENAI_COMPATIBLE:
+        return AsyncOpenAICompatibleBackend(settings)
+    return AsyncAnthropicBackend(settings, client=anthropic_client)
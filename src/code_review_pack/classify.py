@@ -0,0 +1,369 @@
+"""Diff classification: summarize files that are not worth sending for review.
+
+Lockfiles, generated code, vendored trees, binaries, pure renames and
+whitespace-only hunks are replaced with one-line summaries before the
+prompt is assembled, so they no longer eat into MAX_DIFF_SIZE.
+
+Standard library only; see ACTION_SUPPORT_MODULES in cli.py.
+"""
+
+import re
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from pathlib import PurePosixPath
+from typing import Any
+
+# Rough characters-per-token ratio used for reporting (~100k chars ≈ 25k tokens)
+CHARS_PER_TOKEN = 4
+
+LOCKFILE = "lockfile"
+GENERATED = "generated"
+VENDORED = "vendored"
+BINARY = "binary"
+RENAME = "rename"
+WHITESPACE = "whitespace"
+IGNORED = "ignored"
+
+CATEGORIES = (LOCKFILE, GENERATED, VENDORED, BINARY, RENAME, WHITESPACE)
+
+LOCKFILE_NAMES = frozenset(
+    {
+        "uv.lock",
+        "poetry.lock",
+        "pdm.lock",
+        "Pipfile.lock",
+        "package-lock.json",
+        "npm-shrinkwrap.json",
+        "yarn.lock",
+        "pnpm-lock.yaml",
+        "bun.lockb",
+        "Cargo.lock",
+        "Gemfile.lock",
+        "composer.lock",
+        "go.sum",
+        "packages.lock.json",
+        ".terraform.lock.hcl",
+    }
+)
+
+GENERATED_PATTERNS = (
+    "*_pb2.py",
+    "*_pb2.pyi",
+    "*_pb2_grpc.py",
+    "*.min.js",
+    "*.min.css",
+    "*.js.map",
+    "*.css.map",
+    "*.generated.*",
+)
+
+# Comment lines at the top of a file that flag it as generated: ``@generated``,
+# or a generator's notice such as ``Code generated by X. DO NOT EDIT.``
+GENERATED_MARKER = re.compile(
+    r"^\s*(?:#|//|/\*|\*|--|;|<!--)[^\n]*(?:@generated\b|\b[Gg]enerated\b.*\bDO NOT EDIT\b)"
+)
+_COMMENT = re.compile(r"^\s*(?:#|//|/\*|\*|--|;|<!--)")
+GENERATED_MARKER_LINES = 5
+
+# Files where leading indentation is syntax, so re-indenting is never whitespace-only
+INDENT_SENSITIVE_SUFFIXES = frozenset({".py", ".pyi", ".pyx", ".yaml", ".yml"})
+INDENT_SENSITIVE_NAMES = frozenset({"Makefile", "GNUmakefile"})
+
+VENDORED_DIRS = frozenset(
+    {"vendor", "vendored", "third_party", "third-party", "node_modules", "site-packages"}
+)
+
+# Prefix of the one-line summaries that replace omitted content in a diff
+SUMMARY_PREFIX = "# [code-review-pack]"
+
+_DIFF_HEADER = re.compile(r"^diff --git a/(.*) b/(.*)$")
+_HUNK_HEADER = re.compile(r"^@@ ")
+_TOP_OF_FILE = re.compile(r"^@@ -\d+(?:,\d+)? \+1[, ]")
+# A quoted string (kept verbatim) or a run of blanks (collapsed to one space)
+_STRING_OR_BLANKS = re.compile(r"""(["'`])(?:\\.|(?!\1).)*\1?|[ \t]+""")
+
+
+@dataclass
+class FilterRules:
+    """Per-pack configuration for diff classification.
+
+    Attributes:
+        ignore: Extra glob patterns whose files are always summarized.
+        include: Glob patterns that are always reviewed, overriding detection.
+        categories: Built-in categories that are summarized.
+    """
+
+    ignore: list[str] = field(default_factory=list)
+    include: list[str] = field(default_factory=list)
+    categories: tuple[str, ...] = CATEGORIES
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any] | None) -> "FilterRules":
+        """Build rules from the ``diff_filter`` block of pack.yaml.
+
+        Raises:
+            ValueError: If an unknown category is listed.
+        """
+        config = config or {}
+        categories = tuple(config.get("categories", CATEGORIES))
+        unknown = set(categories) - set(CATEGORIES)
+        if unknown:
+            raise ValueError(
+                f"Unknown diff_filter categories: {', '.join(sorted(unknown))}. "
+                f"Valid categories are: {', '.join(CATEGORIES)}"
+            )
+        return cls(
+            ignore=list(config.get("ignore", [])),
+            include=list(config.get("include", [])),
+            categories=categories,
+        )
+
+
+@dataclass
+class FileSummary:
+    """A file (or part of one) that was replaced by a one-line summary."""
+
+    path: str
+    category: str
+    bytes_avoided: int
+
+    @property
+    def tokens_avoided(self) -> int:
+        return self.bytes_avoided // CHARS_PER_TOKEN
+
+
+@dataclass
+class ClassifiedDiff:
+    """Result of classifying a diff.
+
+    Attributes:
+        diff: The diff to review, with summarized files replaced by one line each.
+        summaries: Files and hunks that were summarized.
+        original_size: Size of the input diff in characters.
+    """
+
+    diff: str
+    summaries: list[FileSummary]
+    original_size: int
+
+    @property
+    def bytes_avoided(self) -> int:
+        return sum(s.bytes_avoided for s in self.summaries)
+
+    @property
+    def tokens_avoided(self) -> int:
+        return self.bytes_avoided // CHARS_PER_TOKEN
+
+    def report(self) -> str:
+        """One-line description of what was filtered, for logs."""
+        if not self.summaries:
+            return "Diff filter: nothing filtered"
+        counts: dict[str, int] = {}
+        for summary in self.summaries:
+            counts[summary.category] = counts.get(summary.category, 0) + 1
+        breakdown = ", ".join(f"{n} {category}" for category, n in sorted(counts.items()))
+        return (
+            f"Diff filter: summarized {breakdown}; "
+            f"avoided {self.bytes_avoided:,} bytes (~{self.tokens_avoided:,} tokens)"
+        )
+
+
+def split_file_diffs(diff: str) -> list[str]:
+    """Split a unified git diff into one chunk per file.
+
+    Any text before the first ``diff --git`` header is kept as its own chunk.
+    """
+    chunks: list[str] = []
+    current: list[str] = []
+    for line in diff.splitlines(keepends=True):
+        if line.startswith("diff --git ") and current:
+            chunks.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def file_path(chunk: str) -> str | None:
+    """Return the post-image path of a per-file diff chunk."""
+    first_line = chunk.split("\n", 1)[0]
+    match = _DIFF_HEADER.match(first_line)
+    if not match:
+        return None
+    return match.group(2)
+
+
+def split_hunks(chunk: str) -> tuple[str, list[str]]:
+    """Split a per-file chunk into its header and hunks."""
+    header: list[str] = []
+    hunks: list[list[str]] = []
+    for line in chunk.splitlines(keepends=True):
+        if _HUNK_HEADER.match(line):
+            hunks.append([line])
+        elif hunks:
+            hunks[-1].append(line)
+        else:
+            header.append(line)
+    return "".join(header), ["".join(h) for h in hunks]
+
+
+def _normalize_line(line: str, keep_indent: bool) -> str:
+    """Drop trailing whitespace and collapse blank runs outside string literals."""
+    body = line.rstrip()
+    code = body.lstrip()
+    indent = body[: len(body) - len(code)] if keep_indent else ""
+    return indent + _STRING_OR_BLANKS.sub(
+        lambda m: m.group(0) if m.group(1) else " ", code
+    )
+
+
+def _is_whitespace_only(hunk: str, path: str = "") -> bool:
+    """True if removed and added lines differ only in insignificant whitespace.
+
+    Trailing whitespace, blank lines and the width of blank runs inside a
+    line are insignificant. Blanks inside string literals always count, and
+    so does leading indentation in indentation-sensitive files.
+    """
+    posix = PurePosixPath(path)
+    keep_indent = (
+        posix.suffix in INDENT_SENSITIVE_SUFFIXES or posix.name in INDENT_SENSITIVE_NAMES
+    )
+    removed: list[str] = []
+    added: list[str] = []
+    for line in hunk.splitlines()[1:]:
+        if line.startswith("-"):
+            removed.append(line[1:])
+        elif line.startswith("+"):
+            added.append(line[1:])
+    if not removed and not added:
+        return False
+
+    def normalized(lines: list[str]) -> list[str]:
+        return [n for n in (_normalize_line(line, keep_indent) for line in lines) if n]
+
+    return normalized(removed) == normalized(added)
+
+
+def _has_marker(lines: list[str]) -> bool:
+    """True if the file's leading comment block carries a generated-code marker.
+
+    Only comment lines before the first line of code are checked, so a
+    docstring or string that mentions generated code does not count.
+    """
+    for line in lines[:GENERATED_MARKER_LINES]:
+        if not line.strip():
+            continue
+        if not _COMMENT.match(line):
+            return False
+        if GENERATED_MARKER.match(line):
+            return True
+    return False
+
+
+def _has_generated_marker(
+    path: str, hunks: list[str], read_head: Callable[[str], str | None] | None = None
+) -> bool:
+    """True if the top of the post-image file carries a generated-code marker.
+
+    The diff shows the top of the file only if the first hunk starts at line
+    1; otherwise ``read_head`` is asked for it, if given.
+    """
+    if hunks and _TOP_OF_FILE.match(hunks[0]):
+        lines = [line[1:] for line in hunks[0].splitlines()[1:] if line.startswith(("+", " "))]
+        return _has_marker(lines)
+    head = read_head(path) if read_head and hunks else None
+    return head is not None and _has_marker(head.splitlines())
+
+
+def classify_file(
+    path: str,
+    header: str,
+    hunks: list[str],
+    read_head: Callable[[str], str | None] | None = None,
+) -> str | None:
+    """Return the category of a whole-file change, or None if it should be reviewed."""
+    posix = PurePosixPath(path)
+    if posix.name in LOCKFILE_NAMES:
+        return LOCKFILE
+    if any(part in VENDORED_DIRS for part in posix.parts[:-1]):
+        return VENDORED
+    if "Binary files " in header or "GIT binary patch" in header:
+        return BINARY
+    if not hunks and "rename from " in header:
+        return RENAME
+    if any(fnmatch(posix.name, pattern) for pattern in GENERATED_PATTERNS):
+        return GENERATED
+    if _has_generated_marker(path, hunks, read_head):
+        return GENERATED
+    return None
+
+
+def _summary_line(path: str, category: str, size: int, hunks: int | None = None) -> str:
+    what = f"{hunks} {category}-only hunk(s)" if hunks is not None else category
+    return f"{SUMMARY_PREFIX} {path}: {what} omitted ({size:,} bytes)\n"
+
+
+def classify_diff(
+    diff: str,
+    rules: FilterRules | None = None,
+    read_head: Callable[[str], str | None] | None = None,
+) -> ClassifiedDiff:
+    """Replace non-reviewable files and hunks in a diff with one-line summaries.
+
+    Args:
+        diff: A unified git diff.
+        rules: Per-pack filter rules. Defaults to all built-in categories.
+        read_head: Returns the first lines of a changed file after the change,
+            or None if it has none, e.g. GitObjectReader.head_reader. Lets
+            generated-code markers be found when no hunk touches the top of
+            the file.
+
+    Returns:
+        The filtered diff and a record of what was summarized.
+    """
+    rules = rules or FilterRules()
+    enabled = set(rules.categories)
+    out: list[str] = []
+    summaries: list[FileSummary] = []
+
+    for chunk in split_file_diffs(diff):
+        path = file_path(chunk)
+        if path is None or any(fnmatch(path, pattern) for pattern in rules.include):
+            out.append(chunk)
+            continue
+
+        header, hunks = split_hunks(chunk)
+
+        if any(fnmatch(path, pattern) for pattern in rules.ignore):
+            category: str | None = IGNORED
+        else:
+            category = classify_file(path, header, hunks, read_head)
+            if category not in enabled:
+                category = None
+
+        if category is not None:
+            line = _summary_line(path, category, len(chunk))
+            summaries.append(FileSummary(path, category, max(0, len(chunk) - len(line))))
+            out.append(line)
+            continue
+
+        if WHITESPACE in enabled and hunks:
+            kept = [h for h in hunks if not _is_whitespace_only(h, path)]
+            dropped = len(hunks) - len(kept)
+            if dropped:
+                removed_size = sum(len(h) for h in hunks) - sum(len(h) for h in kept)
+                if kept:
+                    line = _summary_line(path, WHITESPACE, removed_size, hunks=dropped)
+                    out.append(header + "".join(kept) + line)
+                else:
+                    line = _summary_line(path, WHITESPACE, len(chunk))
+                    removed_size = len(chunk)
+                    out.append(line)
+                summaries.append(FileSummary(path, WHITESPACE, max(0, removed_size - len(line))))
+                continue
+
+        out.append(chunk)
+
+    return ClassifiedDiff(diff="".join(out), summaries=summaries, original_size=len(diff))
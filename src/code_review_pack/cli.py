@@ -1,16 +1,34 @@
 #!/usr/bin/env python3
 """CLI for code-review-pack."""
 
+import os
 import shutil
+import time
 from pathlib import Path
 
 import click
 import yaml
 from rich.console import Console
 from rich.prompt import Confirm, Prompt
+from rich.table import Table
+
+from code_review_pack.ledger import GROUP_KEYS
 
 console = Console()
 
+# Modules that ai_review.py imports. `init` copies them next to it into
+# .github/scripts/, where only the standard library is installed, so they must
+# not import third-party packages at module level (backends imports anthropic
+# and httpx only when a backend needing them is built), and import each other
+# with a fallback to the bare module name.
+ACTION_SUPPORT_MODULES = [
+    "backends.py",
+    "classify.py",
+    "clustering.py",
+    "gitobjects.py",
+    "ledger.py",
+]
+
 
 def get_packs_dir() -> Path:
     """Get the packs directory, checking multiple possible locations."""
@@ -152,6 +170,13 @@ def init(pack: str | None, target: str) -> None:
                 for f in gh_scripts_src.iterdir():
                     shutil.copy(f, gh_scripts_dst / f.name)
 
+            # Shared review modules and pack settings used by ai_review.py
+            module_dir = Path(__file__).resolve().parent
+            for name in ACTION_SUPPORT_MODULES:
+                shutil.copy(module_dir / name, gh_scripts_dst / name)
+            if (pack_path / "pack.yaml").exists():
+                shutil.copy(pack_path / "pack.yaml", gh_scripts_dst / "pack.yaml")
+
             console.print("[green]✓[/green] Installed .github/workflows/ai-code-review.yml")
             console.print("[yellow]![/yellow] Remember to add ANTHROPIC_API_KEY to repository secrets")
 
@@ -187,17 +212,36 @@ def list_packs() -> None:
 @main.command()
 @click.option("--pack", "-p", default="python-azure-ai-agent", help="Pack to use for review context")
 @click.option("--staged", is_flag=True, help="Review staged changes only")
-def review(pack: str, staged: bool) -> None:
-    """Run an AI code review on current changes."""
+@click.option("--fresh", is_flag=True, help="Ignore reviews from `watch` or an earlier run")
+@click.option("--range", "rev_range", help="Review a commit range such as main..release")
+@click.option("--per-commit", is_flag=True, help="With --range, review each commit separately")
+@click.option("--jobs", "-j", default=4, show_default=True,
+              help="Commits reviewed at once with --per-commit")
+def review(
+    pack: str, staged: bool, fresh: bool, rev_range: str | None, per_commit: bool, jobs: int
+) -> None:
+    """Run an AI code review on current changes or a commit range."""
     # Lazy import to avoid loading anthropic SDK unless review command is used
+    from code_review_pack import ledger
+    from code_review_pack.classify import classify_diff
+    from code_review_pack.clustering import cluster_diff
+    from code_review_pack.gitobjects import GitObjectReader
     from code_review_pack.reviewer import (
         GitError,
+        get_range_diff,
+        get_repo_name,
         get_staged_diff,
         get_working_diff,
         load_checklists,
+        load_cluster_settings,
+        load_filter_rules,
         load_overlay,
+        load_pack_config,
+        load_review_settings,
+        range_end,
         review_code,
     )
+    from code_review_pack.speculative import context_key, split_cached
 
     packs_dir = get_packs_dir()
     pack_path = packs_dir / pack
@@ -206,53 +250,685 @@ def review(pack: str, staged: bool) -> None:
         console.print(f"[red]Pack not found: {pack}[/red]")
         raise SystemExit(1)
 
+    if per_commit and not rev_range:
+        console.print("[red]--per-commit requires --range[/red]")
+        raise SystemExit(1)
+    if rev_range and staged:
+        console.print("[red]--range and --staged cannot be combined[/red]")
+        raise SystemExit(1)
+
     console.print(f"\n[bold]Running code review with pack: {pack}[/bold]\n")
 
-    # Get the diff
+    if per_commit:
+        _review_range(pack, pack_path, rev_range, jobs, fresh)
+        return
+
+    record = ledger.ReviewRecord(
+        source="cli",
+        repo=get_repo_name(),
+        pack=pack,
+        pack_version=str(load_pack_config(pack_path).get("version", "")) or None,
+    )
+
     try:
-        if staged:
-            diff = get_staged_diff()
-            console.print("[dim]Reviewing staged changes...[/dim]\n")
-        else:
-            diff = get_working_diff()
-            console.print("[dim]Reviewing working directory changes...[/dim]\n")
+        # Get the diff
+        try:
+            with record.phase("diff"):
+                if rev_range:
+                    diff = get_range_diff(rev_range)
+                    console.print(f"[dim]Reviewing changes in {rev_range}...[/dim]\n")
+                elif staged:
+                    diff = get_staged_diff()
+                    console.print("[dim]Reviewing staged changes...[/dim]\n")
+                else:
+                    diff = get_working_diff()
+                    console.print("[dim]Reviewing working directory changes...[/dim]\n")
+        except GitError as e:
+            record.outcome = "error:GitError"
+            console.print(f"[red]Git error: {e}[/red]")
+            raise SystemExit(1)
+
+        if not diff.strip():
+            # Recorded like the Action's empty runs
+            record.outcome = "empty"
+            console.print("[yellow]No changes to review.[/yellow]")
+            return
+
+        record.diff_size = len(diff)
+        # Summarize lockfiles, generated/vendored files, etc. before building the prompt
+        try:
+            settings = load_review_settings(pack_path)
+            cluster_settings = load_cluster_settings(pack_path)
+            with record.phase("filter"):
+                rules = load_filter_rules(pack_path)
+                end = range_end(rev_range) if rev_range else None
+                if end is None:
+                    classified = classify_diff(diff, rules)
+                else:
+                    with GitObjectReader() as objects:
+                        classified = classify_diff(diff, rules, objects.head_reader(end))
+        except ValueError as e:
+            record.outcome = "error:config"
+            console.print(f"[red]Invalid pack configuration: {e}[/red]")
+            raise SystemExit(1)
+        console.print(f"[dim]{classified.report()}[/dim]\n")
+
+        # Load pack context
+        with record.phase("context"):
+            overlay = load_overlay(pack_path)
+            checklists = load_checklists(pack_path)
+
+        # Reuse reviews precomputed by `watch`; only send files changed since
+        cache = None if fresh or rev_range else _speculative_cache()
+        if cache is not None and cache.root.exists():
+            with record.phase("cache"):
+                context = context_key(overlay, checklists, settings, rules)
+                split = split_cached(diff, cache, pack, settings.model, rules, context)
+            if split.cached:
+                console.print(
+                    f"[dim]Using {len(split.cached)} pre-reviewed file(s) from watch[/dim]\n"
+                )
+                for path, text in split.cached:
+                    console.print(f"[bold]{path}[/bold] [dim](pre-reviewed)[/dim]\n")
+                    console.print(text)
+                if not split.remaining.strip():
+                    record.outcome = "cached"
+                    return
+                # Keep the one-line summaries of filtered files in the prompt
+                classified.diff = split.remaining + split.summaries
+
+        # Review mechanical mass changes once instead of once per site
+        with record.phase("cluster"):
+            clustered = cluster_diff(classified.diff, cluster_settings)
+        if clustered.clusters:
+            console.print(f"[dim]{clustered.report()}[/dim]\n")
+
+        diff = clustered.diff
+        record.diff_size = len(diff)
+
+        console.print(f"[dim]Sending to {settings.model} for review...[/dim]\n")
+
+        try:
+            result = review_code(diff, overlay, checklists, record=record, settings=settings)
+            console.print(result)
+            if clustered.clusters:
+                console.print(f"\n{clustered.report_section()}")
+        except ImportError:
+            record.outcome = "error:ImportError"
+            console.print("[red]Error: anthropic package not installed.[/red]")
+            console.print("Run: pip install anthropic")
+            raise SystemExit(1)
+        except ValueError as e:
+            # Raised by reviewer.py for diff size limits
+            record.outcome = "too_large"
+            console.print(f"[red]Validation error: {e}[/red]")
+            raise SystemExit(1)
+        except Exception as e:
+            error_name = type(e).__name__
+            record.outcome = f"error:{error_name}"
+            if "AuthenticationError" in error_name:
+                console.print("[red]Authentication failed. Check your ANTHROPIC_API_KEY.[/red]")
+            elif "RateLimitError" in error_name:
+                console.print("[red]Rate limit exceeded. Please wait and try again.[/red]")
+            elif "APIError" in error_name:
+                console.print(f"[red]API error: {e}[/red]")
+            else:
+                console.print(f"[red]Review failed ({error_name}): {e}[/red]")
+            raise SystemExit(1)
+    finally:
+        ledger.append(record)
+
+
+def _review_range(pack: str, pack_path: Path, rev_range: str, jobs: int, fresh: bool) -> None:
+    """Review each commit of a range once per unique patch, ``jobs`` at a time."""
+    from code_review_pack import ledger
+    from code_review_pack.classify import classify_diff
+    from code_review_pack.clustering import cluster_diff
+    from code_review_pack.commit_range import (
+        CACHED,
+        DUPLICATE,
+        EMPTY,
+        FAILED,
+        REVIEWED,
+        SKIPPED,
+        Commit,
+        CommitReview,
+        default_commit_cache,
+        review_range,
+    )
+    from code_review_pack.gitobjects import GitObjectReader
+    from code_review_pack.reviewer import (
+        GitError,
+        ReviewSession,
+        get_commit_diff,
+        get_git_dir,
+        get_patch_ids,
+        get_range_commits,
+        get_repo_name,
+        load_checklists,
+        load_cluster_settings,
+        load_filter_rules,
+        load_overlay,
+        load_pack_config,
+        load_review_settings,
+        review_code,
+    )
+    from code_review_pack.speculative import context_key
+
+    try:
+        rules = load_filter_rules(pack_path)
+        cluster_settings = load_cluster_settings(pack_path)
+        settings = load_review_settings(pack_path)
+    except ValueError as e:
+        console.print(f"[red]Invalid pack configuration: {e}[/red]")
+        raise SystemExit(1)
+
+    try:
+        commits = [Commit(sha, subject) for sha, subject in get_range_commits(rev_range)]
+        patch_ids = get_patch_ids(rev_range)
+        cache = default_commit_cache(get_git_dir())
     except GitError as e:
         console.print(f"[red]Git error: {e}[/red]")
         raise SystemExit(1)
 
-    if not diff.strip():
-        console.print("[yellow]No changes to review.[/yellow]")
+    if not commits:
+        console.print(f"[yellow]No commits in {rev_range}.[/yellow]")
         return
 
-    # Load pack context
     overlay = load_overlay(pack_path)
     checklists = load_checklists(pack_path)
+    repo = get_repo_name()
+    pack_version = str(load_pack_config(pack_path).get("version", "")) or None
+    # Shared by the worker threads so reviews reuse one client's connections
+    session = ReviewSession(settings)
+    # And one pool of git cat-file processes for the diff filter's file lookups
+    objects = GitObjectReader()
+
+    def review_commit(commit: Commit) -> str:
+        record = ledger.ReviewRecord(
+            source="range", repo=repo, pack=pack, pack_version=pack_version
+        )
+        try:
+            with record.phase("diff"):
+                diff = get_commit_diff(commit.sha)
+            with record.phase("filter"):
+                diff = classify_diff(diff, rules, objects.head_reader(commit.sha)).diff
+            with record.phase("cluster"):
+                clustered = cluster_diff(diff, cluster_settings)
+            record.diff_size = len(clustered.diff)
+            result = review_code(
+                clustered.diff, overlay, checklists, record=record, session=session
+            )
+            if clustered.clusters:
+                result = f"{result}\n\n{clustered.report_section()}"
+            return result
+        except ValueError:
+            record.outcome = "too_large"
+            raise
+        except Exception as e:
+            record.outcome = f"error:{type(e).__name__}"
+            raise
+        finally:
+            ledger.append(record)
+
+    def progress(result: CommitReview) -> None:
+        label = f"{result.commit.short} {result.commit.subject}"
+        if result.status == REVIEWED:
+            console.print(f"[green]✓[/green] Reviewed {label}")
+        elif result.status == CACHED:
+            console.print(f"[dim]✓ {label} (reviewed by an earlier run)[/dim]")
+        elif result.status == DUPLICATE:
+            console.print(f"[dim]= {label} (same patch as {result.duplicate_of.short})[/dim]")
+        elif result.status == EMPTY:
+            console.print(f"[dim]- {label} (no changes)[/dim]")
+        elif result.status == SKIPPED:
+            console.print(f"[yellow]![/yellow] Skipped {label}: {result.text}")
+        elif result.status == FAILED:
+            console.print(f"[red]✗[/red] Failed {label}: {result.text}")
+
+    unique = len(set(patch_ids.values()))
+    console.print(
+        f"[dim]{len(commits)} commit(s) in {rev_range}, {unique} unique patch(es); "
+        f"reviewing up to {jobs} at a time with {settings.model}...[/dim]\n"
+    )
+    with session, objects:
+        report = review_range(
+            rev_range,
+            commits,
+            patch_ids,
+            review_commit,
+            cache,
+            pack,
+            settings.model,
+            jobs=jobs,
+            reuse=not fresh,
+            on_result=progress,
+            context=context_key(overlay, checklists, settings, rules, cluster_settings),
+        )
+
+    for result in report.reviews:
+        console.print(f"\n{result.report()}")
+    console.print(f"\n{report.rollup()}")
+
+    if report.count(FAILED):
+        raise SystemExit(1)
+
+
+def _speculative_cache():
+    """The repository's speculative review cache, or None outside a git checkout."""
+    from code_review_pack.reviewer import GitError, get_git_dir
+    from code_review_pack.speculative import default_cache
+
+    try:
+        return default_cache(get_git_dir())
+    except GitError:
+        return None
+
+
+@main.command()
+@click.option("--pack", "-p", default="python-azure-ai-agent", help="Pack to use for review context")
+@click.option("--debounce", default=3.0, show_default=True,
+              help="Seconds without edits before pre-reviewing")
+@click.option("--interval", default=1.0, show_default=True, help="Seconds between polls")
+def watch(pack: str, debounce: float, interval: float) -> None:
+    """Pre-review working-tree changes in the background.
+
+    Changed files are reviewed at low priority once edits settle, so a later
+    `review` or `review --staged` only sends files changed since the last pass.
+    """
+    from code_review_pack import ledger
+    from code_review_pack.reviewer import (
+        GitError,
+        get_head_changed_files,
+        get_head_diff,
+        get_repo_name,
+        get_repo_root,
+        load_checklists,
+        load_filter_rules,
+        load_overlay,
+        load_review_settings,
+        review_code,
+    )
+    from code_review_pack.speculative import Watcher, context_key, lower_priority
+
+    pack_path = get_packs_dir() / pack
+    if not pack_path.exists():
+        console.print(f"[red]Pack not found: {pack}[/red]")
+        raise SystemExit(1)
+
+    cache = _speculative_cache()
+    root = get_repo_root()
+    if cache is None or root is None:
+        console.print("[red]Git error: not inside a git repository[/red]")
+        raise SystemExit(1)
+
+    try:
+        rules = load_filter_rules(pack_path)
+        settings = load_review_settings(pack_path)
+    except ValueError as e:
+        console.print(f"[red]Invalid pack configuration: {e}[/red]")
+        raise SystemExit(1)
+    overlay = load_overlay(pack_path)
+    checklists = load_checklists(pack_path)
+    repo = get_repo_name()
+
+    def review_file(file_diff: str) -> str:
+        record = ledger.ReviewRecord(source="watch", repo=repo, pack=pack,
+                                     diff_size=len(file_diff))
+        try:
+            return review_code(file_diff, overlay, checklists, record=record, settings=settings)
+        except Exception as e:
+            record.outcome = f"error:{type(e).__name__}"
+            raise
+        finally:
+            ledger.append(record)
+
+    def report(path: str, status: str) -> None:
+        if status == "reviewed":
+            console.print(f"[green]✓[/green] Pre-reviewed {path}")
+        elif status == "skipped":
+            console.print(f"[yellow]![/yellow] Skipped {path} (diff too large)")
+
+    watcher = Watcher(
+        cache,
+        pack,
+        settings.model,
+        get_diff=get_head_diff,
+        get_changed_files=get_head_changed_files,
+        review=review_file,
+        rules=rules,
+        debounce=debounce,
+        root=root,
+        context=context_key(overlay, checklists, settings, rules),
+    )
 
-    console.print("[dim]Sending to Claude for review...[/dim]\n")
+    lower_priority()
+    cache.prune()
+    console.print(f"[bold]Watching {root} with pack: {pack}[/bold] [dim](Ctrl+C to stop)[/dim]\n")
 
     try:
-        result = review_code(diff, overlay, checklists)
-        console.print(result)
-    except ImportError:
-        console.print("[red]Error: anthropic package not installed.[/red]")
-        console.print("Run: pip install anthropic")
+        while True:
+            try:
+                if watcher.poll():
+                    watcher.run_pass(on_review=report)
+            except GitError as e:
+                console.print(f"[yellow]Git error: {e}[/yellow]")
+            except Exception as e:
+                # Retry on the next edit rather than on every poll
+                console.print(f"[yellow]Pre-review failed ({type(e).__name__}): {e}[/yellow]")
+                watcher.mark_reviewed()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        console.print("\n[dim]Stopped watching.[/dim]")
+
+
+@main.command()
+@click.option("--pack", "-p", default="python-azure-ai-agent", help="Pack to use for review context")
+@click.option("--host", default="127.0.0.1", show_default=True, help="Address to listen on")
+@click.option("--port", default=8080, show_default=True, help="Port to listen on")
+@click.option("--workers", default=2, show_default=True, help="Concurrent reviews")
+@click.option("--per-repo", default=1, show_default=True, help="Concurrent reviews per repository")
+@click.option("--state-dir", type=click.Path(file_okay=False),
+              help="Queue and mirror directory (default: ~/.local/state/code-review-pack/service)")
+@click.option("--insecure", is_flag=True,
+              help="Accept unsigned deliveries when WEBHOOK_SECRET is not set")
+def serve(pack: str, host: str, port: int, workers: int, per_repo: int,
+          state_dir: str | None, insecure: bool) -> None:
+    """Run a webhook-driven review service.
+
+    Point a GitHub pull_request webhook at http://HOST:PORT/webhook. Uses
+    GITHUB_TOKEN to fetch and comment, WEBHOOK_SECRET to verify deliveries,
+    and GITHUB_API_URL (plus GITHUB_SERVER_URL if it is not the API host
+    without ``api.``) for GitHub Enterprise.
+    """
+    from code_review_pack.ledger import default_ledger_path
+    from code_review_pack.reviewer import (
+        load_checklists,
+        load_cluster_settings,
+        load_filter_rules,
+        load_overlay,
+        load_review_settings,
+    )
+    from code_review_pack.service import (
+        DEFAULT_API_URL,
+        GitHubClient,
+        JobQueue,
+        ReviewService,
+        WebhookServer,
+    )
+
+    pack_path = get_packs_dir() / pack
+    if not pack_path.exists():
+        console.print(f"[red]Pack not found: {pack}[/red]")
+        raise SystemExit(1)
+
+    secret = os.environ.get("WEBHOOK_SECRET")
+    if not secret and not insecure:
+        console.print(
+            "[red]WEBHOOK_SECRET is not set. Set it to the webhook's secret, or pass "
+            "--insecure to accept unsigned deliveries.[/red]"
+        )
         raise SystemExit(1)
+
+    try:
+        rules = load_filter_rules(pack_path)
+        clustering = load_cluster_settings(pack_path)
+        settings = load_review_settings(pack_path)
     except ValueError as e:
-        # Raised by reviewer.py for diff size limits
-        console.print(f"[red]Validation error: {e}[/red]")
+        console.print(f"[red]Invalid pack configuration: {e}[/red]")
         raise SystemExit(1)
-    except Exception as e:
-        error_name = type(e).__name__
-        if "AuthenticationError" in error_name:
-            console.print("[red]Authentication failed. Check your ANTHROPIC_API_KEY.[/red]")
-        elif "RateLimitError" in error_name:
-            console.print("[red]Rate limit exceeded. Please wait and try again.[/red]")
-        elif "APIError" in error_name:
-            console.print(f"[red]API error: {e}[/red]")
-        else:
-            console.print(f"[red]Review failed ({error_name}): {e}[/red]")
+
+    if state_dir:
+        state = Path(state_dir)
+    else:
+        ledger_path = default_ledger_path()
+        state = (ledger_path.parent if ledger_path else Path.cwd() / ".code-review-pack") / "service"
+
+    queue = JobQueue(state / "queue.sqlite3")
+    github = GitHubClient(
+        os.environ.get("GITHUB_TOKEN"),
+        os.environ.get("GITHUB_API_URL", DEFAULT_API_URL),
+        os.environ.get("GITHUB_SERVER_URL"),
+    )
+    service = ReviewService(
+        queue,
+        state / "mirrors",
+        github,
+        pack,
+        overlay=load_overlay(pack_path),
+        checklists=load_checklists(pack_path),
+        rules=rules,
+        clustering=clustering,
+        settings=settings,
+        workers=workers,
+        max_per_repo=per_repo,
+    )
+    server = WebhookServer(
+        (host, port), queue, secret=secret, server_url=github.server_url, insecure=insecure
+    )
+
+    service.start()
+    console.print(f"[bold]Review service listening on http://{host}:{port}/webhook[/bold]")
+    console.print(f"[dim]Pack: {pack}, model: {settings.model}, state: {state}[/dim]")
+    console.print(f"[dim]Fetching from {github.server_url}[/dim]")
+    if not secret:
+        console.print("[yellow]![/yellow] --insecure: deliveries are not verified")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        console.print("\n[dim]Shutting down...[/dim]")
+    finally:
+        server.server_close()
+        service.stop()
+        queue.close()
+
+
+@main.command("eval")
+@click.option("--pack", "-p", default="python-azure-ai-agent", help="Pack whose evals/ corpus to run")
+@click.option("--config", "-c", "config_names", multiple=True,
+              help="Configuration from evals/configs.yaml (repeatable; default: all)")
+@click.option("--mode", type=click.Choice(["live", "record", "replay", "stub"]), default="replay",
+              show_default=True,
+              help="Call the model, call it and store responses, replay them, "
+              "or review with offline pattern checks (diff-shaping configs only)")
+@click.option("--recordings", type=click.Path(file_okay=False),
+              help="Recorded responses (default: <pack>/evals/recordings)")
+@click.option("--jobs", "-j", default=4, show_default=True, help="Cases reviewed at once")
+@click.option("--output", "-o", type=click.Path(dir_okay=False),
+              help="Write per-configuration results as JSON")
+def eval_command(pack: str, config_names: tuple[str, ...], mode: str, recordings: str | None,
+                 jobs: int, output: str | None) -> None:
+    """Score review configurations against the pack's seeded-defect corpus.
+
+    Reports recall per dimension next to input/output tokens and time, so
+    cheaper configurations can be weighed against the defects they miss.
+    Exits with status 1 if any case could not be reviewed.
+    """
+    import json
+
+    from code_review_pack.evaluation import (
+        RECORD,
+        REPLAY,
+        STUB,
+        RecordingBackend,
+        ReplayBackend,
+        StubBackend,
+        config_settings,
+        load_configs,
+        load_corpus,
+        run_config,
+    )
+    from code_review_pack.reviewer import (
+        ReviewSession,
+        load_checklists,
+        load_overlay,
+        load_pack_config,
+    )
+
+    pack_path = get_packs_dir() / pack
+    if not pack_path.exists():
+        console.print(f"[red]Pack not found: {pack}[/red]")
+        raise SystemExit(1)
+
+    evals_path = pack_path / "evals"
+    pack_config = load_pack_config(pack_path)
+    dimensions = list(pack_config.get("dimensions") or [])
+    available = {p.stem for p in (pack_path / "checklists").glob("*.md")}
+    try:
+        cases = load_corpus(evals_path, dimensions or None)
+        configs = load_configs(evals_path)
+        if config_names:
+            unknown = set(config_names) - {c.name for c in configs}
+            if unknown:
+                raise ValueError(f"Unknown eval config: {', '.join(sorted(unknown))}")
+            configs = [c for c in configs if c.name in config_names]
+        for config in configs:
+            missing = set(config.checklists or []) - available
+            if missing:
+                raise ValueError(
+                    f"Eval config {config.name}: unknown checklist {', '.join(sorted(missing))}"
+                )
+        settings_by_config = {c.name: config_settings(pack_config, c) for c in configs}
+    except ValueError as e:
+        console.print(f"[red]Invalid eval configuration: {e}[/red]")
+        raise SystemExit(1)
+
+    if not cases:
+        console.print(f"[yellow]No eval cases in {evals_path / 'cases'}.[/yellow]")
+        return
+
+    recordings_path = Path(recordings) if recordings else evals_path / "recordings"
+    console.print(
+        f"\n[bold]Evaluating {len(configs)} configuration(s) on {len(cases)} case(s) "
+        f"({mode})[/bold]\n"
+    )
+
+    overlay = load_overlay(pack_path)
+    results = []
+    for config in configs:
+        settings = settings_by_config[config.name]
+        # Builds the model backend only when it is called, so replay and stub never do
+        session = ReviewSession(settings)
+        try:
+            if mode == STUB:
+                backend = StubBackend(settings)
+            elif mode == REPLAY:
+                backend = ReplayBackend(settings, recordings_path)
+            elif mode == RECORD:
+                backend = RecordingBackend(session.backend, recordings_path)
+            else:
+                backend = session.backend
+            result = run_config(
+                cases,
+                config,
+                pack_config,
+                overlay if config.overlay else "",
+                load_checklists(pack_path, config.checklists),
+                backend,
+                jobs=jobs,
+            )
+        finally:
+            session.close()
+        if mode == STUB and not StubBackend.measures(config):
+            # The stub ignores the overlay, checklists and model settings
+            result.scored = False
+        results.append(result)
+        console.print(f"[dim]{config.name}: {result.errors} error(s)[/dim]")
+        for case in result.cases:
+            if case.error:
+                console.print(f"[yellow]![/yellow] {config.name}/{case.case}: {case.error}")
+
+    def pct(value: float | None) -> str:
+        return "-" if value is None else f"{value:.0%}"
+
+    table = Table(title=f"Seeded-defect recall: {pack}")
+    table.add_column("")
+    for result in results:
+        table.add_column(result.config.name, justify="right")
+    for dimension in dimensions:
+        table.add_row(dimension, *(pct(r.recall(dimension)) for r in results))
+    table.add_section()
+    table.add_row("[bold]recall[/bold]", *(f"[bold]{pct(r.recall())}[/bold]" for r in results))
+    table.add_row("tokens in", *(f"{r.tokens_in:,}" for r in results))
+    table.add_row("tokens out", *(f"{r.tokens_out:,}" for r in results))
+    table.add_row("p50 model s", *(f"{r.model_ms_p50() / 1000:.1f}" for r in results))
+    table.add_row("wall s", *(f"{r.wall_ms / 1000:.1f}" for r in results))
+    table.add_row("errors", *(str(r.errors) for r in results))
+    console.print(table)
+    if not all(r.scored for r in results):
+        console.print(
+            "[dim]Stub reviews cannot measure configurations that only change the "
+            "overlay, checklists or review settings; their recall is shown as -.[/dim]"
+        )
+
+    if output:
+        Path(output).write_text(
+            json.dumps([r.to_dict(dimensions) for r in results], indent=2), encoding="utf-8"
+        )
+        console.print(f"[dim]Wrote {output}[/dim]")
+
+    if any(r.errors for r in results):
         raise SystemExit(1)
 
 
+@main.command()
+@click.option("--by", "group_by", default="pack,model",
+              help=f"Comma-separated group keys: {', '.join(GROUP_KEYS)}")
+@click.option("--since", default="30d", help="Time window, e.g. 7d, 12h, 4w or 2026-01-31")
+@click.option("--ledger", "ledger_path", type=click.Path(),
+              help="Ledger database, or a directory of them such as downloaded Action "
+              "artifacts (default: $CODE_REVIEW_PACK_LEDGER or ~/.local/state)")
+def stats(group_by: str, since: str, ledger_path: str | None) -> None:
+    """Show review latency and token usage from the local ledger."""
+    from code_review_pack import ledger
+
+    path = Path(ledger_path) if ledger_path else ledger.default_ledger_path()
+    if path is None:
+        paths = []
+    elif path.is_dir():
+        paths = sorted(path.rglob("*.sqlite3"))
+    else:
+        paths = [path] if path.exists() else []
+    if path is None or not paths:
+        console.print("[yellow]No review ledger found. Run a review first.[/yellow]")
+        return
+
+    keys = tuple(key.strip() for key in group_by.split(",") if key.strip())
+    try:
+        since_ts = ledger.parse_since(since)
+        conn = ledger.combine(paths) if path.is_dir() else ledger.connect(path)
+        try:
+            rows = ledger.stats(conn, by=keys, since=since_ts)
+        finally:
+            conn.close()
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise SystemExit(1)
+
+    if not rows:
+        console.print(f"[yellow]No reviews recorded since {since}.[/yellow]")
+        return
+
+    table = Table(title=f"Reviews since {since}")
+    for key in keys or ("all",):
+        table.add_column(key)
+    for column in ("runs", "failed", "p50 s", "p95 s", "tokens in", "tokens out", "cached", "retries"):
+        table.add_column(column, justify="right")
+
+    for row in rows:
+        table.add_row(
+            *row.group,
+            str(row.runs),
+            str(row.failures),
+            f"{row.p50_ms / 1000:.1f}",
+            f"{row.p95_ms / 1000:.1f}",
+            f"{row.tokens_in:,}",
+            f"{row.tokens_out:,}",
+            f"{row.tokens_cached:,}",
+            str(row.retries),
+        )
+    console.print(table)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,347 @@
+"""Near-duplicate hunk clustering for mechanical mass changes.
+
+Renaming an API across hundreds of files produces hundreds of hunks that
+differ only in surrounding names and literals. Each hunk is normalized
+(literals and identifiers present on both sides of the change become
+``STR``/``NUM``/``ID``, the ones that the change adds or removes are kept),
+hashed into a MinHash signature, and LSH banding finds candidate groups.
+Within a group, only hunks whose normalized tokens equal each other are
+collapsed, so a hunk that changes anything more than the others is still
+sent in full. Hunks with too few tokens to compare meaningfully, such as
+one-line constant edits, are never clustered. Only one representative per
+cluster and the outliers are sent for review; the report lists every
+location each representative stands for.
+
+Standard library only; see ACTION_SUPPORT_MODULES in cli.py.
+"""
+
+import keyword
+import random
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Any
+
+try:
+    from code_review_pack.classify import SUMMARY_PREFIX, file_path, split_file_diffs, split_hunks
+except ImportError:  # copied next to ai_review.py
+    from classify import SUMMARY_PREFIX, file_path, split_file_diffs, split_hunks  # type: ignore
+
+# MinHash signature length; must equal LSH_BANDS * LSH_ROWS
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = 4
+
+# Tokens per shingle
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+_TOKEN = re.compile(
+    r"""(?P<str>"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')"""
+    r"|(?P<num>\b\d[\d_]*(?:\.\d+)?(?:[eE][+-]?\d+)?\b|\b0[xX][0-9a-fA-F]+\b)"
+    r"|(?P<id>[A-Za-z_]\w*)"
+    r"|(?P<op>\S)"
+)
+_HUNK_START = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)")
+
+
+@dataclass
+class ClusterSettings:
+    """The ``hunk_clustering`` block of pack.yaml.
+
+    Attributes:
+        enabled: Whether clustering runs at all.
+        threshold: Minimum estimated Jaccard similarity for two hunks to be compared.
+        min_cluster_size: Smallest group of hunks that is collapsed.
+        min_tokens: Fewest tokens on a hunk's changed lines for it to be clustered.
+    """
+
+    enabled: bool = True
+    threshold: float = 0.8
+    min_cluster_size: int = 3
+    min_tokens: int = 10
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any] | None) -> "ClusterSettings":
+        """Build settings from pack.yaml.
+
+        Raises:
+            ValueError: If threshold, min_cluster_size or min_tokens is out of range.
+        """
+        config = config or {}
+        settings = cls(
+            enabled=bool(config.get("enabled", True)),
+            threshold=float(config.get("threshold", 0.8)),
+            min_cluster_size=int(config.get("min_cluster_size", 3)),
+            min_tokens=int(config.get("min_tokens", 10)),
+        )
+        if not 0 < settings.threshold <= 1:
+            raise ValueError("hunk_clustering.threshold must be in (0, 1]")
+        if settings.min_cluster_size < 2:
+            raise ValueError("hunk_clustering.min_cluster_size must be at least 2")
+        if settings.min_tokens < 1:
+            raise ValueError("hunk_clustering.min_tokens must be at least 1")
+        return settings
+
+
+@dataclass
+class Hunk:
+    """One hunk of a file diff."""
+
+    path: str
+    line: int
+    text: str
+
+    @property
+    def location(self) -> str:
+        return f"{self.path}:L{self.line}"
+
+
+@dataclass
+class Cluster:
+    """Near-identical hunks; the first member is the representative."""
+
+    id: int
+    members: list[Hunk]
+
+    @property
+    def representative(self) -> Hunk:
+        return self.members[0]
+
+
+@dataclass
+class ClusteredDiff:
+    """Result of clustering a diff.
+
+    Attributes:
+        diff: The diff with non-representative cluster members removed.
+        clusters: Clusters of at least ``min_cluster_size`` hunks.
+        original_size: Size of the input diff in characters.
+    """
+
+    diff: str
+    clusters: list[Cluster] = field(default_factory=list)
+    original_size: int = 0
+
+    @property
+    def hunks_collapsed(self) -> int:
+        return sum(len(c.members) - 1 for c in self.clusters)
+
+    def report(self) -> str:
+        """One-line description of what was collapsed, for logs."""
+        if not self.clusters:
+            return "Hunk clustering: no repeated changes"
+        return (
+            f"Hunk clustering: {self.hunks_collapsed} hunk(s) collapsed into "
+            f"{len(self.clusters)} cluster(s); avoided "
+            f"{self.original_size - len(self.diff):,} bytes"
+        )
+
+    def report_section(self) -> str:
+        """Markdown appended to the review listing where each cluster applies."""
+        if not self.clusters:
+            return ""
+        lines = [
+            "## Repeated Changes",
+            "",
+            "These changes were reviewed once. Every finding on a representative "
+            "location applies to all locations in its cluster.",
+            "",
+        ]
+        for cluster in self.clusters:
+            lines.append(
+                f"**Cluster {cluster.id}** - `{cluster.representative.location}` "
+                f"({len(cluster.members)} locations)"
+            )
+            lines.extend(f"- `{hunk.location}`" for hunk in cluster.members)
+            lines.append("")
+        return "\n".join(lines)
+
+
+def _changed_lines(hunk: str) -> tuple[list[str], list[str]]:
+    removed, added = [], []
+    for line in hunk.splitlines()[1:]:
+        if line.startswith("-"):
+            removed.append(line[1:])
+        elif line.startswith("+"):
+            added.append(line[1:])
+    return removed, added
+
+
+def _tokens(line: str) -> list[tuple[str, str]]:
+    return [(m.lastgroup or "op", m.group()) for m in _TOKEN.finditer(line)]
+
+
+def _size(hunk: str) -> int:
+    """Number of tokens on a hunk's changed lines."""
+    removed, added = _changed_lines(hunk)
+    return sum(len(_tokens(line)) for line in removed + added)
+
+
+def normalize_hunk(hunk: str) -> list[str]:
+    """Token sequence of a hunk's changed lines with site-specific detail abstracted.
+
+    Identifiers and literals that appear on both the removed and added side
+    (the names and values around the change) become ``ID``, ``STR`` or
+    ``NUM``; those only on one side (what the change renames, adds, removes
+    or sets) are kept verbatim. Each changed line starts with a ``-`` or
+    ``+`` marker.
+    """
+    removed, added = _changed_lines(hunk)
+    removed_tokens = [_tokens(line) for line in removed]
+    added_tokens = [_tokens(line) for line in added]
+    removed_values = {(kind, v) for line in removed_tokens for kind, v in line if kind != "op"}
+    added_values = {(kind, v) for line in added_tokens for kind, v in line if kind != "op"}
+    shared = removed_values & added_values
+
+    result: list[str] = []
+    for marker, lines in (("-", removed_tokens), ("+", added_tokens)):
+        for line in lines:
+            result.append(marker)
+            for kind, value in line:
+                if (kind, value) not in shared or keyword.iskeyword(value):
+                    result.append(value)
+                elif kind == "str":
+                    result.append("STR")
+                elif kind == "num":
+                    result.append("NUM")
+                else:
+                    result.append("ID")
+    return result
+
+
+def minhash(tokens: list[str]) -> tuple[int, ...]:
+    """MinHash signature of the token shingles."""
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = {" ".join(tokens)}
+    else:
+        shingles = {
+            " ".join(tokens[i : i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)
+        }
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles]
+    return tuple(
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS
+    )
+
+
+def similarity(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def cluster_hunks(hunks: list[Hunk], settings: ClusterSettings) -> list[Cluster]:
+    """Group hunks that make the same change.
+
+    LSH over MinHash signatures proposes candidate groups of similar hunks;
+    each is then split by normalized token sequence, and only hunks equal
+    to one another form a cluster. Similar but different hunks stay outliers.
+    """
+    normalized = [normalize_hunk(h.text) for h in hunks]
+    candidates = [i for i, h in enumerate(hunks) if _size(h.text) >= settings.min_tokens]
+    signatures = {i: minhash(normalized[i]) for i in candidates}
+
+    parent = list(range(len(hunks)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(LSH_BANDS):
+        buckets: dict[tuple[int, ...], list[int]] = {}
+        lo = band * LSH_ROWS
+        for i, signature in signatures.items():
+            buckets.setdefault(signature[lo : lo + LSH_ROWS], []).append(i)
+        for members in buckets.values():
+            first = members[0]
+            for other in members[1:]:
+                root_a, root_b = find(first), find(other)
+                if root_a == root_b:
+                    continue
+                if similarity(signatures[first], signatures[other]) >= settings.threshold:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    groups: dict[int, list[int]] = {}
+    for i in range(len(hunks)):
+        groups.setdefault(find(i), []).append(i)
+
+    same: list[list[int]] = []
+    for indices in groups.values():
+        by_tokens: dict[tuple[str, ...], list[int]] = {}
+        for i in indices:
+            by_tokens.setdefault(tuple(normalized[i]), []).append(i)
+        same.extend(by_tokens.values())
+
+    clusters = []
+    for indices in sorted(same):
+        if len(indices) >= settings.min_cluster_size:
+            clusters.append(Cluster(len(clusters) + 1, [hunks[i] for i in indices]))
+    return clusters
+
+
+def cluster_diff(diff: str, settings: ClusterSettings | None = None) -> ClusteredDiff:
+    """Collapse near-duplicate hunks in a diff to one representative each.
+
+    Representatives are annotated with their cluster id. Files left without
+    hunks are dropped; ``ClusteredDiff.report_section`` lists them. Summary
+    lines from the diff filter are preserved.
+    """
+    settings = settings or ClusterSettings()
+    if not settings.enabled:
+        return ClusteredDiff(diff=diff, original_size=len(diff))
+
+    files: list[tuple[str | None, str, list[Hunk], list[str]]] = []
+    all_hunks: list[Hunk] = []
+    for chunk in split_file_diffs(diff):
+        path = file_path(chunk)
+        if path is None:
+            files.append((None, chunk, [], []))
+            continue
+        header, raw_hunks = split_hunks(chunk)
+        hunks, trailing = [], []
+        for raw in raw_hunks:
+            # Diff filter summaries land at the end of the preceding hunk; keep them aside
+            body = raw.splitlines(keepends=True)
+            kept = [line for line in body if not line.startswith(SUMMARY_PREFIX)]
+            trailing += [line for line in body if line.startswith(SUMMARY_PREFIX)]
+            match = _HUNK_START.match(raw)
+            hunks.append(Hunk(path, int(match.group(1)) if match else 0, "".join(kept)))
+        files.append((path, header, hunks, trailing))
+        all_hunks.extend(hunks)
+
+    clusters = cluster_hunks(all_hunks, settings)
+    if not clusters:
+        return ClusteredDiff(diff=diff, original_size=len(diff))
+
+    dropped: set[int] = set()
+    annotations: dict[int, Cluster] = {}
+    for cluster in clusters:
+        annotations[id(cluster.representative)] = cluster
+        dropped.update(id(h) for h in cluster.members[1:])
+
+    out: list[str] = []
+    for path, header, hunks, trailing in files:
+        if path is None:
+            out.append(header)
+            continue
+        kept = [h for h in hunks if id(h) not in dropped]
+        if kept or not hunks:
+            out.append(header)
+            for hunk in kept:
+                out.append(hunk.text)
+                cluster = annotations.get(id(hunk))
+                if cluster:
+                    out.append(
+                        f"{SUMMARY_PREFIX} cluster {cluster.id}: the change above repeats at "
+                        f"{len(cluster.members) - 1} other location(s)\n"
+                    )
+        out.extend(trailing)
+
+    return ClusteredDiff(diff="".join(out), clusters=clusters, original_size=len(diff))
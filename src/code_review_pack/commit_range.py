@@ -0,0 +1,216 @@
+"""Per-commit review of a commit range (``code-review-pack review --range A..B --per-commit``).
+
+Commits are keyed by ``git patch-id``, so a cherry-pick or a change that was
+reverted and later reapplied is reviewed once and the other commits point at
+that review. Unique commits are reviewed concurrently with a bounded number
+of workers. Each finished review is stored by patch id in the repository's
+review cache as soon as it completes, so an interrupted run picks up where it
+stopped. Keys also cover the review context (see speculative.context_key), so
+reviews made with an older overlay, checklist or setting are not reused.
+"""
+
+import re
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from code_review_pack.speculative import ReviewCache, cache_key
+
+# Reviews run at once when --jobs is not given
+DEFAULT_JOBS = 4
+
+REVIEWED = "reviewed"
+CACHED = "cached"
+DUPLICATE = "duplicate"
+EMPTY = "empty"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+_VERDICT = re.compile(r"\b(Approve|Request Changes)\b")
+
+
+@dataclass
+class Commit:
+    """A commit in the range."""
+
+    sha: str
+    subject: str
+
+    @property
+    def short(self) -> str:
+        return self.sha[:10]
+
+
+@dataclass
+class CommitReview:
+    """The outcome for one commit.
+
+    Attributes:
+        commit: The commit.
+        status: One of REVIEWED, CACHED, DUPLICATE, EMPTY, SKIPPED or FAILED.
+        patch_id: ``git patch-id --stable`` of the commit, None if it is empty.
+        text: Review text, or the error for SKIPPED and FAILED.
+        duplicate_of: For DUPLICATE, the commit whose review applies.
+    """
+
+    commit: Commit
+    status: str
+    patch_id: str | None = None
+    text: str = ""
+    duplicate_of: Commit | None = None
+
+    @property
+    def verdict(self) -> str:
+        """The review's last Approve / Request Changes, or a short status."""
+        if self.status == DUPLICATE and self.duplicate_of:
+            return f"same patch as {self.duplicate_of.short}"
+        if self.status in (REVIEWED, CACHED):
+            matches = _VERDICT.findall(self.text)
+            return matches[-1] if matches else "-"
+        return self.status
+
+    def report(self) -> str:
+        """Markdown report for this commit."""
+        heading = f"## {self.commit.short} {self.commit.subject}"
+        if self.status == DUPLICATE and self.duplicate_of:
+            return f"{heading}\n\nSame patch as {self.duplicate_of.short}; see its review."
+        if self.status == EMPTY:
+            return f"{heading}\n\nNo changes."
+        if self.status in (SKIPPED, FAILED):
+            return f"{heading}\n\nNot reviewed ({self.status}): {self.text}"
+        return f"{heading}\n\n{self.text}"
+
+
+@dataclass
+class RangeReport:
+    """Reviews of every commit in a range, oldest first."""
+
+    rev_range: str
+    reviews: list[CommitReview] = field(default_factory=list)
+
+    def count(self, status: str) -> int:
+        return sum(r.status == status for r in self.reviews)
+
+    def rollup(self) -> str:
+        """Markdown summary of the whole range."""
+        counts = ", ".join(
+            f"{self.count(status)} {status}"
+            for status in (REVIEWED, CACHED, DUPLICATE, EMPTY, SKIPPED, FAILED)
+            if self.count(status)
+        )
+        lines = [
+            f"# Range review: {self.rev_range}",
+            "",
+            f"{len(self.reviews)} commit(s): {counts or 'nothing to review'}",
+            "",
+            "| Commit | Subject | Result |",
+            "|--------|---------|--------|",
+        ]
+        for review in self.reviews:
+            subject = review.commit.subject.replace("|", "\\|")
+            lines.append(f"| {review.commit.short} | {subject} | {review.verdict} |")
+        return "\n".join(lines)
+
+
+def default_commit_cache(git_dir: Path) -> ReviewCache:
+    """Per-commit reviews of a repository, keyed by patch id."""
+    return ReviewCache(git_dir / "code-review-pack" / "commits")
+
+
+def review_range(
+    rev_range: str,
+    commits: list[Commit],
+    patch_ids: dict[str, str],
+    review: Callable[[Commit], str],
+    cache: ReviewCache,
+    pack: str,
+    model: str,
+    jobs: int = DEFAULT_JOBS,
+    reuse: bool = True,
+    on_result: Callable[[CommitReview], None] | None = None,
+    context: str = "",
+) -> RangeReport:
+    """Review each unique patch in a range once, ``jobs`` at a time.
+
+    Args:
+        rev_range: The range, for the rollup heading.
+        commits: Commits in the range, oldest first.
+        patch_ids: Patch id of each non-empty commit, by sha.
+        review: Reviews one commit and returns the review text. ValueError
+            (e.g. the diff exceeds MAX_DIFF_SIZE) marks the commit SKIPPED;
+            other exceptions mark it FAILED. Called from worker threads.
+        cache: Where finished reviews are stored by patch id.
+        pack: Pack name, part of the cache key.
+        model: Model id, part of the cache key.
+        jobs: Maximum concurrent reviews.
+        reuse: Use reviews stored by earlier runs.
+        on_result: Called from the calling thread as each commit is settled.
+        context: context_key of the review context, part of the cache key.
+
+    Returns:
+        The report. Duplicates are settled once the commit they repeat is.
+    """
+    results: dict[str, CommitReview] = {}
+    first_by_patch: dict[str, Commit] = {}
+    to_review: list[tuple[Commit, str]] = []
+
+    def settle(result: CommitReview) -> None:
+        results[result.commit.sha] = result
+        if on_result:
+            on_result(result)
+
+    for commit in commits:
+        patch_id = patch_ids.get(commit.sha)
+        if patch_id is None:
+            settle(CommitReview(commit, EMPTY))
+        elif patch_id in first_by_patch:
+            continue
+        else:
+            first_by_patch[patch_id] = commit
+            cached = cache.get(cache_key(pack, model, patch_id, context)) if reuse else None
+            if cached is None:
+                to_review.append((commit, patch_id))
+            else:
+                settle(CommitReview(commit, CACHED, patch_id, cached))
+
+    def run(commit: Commit, patch_id: str) -> CommitReview:
+        try:
+            text = review(commit)
+        except ValueError as e:
+            return CommitReview(commit, SKIPPED, patch_id, str(e))
+        except Exception as e:
+            return CommitReview(commit, FAILED, patch_id, f"{type(e).__name__}: {e}")
+        # Store before reporting so an interrupt right after never loses the review
+        cache.put(cache_key(pack, model, patch_id, context), text)
+        return CommitReview(commit, REVIEWED, patch_id, text)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="range-review")
+    try:
+        pending: set[Future[CommitReview]] = {
+            executor.submit(run, commit, patch_id) for commit, patch_id in to_review
+        }
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                settle(future.result())
+    finally:
+        # On interrupt, drop queued reviews and let running ones finish into the cache
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    report = RangeReport(rev_range)
+    for commit in commits:
+        if commit.sha not in results:
+            original = first_by_patch[patch_ids[commit.sha]]
+            source = results[original.sha]
+            settle(
+                CommitReview(
+                    commit,
+                    DUPLICATE,
+                    source.patch_id,
+                    source.text,
+                    duplicate_of=original,
+                )
+            )
+        report.reviews.append(results[commit.sha])
+    return report
@@ -0,0 +1,608 @@
+"""Seeded-defect evaluation of review configurations (``code-review-pack eval``).
+
+A pack's ``evals/`` directory holds a corpus of diffs, each with labeled
+defects mapped to the pack's dimensions, and named configurations that vary
+the knobs that trade findings for tokens and time: checklist selection, the
+overlay, diff truncation, the diff filter, hunk clustering and the model
+settings. Each configuration reviews every case and is scored by which
+seeded defects the review's findings report, as recall per dimension next to
+input/output tokens and time. Cases whose review failed are reported as
+errors and left out of recall.
+
+Model responses can be recorded once and replayed, so scoring changes and
+reruns of an unchanged configuration cost nothing. A changed configuration
+changes the prompt and needs a live model, such as a local
+``openai-compatible`` server. Without any model, the ``stub`` mode reviews
+with StubBackend, a few deterministic pattern checks on the diff, which can
+only score configurations that change the diff.
+"""
+
+import hashlib
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from code_review_pack.backends import BackendError, Completion, ReviewBackend, ReviewSettings
+from code_review_pack.classify import (
+    CHARS_PER_TOKEN,
+    FilterRules,
+    classify_diff,
+    file_path,
+    split_file_diffs,
+    split_hunks,
+)
+from code_review_pack.clustering import ClusterSettings, cluster_diff
+from code_review_pack.ledger import percentile
+from code_review_pack.reviewer import build_prompt
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+STUB = "stub"
+MODES = (LIVE, RECORD, REPLAY, STUB)
+
+# Cases reviewed at once when --jobs is not given
+DEFAULT_JOBS = 4
+
+SEVERITIES = ("Critical", "Major", "Minor", "Info")
+
+# The heading (or bold line) opening a review's findings, and those closing them
+_FINDINGS = re.compile(r"^(?:(#{1,6})|\*\*)\s*(?:\d+\.\s*)?findings\b", re.IGNORECASE)
+_AFTER_FINDINGS = re.compile(
+    r"^(?:#{1,6}|\*\*)\s*(?:\d+\.\s*)?(recommendation|positive|summary|verdict)",
+    re.IGNORECASE,
+)
+_HEADING = re.compile(r"^(#{1,6})\s")
+# A line starting a finding: a heading, or a (list item with a) bold label that
+# is not a field such as **Suggestion:**
+_ENTRY_START = re.compile(r"^(?:#{1,6}\s|(?:[-*]|\d+[.)])?\s*\*\*(?![^*\n]*:\*\*)(?!.*?\*\*:))")
+_HUNK_START = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)")
+
+
+@dataclass
+class Defect:
+    """A seeded defect and how to recognize a review that found it.
+
+    Attributes:
+        id: Identifier, unique within its case.
+        dimension: Pack dimension the defect belongs to.
+        path: File containing the defect; the review must mention it.
+        patterns: Regular expressions (case-insensitive); one must match the review.
+    """
+
+    id: str
+    dimension: str
+    path: str
+    patterns: list[str]
+
+    def matches(self, finding: str) -> bool:
+        """Whether one finding names the defect's file and matches a pattern."""
+        if self.path not in finding and Path(self.path).name not in finding:
+            return False
+        return any(re.search(p, finding, re.IGNORECASE) for p in self.patterns)
+
+    def found_in(self, review: str) -> bool:
+        """Whether a single entry of the review's findings reports the defect.
+
+        Text outside the findings section (summary, positive observations)
+        never counts, nor does a file named in one finding and a pattern
+        matched in another.
+        """
+        return any(self.matches(finding) for finding in findings(review))
+
+
+def findings(review: str) -> list[str]:
+    """Split the findings section of a review into one text per finding.
+
+    A finding starts at a heading or at a line opening with a bold label
+    (``**Security** - `app.py:L3```), optionally as a list item; field labels
+    such as ``**Suggestion:**`` continue the current finding. A review
+    without a findings section has no findings.
+    """
+    entries: list[list[str]] = []
+    level: int | None = None
+    inside = False
+    for line in review.splitlines():
+        if not inside:
+            match = _FINDINGS.match(line)
+            if match:
+                inside = True
+                level = len(match.group(1)) if match.group(1) else None
+            continue
+        heading = _HEADING.match(line)
+        if _AFTER_FINDINGS.match(line) or (
+            heading and level is not None and len(heading.group(1)) <= level
+        ):
+            break
+        if _ENTRY_START.match(line) or not entries:
+            entries.append([])
+        entries[-1].append(line)
+    return ["\n".join(entry) for entry in entries]
+
+
+@dataclass
+class EvalCase:
+    """A diff with seeded defects."""
+
+    name: str
+    description: str
+    diff: str
+    defects: list[Defect]
+
+
+@dataclass
+class EvalConfig:
+    """A named review configuration from ``evals/configs.yaml``.
+
+    Attributes:
+        name: Configuration name.
+        checklists: Checklist names to include, or None for all.
+        overlay: Whether the pack overlay is included.
+        max_diff_chars: Truncate each diff to this many characters.
+        review_settings: Overrides of the pack's ``review_settings``.
+        diff_filter: Overrides of the pack's ``diff_filter``.
+        hunk_clustering: Overrides of the pack's ``hunk_clustering``.
+    """
+
+    name: str
+    checklists: list[str] | None = None
+    overlay: bool = True
+    max_diff_chars: int | None = None
+    review_settings: dict[str, Any] = field(default_factory=dict)
+    diff_filter: dict[str, Any] = field(default_factory=dict)
+    hunk_clustering: dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(cls, name: str, config: dict[str, Any] | None) -> "EvalConfig":
+        """Build a configuration from its ``configs.yaml`` entry.
+
+        Raises:
+            ValueError: If the entry has unknown keys.
+        """
+        config = config or {}
+        unknown = set(config) - {
+            "checklists",
+            "overlay",
+            "max_diff_chars",
+            "review_settings",
+            "diff_filter",
+            "hunk_clustering",
+        }
+        if unknown:
+            raise ValueError(f"Unknown keys in eval config {name}: {', '.join(sorted(unknown))}")
+        return cls(
+            name=name,
+            checklists=config.get("checklists"),
+            overlay=bool(config.get("overlay", True)),
+            max_diff_chars=config.get("max_diff_chars"),
+            review_settings=config.get("review_settings") or {},
+            diff_filter=config.get("diff_filter") or {},
+            hunk_clustering=config.get("hunk_clustering") or {},
+        )
+
+
+    @property
+    def changes_prompt_only(self) -> bool:
+        """Whether the config changes only the overlay, checklists or model settings.
+
+        Such a config sends the same diff as the pack as shipped.
+        """
+        diff = self.max_diff_chars is not None or self.diff_filter or self.hunk_clustering
+        prompt = self.checklists is not None or not self.overlay or self.review_settings
+        return bool(prompt) and not diff
+
+
+def load_corpus(evals_path: Path, dimensions: list[str] | None = None) -> list[EvalCase]:
+    """Load ``evals/cases/*.yaml``.
+
+    Args:
+        evals_path: The pack's ``evals`` directory.
+        dimensions: Valid dimension names; defects outside them are rejected.
+
+    Raises:
+        ValueError: If a case is malformed or uses an unknown dimension.
+    """
+    cases = []
+    for path in sorted((evals_path / "cases").glob("*.yaml")):
+        with open(path, encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+        try:
+            defects = [
+                Defect(d["id"], d["dimension"], d["path"], list(d["patterns"]))
+                for d in data["defects"]
+            ]
+            case = EvalCase(path.stem, data.get("description", ""), data["diff"], defects)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid eval case {path.name}: missing {e}") from e
+        for defect in defects:
+            if dimensions is not None and defect.dimension not in dimensions:
+                raise ValueError(
+                    f"Eval case {path.name}: unknown dimension {defect.dimension!r}"
+                )
+        cases.append(case)
+    return cases
+
+
+def load_configs(evals_path: Path) -> list[EvalConfig]:
+    """Load ``evals/configs.yaml``; a lone ``baseline`` if there is none.
+
+    Raises:
+        ValueError: If a configuration is invalid.
+    """
+    path = evals_path / "configs.yaml"
+    if not path.exists():
+        return [EvalConfig("baseline")]
+    with open(path, encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    return [EvalConfig.from_config(name, c) for name, c in (data.get("configs") or {}).items()]
+
+
+def recording_key(settings: ReviewSettings, prompt: str) -> str:
+    """Content hash identifying a model response to a prompt."""
+    digest = hashlib.sha256()
+    for part in (settings.ai_provider, settings.model, str(settings.max_tokens),
+                 str(settings.temperature), prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class RecordingBackend:
+    """Passes prompts to a backend and stores each Completion as ``<root>/<key>.json``."""
+
+    def __init__(self, backend: ReviewBackend, root: Path) -> None:
+        self.backend = backend
+        self.settings = backend.settings
+        self.root = root
+
+    def complete(self, prompt: str) -> Completion:
+        completion = self.backend.complete(prompt)
+        self.root.mkdir(parents=True, exist_ok=True)
+        key = recording_key(self.settings, prompt)
+        tmp = self.root / f"{key}.tmp"
+        tmp.write_text(json.dumps(asdict(completion), indent=2), encoding="utf-8")
+        tmp.replace(self.root / f"{key}.json")
+        return completion
+
+
+class ReplayBackend:
+    """Answers prompts from responses stored by RecordingBackend."""
+
+    def __init__(self, settings: ReviewSettings, root: Path) -> None:
+        self.settings = settings
+        self.root = root
+
+    def complete(self, prompt: str) -> Completion:
+        path = self.root / f"{recording_key(self.settings, prompt)}.json"
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise BackendError(
+                f"No recorded response for this prompt in {self.root}; run with --mode record"
+            ) from None
+        return Completion(**data)
+
+
+@dataclass(frozen=True)
+class StubCheck:
+    """A pattern StubBackend reports as a finding when added lines match it.
+
+    Attributes:
+        severity: One of SEVERITIES.
+        dimension: Dimension named in the finding.
+        pattern: Regex searched in a file's added lines, joined by newlines.
+        issue: Finding text.
+        suggestion: Suggestion text.
+        paths: Glob the file's path must match.
+        requires: Regex that must also match somewhere in the file's added
+            or context lines.
+    """
+
+    severity: str
+    dimension: str
+    pattern: str
+    issue: str
+    suggestion: str
+    paths: str = "*"
+    requires: str | None = None
+
+
+STUB_CHECKS = (
+    StubCheck(
+        "Critical",
+        "Security",
+        r"""(?i)\bf["'](?:SELECT|INSERT|UPDATE|DELETE)\b.*\{""",
+        "SQL built with an f-string from caller input allows SQL injection.",
+        "Use parameterized queries and pass values as query parameters.",
+    ),
+    StubCheck(
+        "Critical",
+        "Azure AI Foundry",
+        r"""(?i)\b\w*(?:key|secret|token|password)\w*\s*=\s*["'][A-Za-z0-9+/_-]{16,}["']""",
+        "A hard-coded key is committed in source.",
+        "Authenticate with DefaultAzureCredential (Entra ID, managed identity).",
+    ),
+    StubCheck(
+        "Major",
+        "Operations",
+        r"except(?:\s+Exception)?\s*:\s*\n?\s*pass\b",
+        "A broad except swallows errors silently.",
+        "Catch the specific exception and log or re-raise it.",
+    ),
+    StubCheck(
+        "Major",
+        "Performance",
+        r"\brequests\.(?:get|post|put|patch|delete|request)\(",
+        "A blocking requests call inside async code blocks the event loop.",
+        "Use httpx.AsyncClient, or asyncio.to_thread for the blocking call.",
+        requires=r"\basync\s+def\b",
+    ),
+    StubCheck(
+        "Major",
+        "Dependencies",
+        r"(?m)^[A-Za-z0-9][A-Za-z0-9._-]*(?:\[[^\]]*\])?\s*$",
+        "A dependency is unpinned.",
+        "Pin the version of every dependency.",
+        paths="*requirements*.txt",
+    ),
+    StubCheck(
+        "Minor",
+        "Python Patterns",
+        r"def \w+\([^)]*=\s*(?:\[\]|\{\}|list\(\)|dict\(\)|set\(\))",
+        "A mutable default argument is shared between calls.",
+        "Default to None and create the container inside the function.",
+    ),
+)
+
+
+def _prompt_diff(prompt: str) -> str:
+    """The diff a build_prompt prompt asks to review."""
+    _, _, rest = prompt.partition("Review the following diff:\n\n```\n")
+    return rest.rpartition("\n```\n")[0]
+
+
+def _added_lines(chunk: str) -> tuple[list[tuple[int, str]], str]:
+    """A file diff's added lines with their new line numbers, and all post-image text."""
+    added: list[tuple[int, str]] = []
+    post: list[str] = []
+    _, hunks = split_hunks(chunk)
+    for hunk in hunks:
+        lines = hunk.splitlines()
+        match = _HUNK_START.match(lines[0])
+        number = int(match.group(1)) if match else 1
+        for line in lines[1:]:
+            if line.startswith("+"):
+                added.append((number, line[1:]))
+            if not line.startswith("-"):
+                post.append(line[1:])
+                number += 1
+    return added, "\n".join(post)
+
+
+class StubBackend:
+    """Reviews deterministically with STUB_CHECKS, without a model.
+
+    Each check that matches a file's added lines becomes one finding in the
+    pack's review format, so ``code-review-pack eval --mode stub`` runs the
+    whole harness offline. The stub only sees the diff in the prompt: it
+    measures configurations that change the diff (filtering, clustering,
+    truncation), while those that change the overlay, checklists or model
+    settings need a real model; see ``measures``.
+    """
+
+    def __init__(
+        self, settings: ReviewSettings, checks: tuple[StubCheck, ...] = STUB_CHECKS
+    ) -> None:
+        self.settings = settings
+        self.checks = checks
+
+    @staticmethod
+    def measures(config: EvalConfig) -> bool:
+        """Whether stub reviews can score a configuration."""
+        return not config.changes_prompt_only
+
+    def review(self, diff: str) -> str:
+        """The review text for a diff."""
+        found: dict[str, list[str]] = {severity: [] for severity in SEVERITIES}
+        for chunk in split_file_diffs(diff):
+            path = file_path(chunk)
+            if path is None:
+                continue
+            added, post = _added_lines(chunk)
+            text = "\n".join(line for _, line in added)
+            for check in self.checks:
+                if not fnmatch(path, check.paths):
+                    continue
+                if check.requires and not re.search(check.requires, post):
+                    continue
+                match = re.search(check.pattern, text)
+                if not match:
+                    continue
+                line = added[text.count("\n", 0, match.start())][0]
+                found[check.severity].append(
+                    f"**{check.dimension}** - `{path}:L{line}`\n\n{check.issue}\n\n"
+                    f"**Suggestion:** {check.suggestion}"
+                )
+        total = sum(len(entries) for entries in found.values())
+        sections = "\n\n".join(
+            f"### {severity}\n\n" + ("\n\n".join(entries) if entries else "None")
+            for severity, entries in found.items()
+        )
+        blocking = found["Critical"] or found["Major"]
+        return (
+            f"## Summary\n\nStub review: {total} finding(s) from pattern checks.\n\n"
+            f"## Findings\n\n{sections}\n\n"
+            f"## Recommendation\n\n{'Request Changes' if blocking else 'Approve'}\n"
+        )
+
+    def complete(self, prompt: str) -> Completion:
+        start = time.perf_counter()
+        text = self.review(_prompt_diff(prompt))
+        return Completion(
+            text=text,
+            model="stub",
+            tokens_in=len(prompt) // CHARS_PER_TOKEN,
+            tokens_out=len(text) // CHARS_PER_TOKEN,
+            latency_ms=(time.perf_counter() - start) * 1000,
+        )
+
+
+@dataclass
+class CaseResult:
+    """Outcome of reviewing one case under one configuration."""
+
+    case: str
+    found: list[Defect] = field(default_factory=list)
+    missed: list[Defect] = field(default_factory=list)
+    tokens_in: int = 0
+    tokens_out: int = 0
+    model_ms: float = 0.0
+    error: str | None = None
+
+
+@dataclass
+class ConfigResult:
+    """All case results for one configuration.
+
+    ``scored`` is False when the backend cannot tell the configuration apart
+    from the baseline (StubBackend and a prompt-only config); recall is then
+    None.
+    """
+
+    config: EvalConfig
+    cases: list[CaseResult] = field(default_factory=list)
+    wall_ms: float = 0.0
+    scored: bool = True
+
+    def _defects(self, dimension: str | None) -> tuple[int, int]:
+        found = sum(
+            1 for c in self.cases for d in c.found if dimension in (None, d.dimension)
+        )
+        total = found + sum(
+            1 for c in self.cases for d in c.missed if dimension in (None, d.dimension)
+        )
+        return found, total
+
+    def recall(self, dimension: str | None = None) -> float | None:
+        """Share of seeded defects found, overall or for one dimension.
+
+        Cases that errored count neither way.
+        """
+        if not self.scored:
+            return None
+        found, total = self._defects(dimension)
+        return found / total if total else None
+
+    @property
+    def tokens_in(self) -> int:
+        return sum(c.tokens_in for c in self.cases)
+
+    @property
+    def tokens_out(self) -> int:
+        return sum(c.tokens_out for c in self.cases)
+
+    @property
+    def errors(self) -> int:
+        return sum(c.error is not None for c in self.cases)
+
+    def model_ms_p50(self) -> float:
+        return percentile([c.model_ms for c in self.cases if c.error is None], 50)
+
+    def to_dict(self, dimensions: list[str]) -> dict[str, Any]:
+        """JSON-ready summary, for plotting recall against cost."""
+        return {
+            "config": asdict(self.config),
+            "scored": self.scored,
+            "recall": self.recall(),
+            "recall_by_dimension": {d: self.recall(d) for d in dimensions},
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "model_ms_p50": self.model_ms_p50(),
+            "wall_ms": self.wall_ms,
+            "errors": self.errors,
+            "cases": [
+                {
+                    "case": c.case,
+                    "found": [d.id for d in c.found],
+                    "missed": [d.id for d in c.missed],
+                    "tokens_in": c.tokens_in,
+                    "tokens_out": c.tokens_out,
+                    "model_ms": c.model_ms,
+                    "error": c.error,
+                }
+                for c in self.cases
+            ],
+        }
+
+
+def _merged(base: dict[str, Any] | None, overrides: dict[str, Any]) -> dict[str, Any]:
+    return {**(base or {}), **overrides}
+
+
+def run_config(
+    cases: list[EvalCase],
+    config: EvalConfig,
+    pack_config: dict[str, Any],
+    overlay: str,
+    checklists: str,
+    backend: ReviewBackend,
+    jobs: int = DEFAULT_JOBS,
+) -> ConfigResult:
+    """Review every case under one configuration and score the reviews.
+
+    Args:
+        cases: The corpus.
+        config: The configuration.
+        pack_config: The ``pack`` block of pack.yaml; ``diff_filter`` and
+            ``hunk_clustering`` are taken from it with the config's overrides.
+        overlay: Pack overlay, already dropped if the config excludes it.
+        checklists: Checklists selected for the config.
+        backend: Backend built from the config's settings.
+        jobs: Maximum concurrent reviews.
+    """
+    rules = FilterRules.from_config(_merged(pack_config.get("diff_filter"), config.diff_filter))
+    clustering = ClusterSettings.from_config(
+        _merged(pack_config.get("hunk_clustering"), config.hunk_clustering)
+    )
+
+    def run(case: EvalCase) -> CaseResult:
+        diff = cluster_diff(classify_diff(case.diff, rules).diff, clustering).diff
+        if config.max_diff_chars is not None:
+            diff = diff[: config.max_diff_chars]
+        result = CaseResult(case.name)
+        try:
+            completion = backend.complete(build_prompt(diff, overlay, checklists))
+        except Exception as e:
+            # Neither found nor missed, so the case stays out of recall
+            result.error = f"{type(e).__name__}: {e}"
+            return result
+        for defect in case.defects:
+            (result.found if defect.found_in(completion.text) else result.missed).append(defect)
+        result.tokens_in = completion.tokens_in
+        result.tokens_out = completion.tokens_out
+        # Recorded latency when replaying, so time comparisons still hold
+        result.model_ms = completion.latency_ms
+        return result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        results = list(executor.map(run, cases))
+    return ConfigResult(config, results, wall_ms=(time.perf_counter() - start) * 1000)
+
+
+def config_settings(pack_config: dict[str, Any], config: EvalConfig) -> ReviewSettings:
+    """Review settings of a configuration: the pack's, with the config's overrides.
+
+    Raises:
+        ValueError: If the resulting settings are invalid.
+    """
+    return ReviewSettings.from_config(
+        _merged(pack_config.get("review_settings"), config.review_settings)
+    )
@@ -0,0 +1,217 @@
+"""Git object access through persistent ``git cat-file --batch`` processes.
+
+Reading file contents with one ``git show`` per file costs a process spawn
+each; on a large PR that is hundreds of spawns. GitObjectReader keeps a
+``git cat-file --batch`` process open for the whole run and reads objects
+straight from its stdout pipe. The diff filter uses it to look at the top of
+changed files for generated-code markers, both in the CLI and in the Action,
+where ai_review.py imports this module from ``.github/scripts/`` (see
+ACTION_SUPPORT_MODULES in cli.py).
+"""
+
+import subprocess
+import threading
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+# Chunk size for GitObjectReader.stream
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Bytes returned by GitObjectReader.read_head
+HEAD_SIZE = 4096
+
+
+class GitError(Exception):
+    """Raised when a git command fails."""
+
+    pass
+
+
+def _stop(proc: subprocess.Popen[bytes]) -> None:
+    """Close a ``git cat-file`` process's pipes and wait for it to exit."""
+    try:
+        if proc.stdin:
+            proc.stdin.close()
+    except OSError:
+        # git already exited and a buffered request could not be flushed
+        pass
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+    for pipe in (proc.stdout, proc.stderr):
+        if pipe:
+            pipe.close()
+
+
+class GitObjectReader:
+    """Reads git objects by id or revision (``HEAD:path``, ``<blob-id>``).
+
+    Each read checks a ``git cat-file`` process out of a small pool and
+    returns it when done, so one reader can be shared between threads and an
+    open stream only ties up its own process. Processes start on first use
+    and are stopped by ``close()`` or when used as a context manager.
+
+    Args:
+        cwd: Repository directory. Defaults to the current directory.
+    """
+
+    def __init__(self, cwd: Path | None = None) -> None:
+        self.cwd = cwd
+        self._procs: list[subprocess.Popen[bytes]] = []
+        self._idle: list[subprocess.Popen[bytes]] = []
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "GitObjectReader":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop every ``git cat-file`` process."""
+        with self._lock:
+            procs, self._procs, self._idle = self._procs, [], []
+        for proc in procs:
+            _stop(proc)
+
+    def _checkout(self) -> subprocess.Popen[bytes]:
+        with self._lock:
+            while self._idle:
+                proc = self._idle.pop()
+                if proc.poll() is None:
+                    return proc
+                self._procs.remove(proc)
+                _stop(proc)
+        proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=self.cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        with self._lock:
+            self._procs.append(proc)
+        return proc
+
+    def _checkin(self, proc: subprocess.Popen[bytes], reusable: bool = True) -> None:
+        with self._lock:
+            if proc not in self._procs:
+                # The reader was closed while this process was checked out
+                reusable = False
+            elif reusable and proc.poll() is None:
+                self._idle.append(proc)
+                return
+            else:
+                self._procs.remove(proc)
+        _stop(proc)
+
+    def _request(self, proc: subprocess.Popen[bytes], rev: str) -> int:
+        """Send one request and parse the header. Returns the object size.
+
+        Raises:
+            GitError: If the object does not exist or git failed.
+        """
+        assert proc.stdin is not None and proc.stdout is not None
+        try:
+            proc.stdin.write(rev.encode("utf-8") + b"\n")
+            proc.stdin.flush()
+        except BrokenPipeError:
+            pass
+        header = proc.stdout.readline()
+        if not header:
+            stderr = proc.stderr.read().decode("utf-8", "replace") if proc.stderr else ""
+            raise GitError(f"git cat-file --batch failed: {stderr.strip()}")
+        text = header.decode("utf-8", "replace").rstrip("\n")
+        if text.endswith((" missing", " ambiguous")):
+            raise GitError(f"git cat-file: {text}")
+        _, _, size = text.rsplit(" ", 2)
+        return int(size)
+
+    def read(self, rev: str) -> bytes:
+        """Return an object's full contents.
+
+        Raises:
+            GitError: If the object does not exist or git failed.
+        """
+        return b"".join(self.stream(rev, chunk_size=0))
+
+    def read_text(self, rev: str, encoding: str = "utf-8") -> str:
+        """Return an object's contents decoded as text (invalid bytes replaced)."""
+        return self.read(rev).decode(encoding, "replace")
+
+    def read_head(self, rev: str, size: int = HEAD_SIZE) -> bytes:
+        """Return the first ``size`` bytes of an object.
+
+        Raises:
+            GitError: If the object does not exist or git failed.
+        """
+        head = bytearray()
+        stream = self.stream(rev, chunk_size=size)
+        try:
+            for chunk in stream:
+                head += chunk[: size - len(head)]
+                if len(head) >= size:
+                    break
+        finally:
+            stream.close()
+        return bytes(head)
+
+    def head_reader(self, rev: str) -> Callable[[str], str | None]:
+        """``read_head`` for paths at ``rev``, as classify_diff's ``read_head``.
+
+        Paths that do not exist at ``rev`` (deleted files) read as None.
+        """
+
+        def read_head(path: str) -> str | None:
+            try:
+                return self.read_head(f"{rev}:{path}").decode("utf-8", "replace")
+            except GitError:
+                return None
+
+        return read_head
+
+    def stream(self, rev: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[memoryview]:
+        """Yield an object's contents in chunks read straight from the pipe.
+
+        Each chunk is a view into a reused buffer and is only valid until the
+        next chunk is requested; ``chunk_size=0`` yields the whole object at
+        once. A stream closed early drains the rest of the object.
+
+        Raises:
+            GitError: If the object does not exist or git failed.
+        """
+        if "\n" in rev:
+            raise ValueError(f"Invalid revision: {rev!r}")
+        proc = self._checkout()
+        reusable = False
+        try:
+            remaining = self._request(proc, rev)
+            assert proc.stdout is not None
+            reusable = True
+            size = remaining if chunk_size <= 0 else min(chunk_size, remaining)
+            buffer = memoryview(bytearray(max(size, 1)))
+            try:
+                while remaining:
+                    n = proc.stdout.readinto(buffer[: min(len(buffer), remaining)])
+                    if not n:
+                        reusable = False
+                        raise GitError(f"git cat-file: truncated object {rev}")
+                    remaining -= n
+                    yield buffer[:n]
+            finally:
+                # Drain whatever the caller did not consume to keep the stream aligned
+                while remaining and reusable:
+                    n = proc.stdout.readinto(buffer[: min(len(buffer), remaining)])
+                    if not n:
+                        reusable = False
+                    remaining -= n
+                if reusable:
+                    proc.stdout.read(1)  # trailing newline
+        except GitError as e:
+            # A missing object leaves the process usable; a failed one does not
+            reusable = str(e).endswith((" missing", " ambiguous"))
+            raise
+        finally:
+            self._checkin(proc, reusable)
@@ -0,0 +1,277 @@
+"""Local SQLite ledger of review runs, for latency and cost trends.
+
+Every ``review`` and GitHub Action run appends one row. Writes are a single
+INSERT in WAL mode; every COMPACT_EVERY rows, records older than
+RETENTION_DAYS are deleted and freed pages are returned to the filesystem.
+
+Standard library only; see ACTION_SUPPORT_MODULES in cli.py.
+"""
+
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Environment variable overriding the ledger location ("off" disables it)
+LEDGER_ENV = "CODE_REVIEW_PACK_LEDGER"
+
+# Delete records older than this when compacting
+RETENTION_DAYS = 365
+
+# Compact once every this many inserts
+COMPACT_EVERY = 500
+
+GROUP_KEYS = ("pack", "model", "repo", "day", "week", "month")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    repo TEXT,
+    pack TEXT,
+    pack_version TEXT,
+    model TEXT,
+    diff_size INTEGER NOT NULL DEFAULT 0,
+    tokens_in INTEGER NOT NULL DEFAULT 0,
+    tokens_out INTEGER NOT NULL DEFAULT 0,
+    tokens_cached INTEGER NOT NULL DEFAULT 0,
+    duration_ms REAL NOT NULL DEFAULT 0,
+    timings TEXT NOT NULL DEFAULT '{}',
+    retries INTEGER NOT NULL DEFAULT 0,
+    outcome TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reviews_created_at ON reviews (created_at);
+"""
+
+_GROUP_EXPRESSIONS = {
+    "pack": "COALESCE(pack, '-')",
+    "model": "COALESCE(model, '-')",
+    "repo": "COALESCE(repo, '-')",
+    "day": "strftime('%Y-%m-%d', created_at, 'unixepoch')",
+    "week": "strftime('%Y-W%W', created_at, 'unixepoch')",
+    "month": "strftime('%Y-%m', created_at, 'unixepoch')",
+}
+
+
+@dataclass
+class ReviewRecord:
+    """One review run, as stored in the ledger.
+
+    Timings are wall-clock milliseconds per phase (e.g. ``diff``, ``filter``,
+    ``model``). ``outcome`` is ``ok``, ``empty``, ``too_large`` or
+    ``error:<ExceptionName>``.
+    """
+
+    source: str
+    repo: str | None = None
+    pack: str | None = None
+    pack_version: str | None = None
+    model: str | None = None
+    diff_size: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    tokens_cached: int = 0
+    timings: dict[str, float] = field(default_factory=dict)
+    retries: int = 0
+    outcome: str = "ok"
+    created_at: float = field(default_factory=time.time)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block of work and add it to ``timings[name]``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+    @property
+    def duration_ms(self) -> float:
+        return sum(self.timings.values())
+
+
+def default_ledger_path() -> Path | None:
+    """Return the ledger location, or None if the ledger is disabled."""
+    override = os.environ.get(LEDGER_ENV)
+    if override:
+        return None if override.lower() == "off" else Path(override)
+    state_home = os.environ.get("XDG_STATE_HOME") or Path.home() / ".local" / "state"
+    return Path(state_home) / "code-review-pack" / "ledger.sqlite3"
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """Open (and create if needed) the ledger database."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5.0)
+    # auto_vacuum only takes effect before the first table is created
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def combine(paths: list[Path]) -> sqlite3.Connection:
+    """Open an in-memory ledger holding the records of several ledger files.
+
+    Used to aggregate the per-run ledgers that GitHub Action runs upload as
+    artifacts.
+    """
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(_SCHEMA)
+    columns = ", ".join(
+        row[1] for row in conn.execute("PRAGMA table_info(reviews)") if row[1] != "id"
+    )
+    for path in paths:
+        conn.execute("ATTACH DATABASE ? AS source", (str(path),))
+        try:
+            with conn:
+                conn.execute(
+                    f"INSERT INTO reviews ({columns}) SELECT {columns} FROM source.reviews"
+                )
+        finally:
+            conn.execute("DETACH DATABASE source")
+    return conn
+
+
+def compact(conn: sqlite3.Connection, retention_days: int = RETENTION_DAYS) -> int:
+    """Delete expired records and release free pages. Returns rows deleted."""
+    cutoff = time.time() - retention_days * 86400
+    with conn:
+        deleted = conn.execute("DELETE FROM reviews WHERE created_at < ?", (cutoff,)).rowcount
+    conn.execute("PRAGMA incremental_vacuum")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return deleted
+
+
+def append(record: ReviewRecord, path: Path | None = None) -> None:
+    """Append a record to the ledger.
+
+    Failures are reported on stderr and otherwise ignored: the ledger must
+    never fail a review.
+    """
+    path = path or default_ledger_path()
+    if path is None:
+        return
+    try:
+        conn = connect(path)
+        try:
+            row = asdict(record)
+            row["timings"] = json.dumps({k: round(v, 1) for k, v in record.timings.items()})
+            row["duration_ms"] = round(record.duration_ms, 1)
+            columns = ", ".join(row)
+            placeholders = ", ".join(f":{name}" for name in row)
+            with conn:
+                cursor = conn.execute(
+                    f"INSERT INTO reviews ({columns}) VALUES ({placeholders})", row
+                )
+            if cursor.lastrowid and cursor.lastrowid % COMPACT_EVERY == 0:
+                compact(conn)
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError) as e:
+        print(f"Warning: could not write review ledger {path}: {e}", file=sys.stderr)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+@dataclass
+class StatsRow:
+    """Aggregated ledger statistics for one group."""
+
+    group: tuple[str, ...]
+    runs: int
+    failures: int
+    p50_ms: float
+    p95_ms: float
+    tokens_in: int
+    tokens_out: int
+    tokens_cached: int
+    retries: int
+
+
+def stats(
+    conn: sqlite3.Connection,
+    by: tuple[str, ...] = ("pack",),
+    since: float | None = None,
+) -> list[StatsRow]:
+    """Aggregate latency percentiles and token totals.
+
+    Args:
+        conn: Open ledger connection.
+        by: Group keys, any of GROUP_KEYS.
+        since: Only include records created at or after this Unix timestamp.
+
+    Raises:
+        ValueError: If an unknown group key is given.
+    """
+    unknown = [key for key in by if key not in _GROUP_EXPRESSIONS]
+    if unknown:
+        raise ValueError(
+            f"Unknown group key(s): {', '.join(unknown)}. Valid keys: {', '.join(GROUP_KEYS)}"
+        )
+    group_sql = ", ".join(_GROUP_EXPRESSIONS[key] for key in by) or "'all'"
+    rows = conn.execute(
+        f"SELECT {group_sql}, duration_ms, outcome, tokens_in, tokens_out, tokens_cached, retries "
+        "FROM reviews WHERE created_at >= ? ORDER BY created_at",
+        (since or 0,),
+    ).fetchall()
+
+    width = max(len(by), 1)
+    groups: dict[tuple[str, ...], list[tuple]] = {}
+    for row in rows:
+        groups.setdefault(tuple(row[:width]), []).append(row[width:])
+
+    result = []
+    for group, records in sorted(groups.items()):
+        durations = [r[0] for r in records if r[1] == "ok"]
+        result.append(
+            StatsRow(
+                group=group,
+                runs=len(records),
+                failures=sum(1 for r in records if r[1].startswith("error")),
+                p50_ms=percentile(durations, 50),
+                p95_ms=percentile(durations, 95),
+                tokens_in=sum(r[2] for r in records),
+                tokens_out=sum(r[3] for r in records),
+                tokens_cached=sum(r[4] for r in records),
+                retries=sum(r[5] for r in records),
+            )
+        )
+    return result
+
+
+def parse_since(value: str) -> float:
+    """Parse a relative window (``30d``, ``12h``, ``2w``) or ISO date into a timestamp.
+
+    Raises:
+        ValueError: If the value is not understood.
+    """
+    units = {"h": 3600, "d": 86400, "w": 7 * 86400}
+    if value[:-1].isdigit() and value[-1:] in units:
+        return time.time() - int(value[:-1]) * units[value[-1]]
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(
+            f"Invalid --since value: {value!r}. Use e.g. 30d, 12h, 2w or 2026-01-31."
+        ) from None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
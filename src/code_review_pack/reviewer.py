@@ -1,55 +1,269 @@
 #!/usr/bin/env python3
 """Local code reviewer using Claude."""
 
+import asyncio
 import subprocess
+import threading
 from pathlib import Path
 
-from anthropic import Anthropic
+import yaml
+from anthropic import Anthropic, AsyncAnthropic
+
+from code_review_pack.backends import (
+    ANTHROPIC,
+    AsyncReviewBackend,
+    Completion,
+    ReviewBackend,
+    ReviewSettings,
+    get_async_backend,
+    get_backend,
+)
+from code_review_pack.classify import FilterRules
+from code_review_pack.clustering import ClusterSettings
+from code_review_pack.gitobjects import GitError
+from code_review_pack.ledger import ReviewRecord
 
 # Maximum diff size to send to the API (characters)
 # ~100k chars is roughly 25k tokens, well within Claude's context window
 MAX_DIFF_SIZE = 100_000
 
-# Timeout for API calls (seconds)
-API_TIMEOUT = 120.0
+# git arguments of the diff helpers, shared by their sync and async variants
+_STAGED_DIFF = ["diff", "--cached"]
+_HEAD_DIFF = ["diff", "HEAD"]
+_WORKING_DIFF = ["diff"]
 
 
-class GitError(Exception):
-    """Raised when a git command fails."""
+def _range_diff_args(rev_range: str) -> list[str]:
+    return ["diff", rev_range]
 
-    pass
+
+def _commit_diff_args(sha: str) -> list[str]:
+    return ["show", "--format=", "--no-color", sha]
+
+
+def _git(args: list[str]) -> str:
+    """Run git in the current directory and return its output.
+
+    Raises:
+        GitError: If the git command fails.
+    """
+    result = subprocess.run(["git", *args], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise GitError(f"git {' '.join(args)} failed: {result.stderr}")
+    return result.stdout
 
 
 def get_staged_diff() -> str:
     """Get diff of staged changes.
 
+    Raises:
+        GitError: If the git command fails.
+    """
+    return _git(_STAGED_DIFF)
+
+
+def get_head_diff() -> str:
+    """Get diff of the working directory against HEAD (staged and unstaged).
+
+    Raises:
+        GitError: If the git command fails.
+    """
+    return _git(_HEAD_DIFF)
+
+
+def get_git_dir() -> Path:
+    """Get the repository's .git directory.
+
     Raises:
         GitError: If the git command fails.
     """
     result = subprocess.run(
-        ["git", "diff", "--cached"],
+        ["git", "rev-parse", "--absolute-git-dir"],
         capture_output=True,
         text=True,
     )
     if result.returncode != 0:
-        raise GitError(f"git diff --cached failed: {result.stderr}")
-    return result.stdout
+        raise GitError(f"git rev-parse --absolute-git-dir failed: {result.stderr}")
+    return Path(result.stdout.strip())
+
+
+def get_head_changed_files() -> list[str]:
+    """Get paths that differ from HEAD, relative to the repository root.
+
+    Raises:
+        GitError: If the git command fails.
+    """
+    result = subprocess.run(
+        ["git", "diff", "HEAD", "--name-only"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise GitError(f"git diff HEAD --name-only failed: {result.stderr}")
+    return [f for f in result.stdout.splitlines() if f]
+
+
+def get_repo_root() -> Path | None:
+    """Get the root of the current repository, or None outside a git checkout."""
+    result = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    return Path(result.stdout.strip())
+
+
+def get_repo_name() -> str | None:
+    """Get the name of the current repository, or None outside a git checkout."""
+    root = get_repo_root()
+    return root.name if root else None
 
 
 def get_working_diff() -> str:
     """Get diff of working directory changes.
 
+    Raises:
+        GitError: If the git command fails.
+    """
+    return _git(_WORKING_DIFF)
+
+
+def get_range_diff(rev_range: str) -> str:
+    """Get the combined diff of a commit range such as ``main..release``.
+
+    Raises:
+        GitError: If the git command fails.
+    """
+    return _git(_range_diff_args(rev_range))
+
+
+def range_end(rev_range: str) -> str | None:
+    """The revision a range diff ends at: ``B`` of ``A..B`` or ``A...B``.
+
+    None if the diff ends at the working tree (no ``..``).
+    """
+    if ".." not in rev_range:
+        return None
+    return rev_range.split("..", 1)[1].lstrip(".") or "HEAD"
+
+
+def get_range_commits(rev_range: str) -> list[tuple[str, str]]:
+    """Get ``(sha, subject)`` of the non-merge commits in a range, oldest first.
+
     Raises:
         GitError: If the git command fails.
     """
     result = subprocess.run(
-        ["git", "diff"],
+        ["git", "log", "--reverse", "--no-merges", "--format=%H%x00%s", rev_range],
         capture_output=True,
         text=True,
     )
     if result.returncode != 0:
-        raise GitError(f"git diff failed: {result.stderr}")
-    return result.stdout
+        raise GitError(f"git log {rev_range} failed: {result.stderr}")
+    return [tuple(line.split("\0", 1)) for line in result.stdout.splitlines() if line]
+
+
+def get_patch_ids(rev_range: str) -> dict[str, str]:
+    """Map each non-merge commit in a range to its ``git patch-id --verbatim``.
+
+    Like ``--stable``, the id ignores line numbers, so a change applied at
+    another offset keeps its id; unlike it, whitespace counts, so commits
+    that differ only in indentation are not taken for the same change.
+    Needs git 2.39 or later. Commits that change nothing have no patch id
+    and are left out.
+
+    Raises:
+        GitError: If a git command fails.
+    """
+    log = subprocess.run(
+        ["git", "log", "-p", "--no-merges", "--no-color", rev_range],
+        capture_output=True,
+    )
+    if log.returncode != 0:
+        raise GitError(f"git log -p {rev_range} failed: {log.stderr.decode(errors='replace')}")
+    result = subprocess.run(
+        ["git", "patch-id", "--verbatim"],
+        input=log.stdout,
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        raise GitError(f"git patch-id failed: {result.stderr.decode(errors='replace')}")
+    patch_ids = {}
+    for line in result.stdout.decode().splitlines():
+        patch_id, sha = line.split()
+        patch_ids[sha] = patch_id
+    return patch_ids
+
+
+def get_commit_diff(sha: str) -> str:
+    """Get the diff a commit introduces against its first parent.
+
+    Raises:
+        GitError: If the git command fails.
+    """
+    return _git(_commit_diff_args(sha))
+
+
+async def _git_async(args: list[str], cwd: Path | None) -> str:
+    """Async _git, in ``cwd``."""
+    process = await asyncio.create_subprocess_exec(
+        "git",
+        *args,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise GitError(f"git {' '.join(args)} failed: {stderr.decode(errors='replace')}")
+    return stdout.decode(errors="replace")
+
+
+async def get_staged_diff_async(cwd: Path | None = None) -> str:
+    """Async get_staged_diff, for the repository at ``cwd`` (default: current directory).
+
+    Raises:
+        GitError: If the git command fails.
+    """
+    return await _git_async(_STAGED_DIFF, cwd)
+
+
+async def get_head_diff_async(cwd: Path | None = None) -> str:
+    """Async get_head_diff, for the repository at ``cwd`` (default: current directory).
+
+    Raises:
+        GitError: If the git command fails.
+    """
+    return await _git_async(_HEAD_DIFF, cwd)
+
+
+async def get_working_diff_async(cwd: Path | None = None) -> str:
+    """Async get_working_diff, for the repository at ``cwd`` (default: current directory).
+
+    Raises:
+        GitError: If the git command fails.
+    """
+    return await _git_async(_WORKING_DIFF, cwd)
+
+
+async def get_range_diff_async(rev_range: str, cwd: Path | None = None) -> str:
+    """Async get_range_diff, for the repository at ``cwd`` (default: current directory).
+
+    Raises:
+        GitError: If the git command fails.
+    """
+    return await _git_async(_range_diff_args(rev_range), cwd)
+
+
+async def get_commit_diff_async(sha: str, cwd: Path | None = None) -> str:
+    """Async get_commit_diff, for the repository at ``cwd`` (default: current directory).
+
+    Raises:
+        GitError: If the git command fails.
+    """
+    return await _git_async(_commit_diff_args(sha), cwd)
 
 
 def load_overlay(pack_path: Path) -> str:
@@ -60,30 +274,64 @@ def load_overlay(pack_path: Path) -> str:
     return ""
 
 
-def load_checklists(pack_path: Path) -> str:
-    """Load relevant checklists."""
+def load_checklists(pack_path: Path, names: list[str] | None = None) -> str:
+    """Load relevant checklists.
+
+    Args:
+        pack_path: The pack directory.
+        names: Checklist names (file stems) to load. Defaults to all of them.
+    """
     checklists_path = pack_path / "checklists"
     if not checklists_path.exists():
         return ""
 
     content = []
-    for checklist in checklists_path.iterdir():
-        if checklist.suffix == ".md":
+    for checklist in sorted(checklists_path.iterdir()):
+        if checklist.suffix == ".md" and (names is None or checklist.stem in names):
             content.append(f"## {checklist.stem}\n{checklist.read_text(encoding='utf-8')}")
 
     return "\n\n".join(content)
 
 
-def review_code(diff: str, overlay: str = "", checklists: str = "") -> str:
-    """Run code review on diff.
+def load_pack_config(pack_path: Path) -> dict:
+    """Load the ``pack`` block of pack.yaml, or an empty dict if there is none."""
+    pack_yaml = pack_path / "pack.yaml"
+    if not pack_yaml.exists():
+        return {}
+    with open(pack_yaml, encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    return config.get("pack", {})
 
-    Args:
-        diff: The git diff to review.
-        overlay: Optional pack overlay content.
-        checklists: Optional checklist content.
 
-    Returns:
-        The review text from Claude.
+def load_filter_rules(pack_path: Path) -> FilterRules:
+    """Load the pack's diff filter rules.
+
+    Raises:
+        ValueError: If the ``diff_filter`` block is invalid.
+    """
+    return FilterRules.from_config(load_pack_config(pack_path).get("diff_filter"))
+
+
+def load_cluster_settings(pack_path: Path) -> ClusterSettings:
+    """Load the pack's hunk clustering settings.
+
+    Raises:
+        ValueError: If the ``hunk_clustering`` block is invalid.
+    """
+    return ClusterSettings.from_config(load_pack_config(pack_path).get("hunk_clustering"))
+
+
+def load_review_settings(pack_path: Path) -> ReviewSettings:
+    """Load the pack's model backend settings.
+
+    Raises:
+        ValueError: If the ``review_settings`` block is invalid.
+    """
+    return ReviewSettings.from_config(load_pack_config(pack_path).get("review_settings"))
+
+
+def build_prompt(diff: str, overlay: str = "", checklists: str = "") -> str:
+    """Build the review prompt for a diff.
 
     Raises:
         ValueError: If the diff exceeds MAX_DIFF_SIZE.
@@ -95,9 +343,7 @@ def review_code(diff: str, overlay: str = "", checklists: str = "") -> str:
             "Consider reviewing smaller changesets."
         )
 
-    client = Anthropic()
-
-    prompt = f"""You are an expert code reviewer for Python AI agent solutions.
+    return f"""You are an expert code reviewer for Python AI agent solutions.
 
 {overlay}
 
@@ -118,11 +364,206 @@ Provide a structured review with:
 5. Positive observations
 """
 
-    message = client.messages.create(
-        model="claude-opus-4-5-20250514",
-        max_tokens=8192,
-        messages=[{"role": "user", "content": prompt}],
-        timeout=API_TIMEOUT,
-    )
 
-    return message.content[0].text
+def _record_completion(record: ReviewRecord, completion: Completion) -> None:
+    record.model = completion.model
+    record.tokens_in = completion.tokens_in
+    record.tokens_out = completion.tokens_out
+    record.tokens_cached = completion.tokens_cached
+    record.retries += completion.retries
+
+
+class ReviewSession:
+    """A model client shared by many reviews, sync or async.
+
+    The session builds its backends on first use and keeps them, so
+    concurrent reviews share one pooled HTTP connection instead of creating a
+    client per review. Close it with ``close()``/``aclose()`` or use it as a
+    context manager (``with`` or ``async with``).
+
+    Args:
+        settings: Model backend settings. Defaults to the hosted Claude API.
+        backend: Sync backend to use instead of building one from ``settings``.
+        async_backend: Async backend to use instead of building one from ``settings``.
+    """
+
+    def __init__(
+        self,
+        settings: ReviewSettings | None = None,
+        backend: ReviewBackend | None = None,
+        async_backend: AsyncReviewBackend | None = None,
+    ) -> None:
+        given = backend or async_backend
+        self.settings = settings or (given.settings if given else ReviewSettings())
+        self._backend = backend
+        self._async_backend = async_backend
+        # Backends built here are closed here; given ones belong to the caller
+        self._owned: list[ReviewBackend | AsyncReviewBackend] = []
+        self._closing: set[asyncio.Task[None]] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self) -> ReviewBackend:
+        with self._lock:
+            if self._backend is None:
+                # Retries are handled by the backend so they can be counted in the ledger
+                client = Anthropic(max_retries=0) if self.settings.ai_provider == ANTHROPIC else None
+                self._backend = get_backend(self.settings, anthropic_client=client)
+                self._owned.append(self._backend)
+            return self._backend
+
+    @property
+    def async_backend(self) -> AsyncReviewBackend:
+        with self._lock:
+            if self._async_backend is None:
+                client = (
+                    AsyncAnthropic(max_retries=0)
+                    if self.settings.ai_provider == ANTHROPIC
+                    else None
+                )
+                self._async_backend = get_async_backend(self.settings, anthropic_client=client)
+                self._owned.append(self._async_backend)
+            return self._async_backend
+
+    def review(
+        self,
+        diff: str,
+        overlay: str = "",
+        checklists: str = "",
+        record: ReviewRecord | None = None,
+    ) -> str:
+        """Review a diff. See review_code."""
+        prompt = build_prompt(diff, overlay, checklists)
+        backend = self.backend
+        record = record or ReviewRecord(source="api")
+        record.model = backend.settings.model
+        with record.phase("model"):
+            completion = backend.complete(prompt)
+        _record_completion(record, completion)
+        return completion.text
+
+    async def review_async(
+        self,
+        diff: str,
+        overlay: str = "",
+        checklists: str = "",
+        record: ReviewRecord | None = None,
+    ) -> str:
+        """Review a diff without blocking the event loop. See review_code."""
+        prompt = build_prompt(diff, overlay, checklists)
+        backend = self.async_backend
+        record = record or ReviewRecord(source="api")
+        record.model = backend.settings.model
+        with record.phase("model"):
+            completion = await backend.complete(prompt)
+        _record_completion(record, completion)
+        return completion.text
+
+    def _release(self, backend: object) -> object | None:
+        """Stop owning ``backend``; return it if the session built it."""
+        with self._lock:
+            if backend is not None and backend in self._owned:
+                self._owned.remove(backend)
+                return backend
+        return None
+
+    def close(self) -> None:
+        """Close the backends the session built.
+
+        Inside a running event loop (a plain ``with`` in a coroutine) the async
+        backend's close is scheduled on that loop; ``aclose()`` or ``async with``
+        wait for it instead. Outside one, the loop the async backend ran on has
+        ended and its connections cannot be closed cleanly, so it is dropped.
+        """
+        close = getattr(self._release(self._backend), "close", None)
+        if close:
+            close()
+        aclose = getattr(self._release(self._async_backend), "aclose", None)
+        if aclose:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            task = loop.create_task(aclose())
+            # The loop only keeps weak references to tasks
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def aclose(self) -> None:
+        """Close every backend the session built."""
+        close = getattr(self._release(self._backend), "close", None)
+        if close:
+            close()
+        aclose = getattr(self._release(self._async_backend), "aclose", None)
+        if aclose:
+            await aclose()
+
+    def __enter__(self) -> "ReviewSession":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "ReviewSession":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+
+def review_code(
+    diff: str,
+    overlay: str = "",
+    checklists: str = "",
+    record: ReviewRecord | None = None,
+    settings: ReviewSettings | None = None,
+    backend: ReviewBackend | None = None,
+    session: ReviewSession | None = None,
+) -> str:
+    """Run code review on diff.
+
+    Args:
+        diff: The git diff to review.
+        overlay: Optional pack overlay content.
+        checklists: Optional checklist content.
+        record: Optional ledger record to fill in with model, usage, retries
+            and the ``model`` phase timing.
+        settings: Model backend settings. Defaults to the hosted Claude API.
+        backend: Backend to use instead of building one from ``settings``.
+        session: Session to reuse across reviews; ``settings`` and ``backend``
+            are ignored when given.
+
+    Returns:
+        The review text from the model.
+
+    Raises:
+        ValueError: If the diff exceeds MAX_DIFF_SIZE.
+    """
+    if session is not None:
+        return session.review(diff, overlay, checklists, record)
+    with ReviewSession(settings, backend=backend) as session:
+        return session.review(diff, overlay, checklists, record)
+
+
+async def review_code_async(
+    diff: str,
+    overlay: str = "",
+    checklists: str = "",
+    record: ReviewRecord | None = None,
+    settings: ReviewSettings | None = None,
+    backend: AsyncReviewBackend | None = None,
+    session: ReviewSession | None = None,
+) -> str:
+    """Run code review on diff without blocking the event loop.
+
+    Takes the same arguments as review_code, with an async ``backend``.
+    Pass a shared ``session`` when running many reviews so they reuse its
+    connections.
+
+    Raises:
+        ValueError: If the diff exceeds MAX_DIFF_SIZE.
+    """
+    if session is not None:
+        return await session.review_async(diff, overlay, checklists, record)
+    async with ReviewSession(settings, async_backend=backend) as session:
+        return await session.review_async(diff, overlay, checklists, record)
@@ -0,0 +1,624 @@
+"""Self-hosted review service (``code-review-pack serve``).
+
+GitHub ``pull_request`` webhooks are written to a persistent SQLite queue. A
+pool of worker threads fetches each PR into a local bare mirror, reviews the
+diff and posts the result as a PR comment.
+
+A newer push to the same PR supersedes older queued jobs and cancels the
+in-flight one: a cancelled job stops at its next checkpoint (after fetch,
+before the model call, before posting) and never posts a stale review.
+Workers also respect a per-repository concurrency limit.
+
+Deliveries must be signed with the webhook secret. Repositories are always
+fetched from the configured GitHub host by ``owner/name``; the payload's
+clone URL is never used, so a delivery cannot send the token elsewhere.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+from code_review_pack import ledger
+from code_review_pack.backends import ReviewBackend, ReviewSettings
+from code_review_pack.classify import FilterRules, classify_diff
+from code_review_pack.clustering import ClusterSettings, cluster_diff
+from code_review_pack.gitobjects import GitError, GitObjectReader
+from code_review_pack.reviewer import MAX_DIFF_SIZE, ReviewSession, review_code
+
+# pull_request actions that trigger a review
+REVIEW_ACTIONS = ("opened", "synchronize", "reopened")
+
+# Seconds an idle worker waits before checking the queue again
+IDLE_WAIT = 1.0
+
+DEFAULT_API_URL = "https://api.github.com"
+
+# GitHub owner and repository names
+_REPO_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9-]*/[A-Za-z0-9._-]+$")
+_SHA = re.compile(r"^[0-9a-f]{40}([0-9a-f]{24})?$")
+# Characters and sequences git does not allow in ref names, plus ':' for refspecs
+_BAD_REF = re.compile(r"^-|[\s:~^?*\[\\]|\.\.|@\{")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SUPERSEDED = "superseded"
+CANCELLED = "cancelled"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    repo TEXT NOT NULL,
+    pr_number INTEGER NOT NULL,
+    head_sha TEXT NOT NULL,
+    base_ref TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE INDEX IF NOT EXISTS jobs_pr ON jobs (repo, pr_number);
+"""
+
+
+class JobCancelledError(Exception):
+    """Raised inside a worker when a newer push superseded its job."""
+
+    pass
+
+
+@dataclass
+class Job:
+    """One queued review of a pull request head."""
+
+    id: int
+    repo: str
+    pr_number: int
+    head_sha: str
+    base_ref: str
+    status: str
+
+
+class JobQueue:
+    """Persistent review queue stored in SQLite.
+
+    Claimed jobs count against their repository's limit until ``finish()``
+    is called for them, even if a newer push has already cancelled them:
+    their worker may still be inside the model call.
+
+    Args:
+        path: Database file. Jobs left ``running`` by a previous process are
+            put back in the queue when it is opened.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.changed = threading.Event()
+        # Repository of each claimed job whose worker has not called finish()
+        self._active: dict[int, str] = {}
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?",
+                (QUEUED, time.time(), RUNNING),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _job(self, row: tuple | None) -> Job | None:
+        return Job(*row) if row else None
+
+    _COLUMNS = "id, repo, pr_number, head_sha, base_ref, status"
+
+    def enqueue(self, repo: str, pr_number: int, head_sha: str, base_ref: str) -> Job:
+        """Queue a review, superseding older jobs for the same PR.
+
+        A redelivered event for a head that is already queued or running
+        returns the existing job instead of adding another.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._conn.execute(
+                    f"SELECT {self._COLUMNS} FROM jobs WHERE repo = ? AND pr_number = ? "
+                    "AND head_sha = ? AND status IN (?, ?)",
+                    (repo, pr_number, head_sha, QUEUED, RUNNING),
+                ).fetchone()
+                if existing:
+                    self._conn.execute("COMMIT")
+                    return Job(*existing)
+                for old, new in ((QUEUED, SUPERSEDED), (RUNNING, CANCELLED)):
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, updated_at = ? "
+                        "WHERE repo = ? AND pr_number = ? AND status = ?",
+                        (new, now, repo, pr_number, old),
+                    )
+                cursor = self._conn.execute(
+                    "INSERT INTO jobs (repo, pr_number, head_sha, base_ref, status, "
+                    "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (repo, pr_number, head_sha, base_ref, QUEUED, now, now),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.changed.set()
+        return Job(cursor.lastrowid, repo, pr_number, head_sha, base_ref, QUEUED)
+
+    def claim(self, max_per_repo: int) -> Job | None:
+        """Mark the oldest runnable job as running and return it.
+
+        A job is runnable if its repository has fewer than ``max_per_repo``
+        claimed jobs that are not finished.
+        """
+        with self._lock:
+            active: dict[str, int] = {}
+            for repo in self._active.values():
+                active[repo] = active.get(repo, 0) + 1
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    f"SELECT {self._COLUMNS} FROM jobs WHERE status = ? ORDER BY id", (QUEUED,)
+                )
+                row = next((r for r in rows if active.get(r[1], 0) < max_per_repo), None)
+                if row:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                        (RUNNING, time.time(), row[0]),
+                    )
+                    self._active[row[0]] = row[1]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        job = self._job(row)
+        if job:
+            job.status = RUNNING
+        return job
+
+    def status(self, job_id: int) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def check_current(self, job: Job) -> None:
+        """Raise JobCancelledError if a newer push cancelled this job."""
+        if self.status(job.id) != RUNNING:
+            raise JobCancelledError(f"{job.repo}#{job.pr_number} @ {job.head_sha[:7]} superseded")
+
+    def finish(self, job: Job, status: str, error: str | None = None) -> None:
+        """Record the final status of a claimed job (cancelled jobs stay cancelled).
+
+        Frees the job's slot in its repository's limit.
+        """
+        with self._lock:
+            self._active.pop(job.id, None)
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (status, error, time.time(), job.id, RUNNING),
+            )
+        self.changed.set()
+
+    def counts(self) -> dict[str, int]:
+        """Number of jobs per status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+            return dict(rows.fetchall())
+
+
+def validate_repo(repo: str) -> str:
+    """Return ``repo`` if it is a GitHub ``owner/name``.
+
+    Raises:
+        ValueError: If it is not.
+    """
+    name = repo.partition("/")[2]
+    if not _REPO_NAME.match(repo) or name in (".", "..") or name.endswith(".git"):
+        raise ValueError(f"Invalid repository name: {repo!r}")
+    return repo
+
+
+def server_url_for(api_url: str) -> str:
+    """The web and git root of a GitHub API root.
+
+    ``https://api.github.com`` maps to ``https://github.com``; a GitHub
+    Enterprise ``https://ghe.example.com/api/v3`` to ``https://ghe.example.com``.
+    """
+    parts = urlsplit(api_url)
+    host = parts.netloc.removeprefix("api.")
+    return f"{parts.scheme}://{host}"
+
+
+class GitHubClient:
+    """Minimal GitHub REST client for posting review comments.
+
+    Args:
+        token: Token with ``contents: read`` and ``pull-requests: write`` permission.
+        api_url: API root; point at a fake server in tests.
+        server_url: Web and git root repositories are fetched from. Defaults
+            to the one that goes with ``api_url``.
+    """
+
+    def __init__(
+        self,
+        token: str | None,
+        api_url: str = DEFAULT_API_URL,
+        server_url: str | None = None,
+    ) -> None:
+        self.token = token
+        self.api_url = api_url.rstrip("/")
+        self.server_url = (server_url or server_url_for(self.api_url)).rstrip("/")
+
+    def clone_url(self, repo: str) -> str:
+        """Fetch URL of a repository on the configured host.
+
+        Raises:
+            ValueError: If ``repo`` is not a valid ``owner/name``.
+        """
+        return f"{self.server_url}/{validate_repo(repo)}.git"
+
+    def git_env(self) -> dict[str, str]:
+        """Environment that authenticates git to the configured host only.
+
+        The token is passed in the environment rather than on the command
+        line, where other local users could read it.
+        """
+        env = dict(os.environ)
+        if self.token:
+            credentials = base64.b64encode(f"x-access-token:{self.token}".encode()).decode()
+            count = int(env.get("GIT_CONFIG_COUNT") or 0)
+            env["GIT_CONFIG_COUNT"] = str(count + 1)
+            env[f"GIT_CONFIG_KEY_{count}"] = f"http.{self.server_url}/.extraHeader"
+            env[f"GIT_CONFIG_VALUE_{count}"] = f"Authorization: Basic {credentials}"
+        return env
+
+    def post_comment(self, repo: str, pr_number: int, body: str) -> None:
+        """Post a PR comment.
+
+        Raises:
+            urllib.error.URLError: If the request fails.
+        """
+        url = f"{self.api_url}/repos/{repo}/issues/{pr_number}/comments"
+        headers = {
+            "Accept": "application/vnd.github.v3+json",
+            "Content-Type": "application/json",
+        }
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        data = json.dumps({"body": f"## 🤖 AI Code Review\n\n{body}"}).encode()
+        req = urllib.request.Request(url, data=data, headers=headers, method="POST")
+        with urllib.request.urlopen(req, timeout=30) as response:
+            response.read()
+
+
+class ReviewService:
+    """Worker pool that drains the job queue.
+
+    Args:
+        queue: Job queue.
+        workdir: Directory holding one bare mirror per repository.
+        github: Client used to post comments.
+        pack: Pack name, for the ledger.
+        overlay: Pack overlay content.
+        checklists: Pack checklist content.
+        rules: Diff filter rules.
+        clustering: Hunk clustering settings.
+        settings: Model backend settings.
+        backend: Backend to use instead of building one from ``settings``.
+        workers: Number of worker threads.
+        max_per_repo: Maximum concurrent reviews per repository.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        workdir: Path,
+        github: GitHubClient,
+        pack: str,
+        overlay: str = "",
+        checklists: str = "",
+        rules: FilterRules | None = None,
+        clustering: ClusterSettings | None = None,
+        settings: ReviewSettings | None = None,
+        backend: ReviewBackend | None = None,
+        workers: int = 2,
+        max_per_repo: int = 1,
+    ) -> None:
+        self.queue = queue
+        self.workdir = workdir
+        self.github = github
+        self.pack = pack
+        self.overlay = overlay
+        self.checklists = checklists
+        self.rules = rules
+        self.clustering = clustering
+        self.settings = settings or ReviewSettings()
+        # One client for all workers so reviews share its connections
+        self.session = ReviewSession(self.settings, backend=backend)
+        self.workers = workers
+        self.max_per_repo = max_per_repo
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._repo_locks: dict[str, threading.Lock] = {}
+        self._repo_locks_guard = threading.Lock()
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"review-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self.queue.changed.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+        self.session.close()
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            job = self.queue.claim(self.max_per_repo)
+            if job is None:
+                self.queue.changed.wait(IDLE_WAIT)
+                self.queue.changed.clear()
+                continue
+            self.process(job)
+
+    def process(self, job: Job) -> None:
+        """Review one claimed job and record its outcome."""
+        record = ledger.ReviewRecord(source="service", repo=job.repo, pack=self.pack)
+        try:
+            self._review(job, record)
+            self.queue.finish(job, DONE)
+        except JobCancelledError:
+            record.outcome = "cancelled"
+            self.queue.finish(job, CANCELLED)
+        except Exception as e:
+            record.outcome = f"error:{type(e).__name__}"
+            self.queue.finish(job, FAILED, error=f"{type(e).__name__}: {e}")
+        finally:
+            ledger.append(record)
+
+    def _review(self, job: Job, record: ledger.ReviewRecord) -> None:
+        with record.phase("diff"):
+            diff = self._fetch_diff(job)
+        self.queue.check_current(job)
+
+        if not diff.strip():
+            record.outcome = "empty"
+            return
+
+        with record.phase("filter"), GitObjectReader(self._mirror(job.repo)) as objects:
+            diff = classify_diff(diff, self.rules, objects.head_reader(job.head_sha)).diff
+        with record.phase("cluster"):
+            clustered = cluster_diff(diff, self.clustering)
+        diff = clustered.diff
+        record.diff_size = len(diff)
+        if len(diff) > MAX_DIFF_SIZE:
+            record.outcome = "too_large"
+            body = (
+                f"Diff too large ({len(diff):,} characters, max {MAX_DIFF_SIZE:,}). "
+                "Skipping AI review."
+            )
+        else:
+            body = review_code(
+                diff,
+                self.overlay,
+                self.checklists,
+                record=record,
+                session=self.session,
+            )
+            if clustered.clusters:
+                body = f"{body}\n\n{clustered.report_section()}"
+
+        self.queue.check_current(job)
+        with record.phase("publish"):
+            self.github.post_comment(job.repo, job.pr_number, body)
+
+    def _repo_lock(self, repo: str) -> threading.Lock:
+        with self._repo_locks_guard:
+            return self._repo_locks.setdefault(repo, threading.Lock())
+
+    def _git(self, mirror: Path, *args: str, auth: bool = False) -> str:
+        result = subprocess.run(
+            ["git", f"--git-dir={mirror}", *args],
+            capture_output=True,
+            text=True,
+            env=self.github.git_env() if auth else None,
+        )
+        if result.returncode != 0:
+            raise GitError(f"git {args[0]} failed: {result.stderr.strip()}")
+        return result.stdout
+
+    def _mirror(self, repo: str) -> Path:
+        return self.workdir / f"{repo.replace('/', '__')}.git"
+
+    def _fetch_diff(self, job: Job) -> str:
+        """Fetch the PR into the repository's bare mirror and return its diff.
+
+        Only the objects are needed for a diff, so nothing is checked out.
+        """
+        mirror = self._mirror(job.repo)
+        base = f"refs/remotes/origin/{job.base_ref}"
+        with self._repo_lock(job.repo):
+            if not mirror.exists():
+                mirror.parent.mkdir(parents=True, exist_ok=True)
+                subprocess.run(
+                    ["git", "init", "--quiet", "--bare", str(mirror)], check=True, capture_output=True
+                )
+            self._git(
+                mirror,
+                "fetch",
+                "--quiet",
+                "--no-tags",
+                self.github.clone_url(job.repo),
+                f"+refs/heads/{job.base_ref}:{base}",
+                f"+refs/pull/{job.pr_number}/head:refs/pull/{job.pr_number}/head",
+                auth=True,
+            )
+        try:
+            self._git(mirror, "cat-file", "-e", f"{job.head_sha}^{{commit}}")
+        except GitError:
+            # The PR head already moved on; a newer job will review it
+            raise JobCancelledError(f"{job.repo}#{job.pr_number}: {job.head_sha[:7]} not found")
+        return self._git(mirror, "diff", f"{base}...{job.head_sha}")
+
+
+def verify_signature(secret: str, body: bytes, signature: str | None) -> bool:
+    """Check a GitHub ``X-Hub-Signature-256`` header."""
+    if not signature:
+        return False
+    expected = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def parse_pull_request_event(
+    payload: dict[str, Any], server_url: str | None = None
+) -> dict[str, Any] | None:
+    """Extract the job fields from a ``pull_request`` event, or None to ignore it.
+
+    Args:
+        payload: The event.
+        server_url: GitHub web root the service fetches from; events for a
+            repository hosted elsewhere are rejected.
+
+    Raises:
+        ValueError: If the event is malformed or names a repository on another host.
+    """
+    if payload.get("action") not in REVIEW_ACTIONS:
+        return None
+    pr = payload["pull_request"]
+    repo = payload["repository"]
+    if server_url:
+        for key in ("html_url", "clone_url"):
+            url = repo.get(key)
+            if url and urlsplit(url).netloc != urlsplit(server_url).netloc:
+                raise ValueError(f"repository {key} {url!r} is not on {server_url}")
+    head_sha = pr["head"]["sha"]
+    if not isinstance(head_sha, str) or not _SHA.match(head_sha):
+        raise ValueError(f"invalid head sha {head_sha!r}")
+    base_ref = pr["base"]["ref"]
+    if not isinstance(base_ref, str) or not base_ref or _BAD_REF.search(base_ref):
+        raise ValueError(f"invalid base ref {base_ref!r}")
+    pr_number = int(payload.get("number") or pr["number"])
+    if pr_number <= 0:
+        raise ValueError(f"invalid pull request number {pr_number}")
+    return {
+        "repo": validate_repo(repo["full_name"]),
+        "pr_number": pr_number,
+        "head_sha": head_sha,
+        "base_ref": base_ref,
+    }
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Accepts GitHub webhooks on ``POST /webhook``; ``GET /healthz`` reports queue counts."""
+
+    server: "WebhookServer"
+
+    def _reply(self, status: int, payload: dict[str, Any]) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path != "/healthz":
+            self._reply(404, {"error": "not found"})
+            return
+        self._reply(200, {"status": "ok", "jobs": self.server.queue.counts()})
+
+    def do_POST(self) -> None:  # noqa: N802
+        if self.path != "/webhook":
+            self._reply(404, {"error": "not found"})
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        secret = self.server.secret
+        if secret is not None and not verify_signature(
+            secret, body, self.headers.get("X-Hub-Signature-256")
+        ):
+            self._reply(401, {"error": "invalid signature"})
+            return
+
+        event = self.headers.get("X-GitHub-Event")
+        if event == "ping":
+            self._reply(200, {"status": "pong"})
+            return
+        if event != "pull_request":
+            self._reply(202, {"status": "ignored"})
+            return
+
+        try:
+            fields = parse_pull_request_event(json.loads(body), self.server.server_url)
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {"error": f"invalid pull_request payload: {e}"})
+            return
+        if fields is None:
+            self._reply(202, {"status": "ignored"})
+            return
+        job = self.server.queue.enqueue(**fields)
+        self._reply(202, {"status": "queued", "job": job.id})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class WebhookServer(ThreadingHTTPServer):
+    """HTTP server feeding webhook events into a JobQueue.
+
+    Args:
+        address: Address to listen on.
+        queue: Queue events are written to.
+        secret: Webhook secret deliveries must be signed with.
+        server_url: GitHub web root; events for other hosts are rejected.
+        insecure: Accept unsigned deliveries when there is no secret. Anyone
+            who can reach the server can then queue reviews and comments.
+        verbose: Log each request.
+
+    Raises:
+        ValueError: If there is no secret and ``insecure`` is not set.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        queue: JobQueue,
+        secret: str | None = None,
+        server_url: str | None = None,
+        insecure: bool = False,
+        verbose: bool = False,
+    ) -> None:
+        if not secret and not insecure:
+            raise ValueError("A webhook secret is required unless insecure=True")
+        super().__init__(address, WebhookHandler)
+        self.queue = queue
+        self.secret = secret or None
+        self.server_url = server_url
+        self.verbose = verbose
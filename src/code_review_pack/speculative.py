@@ -0,0 +1,301 @@
+"""Speculative pre-review of working-tree changes (``code-review-pack watch``).
+
+The watcher polls the files that differ from HEAD, waits for edits to settle,
+and reviews each changed file's diff in the background. Results are stored
+by a hash of the file's (filtered) diff, so a later ``review`` or
+``review --staged`` only sends files that changed since the last pass.
+
+Keys also cover the review context (overlay, checklists, model settings and
+diff filter rules), so editing the pack invalidates reviews made under the
+old one.
+
+Per-file diffs are taken against HEAD, which produces the same text as
+``git diff`` (nothing staged) and ``git diff --cached`` (fully staged), so
+cached results are found in both cases.
+"""
+
+import hashlib
+import os
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from code_review_pack.classify import FilterRules, classify_diff, split_file_diffs
+
+# Seconds between polls of the working tree
+POLL_INTERVAL = 1.0
+
+# Seconds the working tree must be unchanged before a speculative pass
+DEBOUNCE = 3.0
+
+# Cached reviews not used for this many days are removed
+CACHE_MAX_AGE_DAYS = 14
+
+# Niceness increment applied to the watch process
+WATCH_NICENESS = 10
+
+
+def context_key(*parts: object) -> str:
+    """Hash of everything besides the diff that shapes a review.
+
+    Pass the overlay, checklists, review settings and any filter settings;
+    dataclasses are hashed by their repr.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def cache_key(pack: str, model: str, file_diff: str, context: str = "") -> str:
+    """Content hash identifying a review of one file's diff under a context_key."""
+    digest = hashlib.sha256()
+    for part in (model, pack, context, file_diff):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ReviewCache:
+    """Reviews stored as ``<root>/<key>.md`` files."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def get(self, key: str) -> str | None:
+        path = self.root / f"{key}.md"
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        # Refresh mtime so entries in use are not pruned
+        path.touch()
+        return text
+
+    def put(self, key: str, review: str) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f"{key}.tmp"
+        tmp.write_text(review, encoding="utf-8")
+        # Atomic so a concurrent `review` never reads a partial file
+        tmp.replace(self.root / f"{key}.md")
+
+    def __contains__(self, key: str) -> bool:
+        return (self.root / f"{key}.md").exists()
+
+    def prune(self, max_age_days: int = CACHE_MAX_AGE_DAYS) -> int:
+        """Remove entries not used recently. Returns the number removed."""
+        if not self.root.exists():
+            return 0
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for path in self.root.glob("*.md"):
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+def default_cache(git_dir: Path) -> ReviewCache:
+    """The speculative review cache for a repository."""
+    return ReviewCache(git_dir / "code-review-pack" / "reviews")
+
+
+@dataclass
+class FileDiff:
+    """One file's filtered diff and its cache key."""
+
+    path: str
+    diff: str
+    key: str
+
+
+def _filtered_file_diffs(diff: str, rules: FilterRules | None) -> list[str]:
+    """Each file's diff after the diff filter; a summary line if it was summarized."""
+    return [
+        classify_diff(chunk, rules).diff
+        for chunk in split_file_diffs(diff)
+        if chunk.startswith("diff --git ")
+    ]
+
+
+def reviewable_file_diffs(
+    diff: str,
+    pack: str,
+    model: str,
+    rules: FilterRules | None = None,
+    context: str = "",
+) -> list[FileDiff]:
+    """Split a diff per file, filter each file, and key what is left to review.
+
+    Files that the diff filter summarizes entirely are dropped.
+    """
+    result = []
+    for filtered in _filtered_file_diffs(diff, rules):
+        if not filtered.startswith("diff --git "):
+            continue
+        path = filtered.split("\n", 1)[0].rsplit(" b/", 1)[-1]
+        result.append(FileDiff(path, filtered, cache_key(pack, model, filtered, context)))
+    return result
+
+
+@dataclass
+class CacheSplit:
+    """A diff split into files with cached reviews and files still to review.
+
+    Attributes:
+        cached: ``(path, review)`` pairs found in the cache.
+        remaining: Filtered diff of the files still to review.
+        summaries: One-line summaries of files the diff filter summarized
+            entirely, to keep in the prompt next to ``remaining``.
+    """
+
+    cached: list[tuple[str, str]] = field(default_factory=list)
+    remaining: str = ""
+    summaries: str = ""
+
+
+def split_cached(
+    diff: str,
+    cache: ReviewCache,
+    pack: str,
+    model: str,
+    rules: FilterRules | None = None,
+    context: str = "",
+) -> CacheSplit:
+    """Separate files with a speculative review from those that must be sent live.
+
+    Args:
+        diff: The (unfiltered) diff being reviewed.
+        cache: Speculative review cache.
+        pack: Pack name, part of the cache key.
+        model: Model id, part of the cache key.
+        rules: Diff filter rules, applied per file as the watcher does.
+        context: context_key of the review context, part of the cache key.
+
+    Returns:
+        Reviews found in the cache, the filtered diff of all other files, and
+        the summaries of filtered-out files.
+    """
+    split = CacheSplit()
+    remaining = []
+    summaries = []
+    for filtered in _filtered_file_diffs(diff, rules):
+        if not filtered.startswith("diff --git "):
+            summaries.append(filtered)
+            continue
+        path = filtered.split("\n", 1)[0].rsplit(" b/", 1)[-1]
+        review = cache.get(cache_key(pack, model, filtered, context))
+        if review is None:
+            remaining.append(filtered)
+        else:
+            split.cached.append((path, review))
+    split.remaining = "".join(remaining)
+    split.summaries = "".join(summaries)
+    return split
+
+
+class Watcher:
+    """Polls the working tree and pre-reviews changed files once edits settle.
+
+    Args:
+        cache: Where finished reviews are stored.
+        pack: Pack name, part of the cache key.
+        model: Model id, part of the cache key.
+        get_diff: Returns the working tree diff against HEAD.
+        get_changed_files: Returns paths that differ from HEAD, relative to ``root``.
+        review: Reviews one file's diff and returns the review text.
+        rules: Diff filter rules.
+        debounce: Seconds without edits before a pass starts.
+        root: Repository root that changed paths are relative to.
+        context: context_key of the review context, part of the cache key.
+    """
+
+    def __init__(
+        self,
+        cache: ReviewCache,
+        pack: str,
+        model: str,
+        get_diff: Callable[[], str],
+        get_changed_files: Callable[[], list[str]],
+        review: Callable[[str], str],
+        rules: FilterRules | None = None,
+        debounce: float = DEBOUNCE,
+        root: Path = Path("."),
+        context: str = "",
+    ) -> None:
+        self.cache = cache
+        self.pack = pack
+        self.model = model
+        self.get_diff = get_diff
+        self.get_changed_files = get_changed_files
+        self.review = review
+        self.rules = rules
+        self.debounce = debounce
+        self.root = root
+        self.context = context
+        self._signature: tuple | None = None
+        self._changed_at = 0.0
+        self._reviewed_signature: tuple | None = None
+
+    def _snapshot(self) -> tuple:
+        """Cheap signature of the working tree: changed paths with mtime and size."""
+        entries = []
+        for path in sorted(self.get_changed_files()):
+            try:
+                stat = (self.root / path).stat()
+                entries.append((path, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                entries.append((path, 0, -1))
+        return tuple(entries)
+
+    def poll(self, now: float | None = None) -> bool:
+        """Check for edits; return True if a speculative pass is due."""
+        now = time.monotonic() if now is None else now
+        signature = self._snapshot()
+        if signature != self._signature:
+            self._signature = signature
+            self._changed_at = now
+            return False
+        settled = now - self._changed_at >= self.debounce
+        return settled and signature != self._reviewed_signature
+
+    def run_pass(self, on_review: Callable[[str, str], None] | None = None) -> int:
+        """Review every changed file without a cached review. Returns files reviewed.
+
+        ``on_review(path, status)`` is called for each file considered, with
+        status ``cached``, ``reviewed`` or ``skipped`` (the review raised
+        ValueError, e.g. the file's diff exceeds MAX_DIFF_SIZE).
+        """
+        reviewed = 0
+        file_diffs = reviewable_file_diffs(
+            self.get_diff(), self.pack, self.model, self.rules, self.context
+        )
+        for file_diff in file_diffs:
+            if file_diff.key in self.cache:
+                status = "cached"
+            else:
+                try:
+                    self.cache.put(file_diff.key, self.review(file_diff.diff))
+                    status = "reviewed"
+                    reviewed += 1
+                except ValueError:
+                    status = "skipped"
+            if on_review:
+                on_review(file_diff.path, status)
+        self.mark_reviewed()
+        return reviewed
+
+    def mark_reviewed(self) -> None:
+        """Don't start another pass until the working tree changes again."""
+        self._reviewed_signature = self._signature
+
+
+def lower_priority(increment: int = WATCH_NICENESS) -> None:
+    """Lower the current process priority where the platform supports it."""
+    if hasattr(os, "nice"):
+        try:
+            os.nice(increment)
+        except OSError:
+            pass
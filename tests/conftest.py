@@ -0,0 +1,31 @@
+"""Shared test fixtures."""
+
+import threading
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pytest
+
+from tests.helpers import FakeChatServer, GitRepo
+
+
+@pytest.fixture
+def chat_server() -> Iterator[FakeChatServer]:
+    server = FakeChatServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_git_repo() -> Callable[..., GitRepo]:
+    """Create a GitRepo at a given path (with an optional initial branch name)."""
+    return GitRepo
+
+
+@pytest.fixture
+def git_repo(tmp_path: Path, make_git_repo: Callable[..., GitRepo]) -> GitRepo:
+    """An empty git repository in ``tmp_path`` on branch ``main``."""
+    return make_git_repo(tmp_path)
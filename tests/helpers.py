@@ -0,0 +1,105 @@
+"""Test doubles and helpers shared by the tests; fixtures in conftest.py build them."""
+
+import json
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+class FakeChatServer(ThreadingHTTPServer):
+    """Minimal OpenAI-compatible server returning canned responses.
+
+    Speaks HTTP/1.1 with keep-alive and counts the connections it accepts.
+    Set ``drop_connections`` to close each connection after one response
+    without announcing it, like a server timing out idle keep-alives.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), FakeChatHandler)
+        self.requests: list[dict] = []
+        self.failures = 0
+        self.connections = 0
+        self.drop_connections = False
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    server: FakeChatServer
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self) -> None:  # noqa: N802
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append({"path": self.path, "body": body, "headers": self.headers})
+        if self.server.failures:
+            self.server.failures -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        payload = json.dumps(
+            {
+                "model": "local-model",
+                "choices": [{"message": {"role": "assistant", "content": "Looks fine"}}],
+                "usage": {
+                    "prompt_tokens": 120,
+                    "completion_tokens": 30,
+                    "prompt_tokens_details": {"cached_tokens": 100},
+                },
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        if self.server.drop_connections:
+            self.close_connection = True
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+class GitRepo:
+    """A scratch git repository with a committer configured.
+
+    Args:
+        path: Directory to create the repository in; created if missing.
+        branch: Name of the initial branch.
+    """
+
+    def __init__(self, path: Path, branch: str = "main") -> None:
+        self.path = path
+        path.mkdir(parents=True, exist_ok=True)
+        self.git("init", "-q", "-b", branch)
+        self.git("config", "user.email", "test@example.com")
+        self.git("config", "user.name", "Test")
+
+    def git(self, *args: str) -> str:
+        """Run git in the repository and return its stripped stdout."""
+        return subprocess.run(
+            ["git", *args], cwd=self.path, check=True, capture_output=True, text=True
+        ).stdout.strip()
+
+    def write(self, name: str, content: str | bytes) -> Path:
+        """Write a file in the working tree."""
+        path = self.path / name
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_text(content, encoding="utf-8")
+        return path
+
+    def commit(self, message: str, files: dict[str, str | bytes] | None = None) -> str:
+        """Write ``files``, commit all changes and return the new commit's sha."""
+        for name, content in (files or {}).items():
+            self.write(name, content)
+        self.git("add", "-A")
+        self.git("commit", "-q", "-m", message)
+        return self.git("rev-parse", "HEAD")
@@ -0,0 +1,218 @@
+"""Tests for the backends module."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from code_review_pack.backends import (
+    AnthropicBackend,
+    AsyncAnthropicBackend,
+    AsyncOpenAICompatibleBackend,
+    BackendError,
+    OpenAICompatibleBackend,
+    ReviewSettings,
+    get_async_backend,
+    get_backend,
+)
+from tests.helpers import FakeChatServer
+
+
+class TestReviewSettings:
+    """Tests for ReviewSettings."""
+
+    def test_defaults(self) -> None:
+        """Should default to the hosted Claude API."""
+        settings = ReviewSettings.from_config(None)
+        assert settings.ai_provider == "anthropic"
+        assert settings.max_tokens == 8192
+        assert settings.temperature is None
+
+    def test_from_pack_settings(self) -> None:
+        """Should read the pack.yaml keys and ignore unknown ones."""
+        settings = ReviewSettings.from_config(
+            {"ai_provider": "anthropic", "model": "m", "temperature": 0.2, "extra": 1}
+        )
+        assert settings.model == "m"
+        assert settings.temperature == 0.2
+
+    def test_env_override(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Should let environment variables switch to a local server."""
+        monkeypatch.setenv("CODE_REVIEW_PACK_PROVIDER", "openai-compatible")
+        monkeypatch.setenv("CODE_REVIEW_PACK_BASE_URL", "http://localhost:8080/v1")
+        settings = ReviewSettings.from_config({"ai_provider": "anthropic"})
+        assert isinstance(get_backend(settings), OpenAICompatibleBackend)
+
+    def test_unknown_provider(self) -> None:
+        """Should reject unknown providers."""
+        with pytest.raises(ValueError, match="Unknown ai_provider"):
+            ReviewSettings.from_config({"ai_provider": "azure"})
+
+    def test_openai_compatible_requires_base_url(self) -> None:
+        """Should require base_url for the local server backend."""
+        with pytest.raises(ValueError, match="requires base_url"):
+            ReviewSettings.from_config({"ai_provider": "openai-compatible"})
+
+
+class TestAnthropicBackend:
+    """Tests for AnthropicBackend."""
+
+    def test_complete(self) -> None:
+        """Should pass settings through and report usage."""
+        message = MagicMock()
+        message.content = [MagicMock(text="LGTM")]
+        message.usage = MagicMock(input_tokens=10, output_tokens=5, cache_read_input_tokens=4)
+        client = MagicMock()
+        client.messages.create.return_value = message
+
+        settings = ReviewSettings(model="m", max_tokens=100, temperature=0.2)
+        completion = AnthropicBackend(settings, client=client).complete("prompt")
+
+        kwargs = client.messages.create.call_args.kwargs
+        assert kwargs["model"] == "m"
+        assert kwargs["max_tokens"] == 100
+        assert kwargs["temperature"] == 0.2
+        assert (completion.text, completion.tokens_in, completion.tokens_cached) == ("LGTM", 10, 4)
+
+
+class TestOpenAICompatibleBackend:
+    """Tests for OpenAICompatibleBackend against a local fake server."""
+
+    def test_complete(self, chat_server: FakeChatServer, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Should post a chat completion and report usage in the common shape."""
+        monkeypatch.setenv("LOCAL_KEY", "secret")
+        settings = ReviewSettings(
+            ai_provider="openai-compatible",
+            model="local-model",
+            base_url=chat_server.base_url,
+            api_key_env="LOCAL_KEY",
+            temperature=0.0,
+        )
+        completion = OpenAICompatibleBackend(settings).complete("Review this")
+
+        (request,) = chat_server.requests
+        assert request["path"] == "/v1/chat/completions"
+        assert request["body"]["messages"] == [{"role": "user", "content": "Review this"}]
+        assert request["body"]["temperature"] == 0.0
+        assert request["headers"]["Authorization"] == "Bearer secret"
+        assert completion.text == "Looks fine"
+        assert (completion.tokens_in, completion.tokens_out, completion.tokens_cached) == (
+            120,
+            30,
+            100,
+        )
+        assert completion.retries == 0
+        assert completion.latency_ms > 0
+
+    def test_retries_server_errors(self, chat_server: FakeChatServer) -> None:
+        """Should retry 5xx responses and count the retries."""
+        chat_server.failures = 1
+        settings = ReviewSettings(ai_provider="openai-compatible", base_url=chat_server.base_url)
+        with patch("code_review_pack.backends.time.sleep"):
+            completion = OpenAICompatibleBackend(settings).complete("prompt")
+        assert completion.retries == 1
+
+    def test_unreachable_server(self) -> None:
+        """Should raise BackendError when the server cannot be reached."""
+        settings = ReviewSettings(
+            ai_provider="openai-compatible", base_url="http://127.0.0.1:9/v1", timeout=1.0
+        )
+        with patch("code_review_pack.backends.time.sleep"):
+            with pytest.raises(BackendError, match="Could not reach"):
+                OpenAICompatibleBackend(settings).complete("prompt")
+
+
+class TestAsyncAnthropicBackend:
+    """Tests for AsyncAnthropicBackend."""
+
+    def test_complete(self) -> None:
+        """Should await the async client and report usage."""
+        message = MagicMock()
+        message.content = [MagicMock(text="LGTM")]
+        message.usage = MagicMock(input_tokens=10, output_tokens=5, cache_read_input_tokens=None)
+        client = MagicMock()
+        client.messages.create = AsyncMock(return_value=message)
+
+        settings = ReviewSettings(model="m")
+        completion = asyncio.run(AsyncAnthropicBackend(settings, client=client).complete("prompt"))
+
+        assert client.messages.create.call_args.kwargs["model"] == "m"
+        assert (completion.text, completion.tokens_in, completion.tokens_cached) == ("LGTM", 10, 0)
+
+
+class TestAsyncOpenAICompatibleBackend:
+    """Tests for AsyncOpenAICompatibleBackend against a local fake server."""
+
+    def test_concurrent_requests_share_connections(self, chat_server: FakeChatServer) -> None:
+        """Should serve many concurrent reviews over a few pooled connections."""
+        settings = ReviewSettings(ai_provider="openai-compatible", base_url=chat_server.base_url)
+
+        async def run() -> list:
+            backend = AsyncOpenAICompatibleBackend(settings, max_connections=2)
+            try:
+                first = await asyncio.gather(*(backend.complete(f"p{i}") for i in range(8)))
+                second = await asyncio.gather(*(backend.complete(f"q{i}") for i in range(8)))
+                return first + second
+            finally:
+                await backend.aclose()
+
+        completions = asyncio.run(run())
+
+        assert [c.text for c in completions] == ["Looks fine"] * 16
+        assert completions[0].tokens_cached == 100
+        assert len(chat_server.requests) == 16
+        assert chat_server.requests[0]["path"] == "/v1/chat/completions"
+        assert chat_server.connections == 2
+
+    def test_reused_across_event_loops(self, chat_server: FakeChatServer) -> None:
+        """Should keep working when each review runs in its own asyncio.run."""
+        settings = ReviewSettings(ai_provider="openai-compatible", base_url=chat_server.base_url)
+        backend = AsyncOpenAICompatibleBackend(settings)
+
+        async def run() -> str:
+            return (await backend.complete("prompt")).text
+
+        assert [asyncio.run(run()) for _ in range(3)] == ["Looks fine"] * 3
+        asyncio.run(backend.aclose())
+
+    def test_server_closing_kept_alive_connections(self, chat_server: FakeChatServer) -> None:
+        """Should recover when the server drops a connection between requests."""
+        chat_server.drop_connections = True
+        settings = ReviewSettings(ai_provider="openai-compatible", base_url=chat_server.base_url)
+
+        async def run() -> list:
+            backend = AsyncOpenAICompatibleBackend(settings, max_connections=1)
+            try:
+                return [await backend.complete(f"p{i}") for i in range(3)]
+            finally:
+                await backend.aclose()
+
+        with patch("code_review_pack.backends.asyncio.sleep", AsyncMock()):
+            completions = asyncio.run(run())
+        assert [c.text for c in completions] == ["Looks fine"] * 3
+        assert chat_server.connections == 3
+
+    def test_retries_server_errors(self, chat_server: FakeChatServer) -> None:
+        """Should retry 5xx responses and count the retries."""
+        chat_server.failures = 1
+        settings = ReviewSettings(ai_provider="openai-compatible", base_url=chat_server.base_url)
+
+        async def run():
+            backend = get_async_backend(settings)
+            try:
+                return await backend.complete("prompt")
+            finally:
+                await backend.aclose()
+
+        with patch("code_review_pack.backends.asyncio.sleep", AsyncMock()):
+            completion = asyncio.run(run())
+        assert completion.retries == 1
+
+    def test_unreachable_server(self) -> None:
+        """Should raise BackendError when the server cannot be reached."""
+        settings = ReviewSettings(
+            ai_provider="openai-compatible", base_url="http://127.0.0.1:9/v1", timeout=1.0
+        )
+        with patch("code_review_pack.backends.asyncio.sleep", AsyncMock()):
+            with pytest.raises(BackendError, match="Could not reach"):
+                asyncio.run(AsyncOpenAICompatibleBackend(settings).complete("prompt"))
@@ -0,0 +1,259 @@
+"""Tests for the classify module."""
+
+from pathlib import Path
+
+import pytest
+
+from code_review_pack.classify import (
+    BINARY,
+    GENERATED,
+    IGNORED,
+    LOCKFILE,
+    RENAME,
+    VENDORED,
+    WHITESPACE,
+    FilterRules,
+    classify_diff,
+    split_file_diffs,
+)
+from code_review_pack.reviewer import load_filter_rules
+
+APP_DIFF = """diff --git a/app/main.py b/app/main.py
+index 1111111..2222222 100644
+--- a/app/main.py
++++ b/app/main.py
+@@ -10,3 +10,3 @@ def handler():
+-    return None
++    return compute()
+"""
+
+LOCK_DIFF = """diff --git a/uv.lock b/uv.lock
+index 3333333..4444444 100644
+--- a/uv.lock
++++ b/uv.lock
+@@ -1,3 +1,3 @@
+-version = "1.0.0"
++version = "1.0.1"
+""" + "".join(f'+sha256 = "{i:064x}"\n' for i in range(200))
+
+BINARY_DIFF = """diff --git a/logo.png b/logo.png
+index 5555555..6666666 100644
+Binary files a/logo.png and b/logo.png differ
+"""
+
+RENAME_DIFF = """diff --git a/old_name.py b/new_name.py
+similarity index 100%
+rename from old_name.py
+rename to new_name.py
+"""
+
+VENDORED_DIFF = """diff --git a/third_party/lib/util.py b/third_party/lib/util.py
+index 7777777..8888888 100644
+--- a/third_party/lib/util.py
++++ b/third_party/lib/util.py
+@@ -1 +1 @@
+-x = 1
++x = 2
+"""
+
+GENERATED_DIFF = """diff --git a/api/client.py b/api/client.py
+new file mode 100644
+index 0000000..9999999
+--- /dev/null
++++ b/api/client.py
+@@ -0,0 +1,3 @@
++# Code generated by openapi-generator. DO NOT EDIT.
++class Client:
++    pass
+"""
+
+WHITESPACE_DIFF = """diff --git a/app/util.py b/app/util.py
+index aaaaaaa..bbbbbbb 100644
+--- a/app/util.py
++++ b/app/util.py
+@@ -1,2 +1,2 @@
+-def f(a,  b):\t
++def f(a, b):
+     pass
+@@ -20,2 +20,2 @@
+-    return 1
++    return 2
+"""
+
+
+class TestSplitFileDiffs:
+    """Tests for split_file_diffs function."""
+
+    def test_splits_per_file(self) -> None:
+        """Should produce one chunk per diff --git header."""
+        chunks = split_file_diffs(APP_DIFF + LOCK_DIFF + BINARY_DIFF)
+        assert len(chunks) == 3
+        assert chunks[0] == APP_DIFF
+
+    def test_empty_diff(self) -> None:
+        """Should return no chunks for an empty diff."""
+        assert split_file_diffs("") == []
+
+
+class TestClassifyDiff:
+    """Tests for classify_diff function."""
+
+    @pytest.mark.parametrize(
+        ("file_diff", "category"),
+        [
+            (LOCK_DIFF, LOCKFILE),
+            (BINARY_DIFF, BINARY),
+            (RENAME_DIFF, RENAME),
+            (VENDORED_DIFF, VENDORED),
+            (GENERATED_DIFF, GENERATED),
+        ],
+    )
+    def test_summarizes_category(self, file_diff: str, category: str) -> None:
+        """Should replace non-reviewable files with a one-line summary."""
+        result = classify_diff(APP_DIFF + file_diff)
+
+        assert result.diff.startswith(APP_DIFF)
+        summary_line = result.diff[len(APP_DIFF) :]
+        assert summary_line.count("\n") == 1
+        assert category in summary_line
+        assert [s.category for s in result.summaries] == [category]
+
+    def test_reviewable_diff_unchanged(self) -> None:
+        """Should pass ordinary code changes through untouched."""
+        result = classify_diff(APP_DIFF)
+        assert result.diff == APP_DIFF
+        assert result.summaries == []
+        assert result.report() == "Diff filter: nothing filtered"
+
+    def test_reports_bytes_and_tokens_avoided(self) -> None:
+        """Should report how much was removed from the prompt."""
+        result = classify_diff(APP_DIFF + LOCK_DIFF)
+
+        assert result.original_size == len(APP_DIFF + LOCK_DIFF)
+        assert result.bytes_avoided == result.original_size - len(result.diff)
+        assert result.tokens_avoided == result.bytes_avoided // 4
+        assert "1 lockfile" in result.report()
+
+    def test_drops_whitespace_only_hunks(self) -> None:
+        """Should drop whitespace-only hunks but keep the rest of the file."""
+        result = classify_diff(WHITESPACE_DIFF)
+
+        assert "def f(a, b)" not in result.diff
+        assert "+    return 2" in result.diff
+        assert "1 whitespace-only hunk(s) omitted" in result.diff
+        assert [s.category for s in result.summaries] == [WHITESPACE]
+
+    def test_reindented_python_is_reviewed(self) -> None:
+        """Should keep a hunk that moves code out of an indented block."""
+        diff = """diff --git a/app/admin.py b/app/admin.py
+--- a/app/admin.py
++++ b/app/admin.py
+@@ -1,2 +1,2 @@
+ if user.is_admin:
+-    delete_everything()
++delete_everything()
+"""
+        result = classify_diff(diff)
+        assert result.diff == diff
+        assert result.summaries == []
+
+    def test_whitespace_in_strings_is_reviewed(self) -> None:
+        """Should keep a hunk that changes whitespace inside a string literal."""
+        diff = """diff --git a/scripts/clean.sh b/scripts/clean.sh
+--- a/scripts/clean.sh
++++ b/scripts/clean.sh
+@@ -1 +1 @@
+-run "rm -rf / tmp"
++run "rm -rf /tmp"
+"""
+        result = classify_diff(diff)
+        assert result.diff == diff
+        assert result.summaries == []
+
+    def test_reindent_outside_python_is_whitespace(self) -> None:
+        """Should still drop re-indentation where indentation is not syntax."""
+        diff = """diff --git a/web/app.js b/web/app.js
+--- a/web/app.js
++++ b/web/app.js
+@@ -1 +1 @@
+-  return  "a  b";\t
++    return "a  b";
+"""
+        assert [s.category for s in classify_diff(diff).summaries] == [WHITESPACE]
+
+    def test_generated_marker_only_at_top_of_file(self) -> None:
+        """Should not treat a mid-file DO NOT EDIT comment as generated code."""
+        diff = APP_DIFF.replace("+    return compute()", "+    # DO NOT EDIT below")
+        assert classify_diff(diff).summaries == []
+
+    def test_generated_mention_in_docstring_is_reviewed(self) -> None:
+        """Should review a hand-written file whose docstring mentions generated code."""
+        diff = GENERATED_DIFF.replace(
+            "+# Code generated by openapi-generator. DO NOT EDIT.",
+            '+"""Thin wrapper around the autogenerated OpenAPI client."""',
+        ).replace("+    pass", "+    os.system(cmd)")
+        result = classify_diff(diff)
+        assert result.diff == diff
+        assert result.summaries == []
+
+    def test_generated_marker_after_code_is_reviewed(self) -> None:
+        """Should only honor markers in the leading comment block."""
+        diff = GENERATED_DIFF.replace(
+            "+# Code generated by openapi-generator. DO NOT EDIT.",
+            "+import os\n+# @generated",
+        ).replace("@@ -0,0 +1,3 @@", "@@ -0,0 +1,4 @@")
+        assert classify_diff(diff).summaries == []
+
+    def test_generated_marker_from_read_head(self) -> None:
+        """Should ask read_head for the top of the file when no hunk shows it."""
+        diff = APP_DIFF.replace("app/main.py", "app/schema.py")
+        heads = {"app/schema.py": "# Code generated by protoc. DO NOT EDIT.\nimport x\n"}
+        result = classify_diff(diff, read_head=heads.get)
+        assert [s.category for s in result.summaries] == [GENERATED]
+        assert classify_diff(APP_DIFF, read_head=heads.get).summaries == []
+
+    def test_ignore_patterns(self) -> None:
+        """Should summarize files matching configured ignore globs."""
+        rules = FilterRules(ignore=["app/*"])
+        result = classify_diff(APP_DIFF, rules)
+        assert [s.category for s in result.summaries] == [IGNORED]
+
+    def test_include_overrides_detection(self) -> None:
+        """Should review files matching include globs even if detected."""
+        rules = FilterRules(include=["uv.lock"])
+        result = classify_diff(LOCK_DIFF, rules)
+        assert result.diff == LOCK_DIFF
+
+    def test_disabled_category(self) -> None:
+        """Should not summarize categories that are not enabled."""
+        rules = FilterRules(categories=(BINARY,))
+        result = classify_diff(LOCK_DIFF + BINARY_DIFF, rules)
+        assert LOCK_DIFF in result.diff
+        assert [s.category for s in result.summaries] == [BINARY]
+
+
+class TestFilterRules:
+    """Tests for loading filter rules."""
+
+    def test_from_config_defaults(self) -> None:
+        """Should enable all categories when no config is given."""
+        rules = FilterRules.from_config(None)
+        assert LOCKFILE in rules.categories
+        assert rules.ignore == []
+
+    def test_from_config_unknown_category(self) -> None:
+        """Should reject unknown categories."""
+        with pytest.raises(ValueError, match="Unknown diff_filter categories"):
+            FilterRules.from_config({"categories": ["lockfiles"]})
+
+    def test_load_filter_rules_from_pack(self, tmp_path: Path) -> None:
+        """Should read the diff_filter block from pack.yaml."""
+        (tmp_path / "pack.yaml").write_text(
+            "pack:\n  diff_filter:\n    ignore: ['docs/*']\n", encoding="utf-8"
+        )
+        rules = load_filter_rules(tmp_path)
+        assert rules.ignore == ["docs/*"]
+
+    def test_load_filter_rules_missing_pack_yaml(self, tmp_path: Path) -> None:
+        """Should fall back to defaults without pack.yaml."""
+        assert load_filter_rules(tmp_path) == FilterRules()
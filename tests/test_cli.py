@@ -7,6 +7,7 @@ import pytest
 from click.testing import CliRunner
 
 from code_review_pack.cli import get_packs_dir, main
+from tests.helpers import GitRepo
 
 
 class TestGetPacksDir:
@@ -119,3 +120,70 @@ class TestCLICommands:
         result = runner.invoke(main, ["review", "--pack", "nonexistent-pack"])
         assert result.exit_code == 1
         assert "Pack not found" in result.output
+
+    def test_stats_without_ledger(self, tmp_path: Path) -> None:
+        """stats should explain when there is no ledger yet."""
+        runner = CliRunner()
+        result = runner.invoke(main, ["stats", "--ledger", str(tmp_path / "none.sqlite3")])
+        assert result.exit_code == 0
+        assert "No review ledger found" in result.output
+
+    def test_stats_table(self, tmp_path: Path) -> None:
+        """stats should aggregate recorded reviews by pack and model."""
+        from code_review_pack.ledger import ReviewRecord, append
+
+        path = tmp_path / "ledger.sqlite3"
+        append(ReviewRecord(source="cli", pack="demo", model="m1", tokens_in=4200), path)
+
+        runner = CliRunner()
+        result = runner.invoke(main, ["stats", "--ledger", str(path)])
+        assert result.exit_code == 0
+        assert "demo" in result.output
+        assert "4,200" in result.output
+
+    def test_stats_over_directory(self, tmp_path: Path) -> None:
+        """stats should aggregate every ledger in a directory, e.g. downloaded artifacts."""
+        from code_review_pack.ledger import ReviewRecord, append
+
+        for run in (1, 2):
+            record = ReviewRecord(source="action", pack="demo", model="m1", tokens_in=1000)
+            append(record, tmp_path / f"review-ledger-{run}" / "ledger.sqlite3")
+
+        result = CliRunner().invoke(main, ["stats", "--ledger", str(tmp_path)])
+        assert result.exit_code == 0
+        assert "2,000" in result.output
+
+    def test_review_without_changes_is_recorded(
+        self, git_repo: GitRepo, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """review should record an empty run in the ledger, as the Action does."""
+        from code_review_pack.ledger import connect
+
+        git_repo.commit("init", {"app.py": "x = 1\n"})
+        monkeypatch.chdir(git_repo.path)
+        path = tmp_path / "ledger.sqlite3"
+        monkeypatch.setenv("CODE_REVIEW_PACK_LEDGER", str(path))
+
+        result = CliRunner().invoke(main, ["review"])
+        assert result.exit_code == 0
+        assert "No changes to review" in result.output
+        conn = connect(path)
+        try:
+            rows = conn.execute("SELECT source, outcome FROM reviews").fetchall()
+        finally:
+            conn.close()
+        assert rows == [("cli", "empty")]
+
+    def test_watch_help(self) -> None:
+        """watch command should show help."""
+        runner = CliRunner()
+        result = runner.invoke(main, ["watch", "--help"])
+        assert result.exit_code == 0
+        assert "--debounce" in result.output
+
+    def test_serve_help(self) -> None:
+        """serve command should show help."""
+        runner = CliRunner()
+        result = runner.invoke(main, ["serve", "--help"])
+        assert result.exit_code == 0
+        assert "--per-repo" in result.output
@@ -0,0 +1,198 @@
+"""Tests for the clustering module."""
+
+from pathlib import Path
+
+import pytest
+
+from code_review_pack.classify import SUMMARY_PREFIX, FilterRules, classify_diff
+from code_review_pack.clustering import ClusterSettings, cluster_diff, normalize_hunk
+from code_review_pack.reviewer import load_cluster_settings
+
+
+def rename_hunk(i: int) -> str:
+    """A hunk from a mass rename of ``log`` to ``logger`` in module ``i``."""
+    return f"""diff --git a/pkg/mod{i}.py b/pkg/mod{i}.py
+index 1111111..2222222 100644
+--- a/pkg/mod{i}.py
++++ b/pkg/mod{i}.py
+@@ -{i + 10},3 +{i + 10},3 @@ def handler_{i}(request):
+     value_{i} = compute(request, {i})
+-    log.info("processed %s items in step {i}", value_{i})
++    logger.info("processed %s items in step {i}", value_{i})
+     return value_{i}
+"""
+
+
+def logging_hunk(i: int, verify: bool = True) -> str:
+    """A hunk moving module ``i`` from ``logging`` to ``logger``, optionally disabling TLS."""
+    call = "client.get(url)" if verify else "client.get(url, verify=False)"
+    return f"""diff --git a/pkg/svc{i}.py b/pkg/svc{i}.py
+--- a/pkg/svc{i}.py
++++ b/pkg/svc{i}.py
+@@ -{i + 20},4 +{i + 20},4 @@ def sync_{i}(client, url):
+-    logging.info("fetching %s for job {i}", url)
+-    response = client.get(url)
+-    logging.info("fetched %s bytes for job {i}", len(response.content))
++    logger.info("fetching %s for job {i}", url)
++    response = {call}
++    logger.info("fetched %s bytes for job {i}", len(response.content))
+     return response
+"""
+
+
+OUTLIER_DIFF = """diff --git a/app/auth.py b/app/auth.py
+index 3333333..4444444 100644
+--- a/app/auth.py
++++ b/app/auth.py
+@@ -5,2 +5,2 @@ def check(token):
+-    return token == SECRET
++    return hmac.compare_digest(token, SECRET)
+"""
+
+MASS_RENAME = "".join(rename_hunk(i) for i in range(20)) + OUTLIER_DIFF
+
+
+def constant_hunk(path: str, removed: str, added: str) -> str:
+    """A one-line edit of a module-level constant."""
+    return f"""diff --git a/{path} b/{path}
+--- a/{path}
++++ b/{path}
+@@ -3 +3 @@
+-{removed}
++{added}
+"""
+
+
+CONSTANT_EDITS = (
+    constant_hunk("app/http.py", "TIMEOUT = 30", "TIMEOUT = 0")
+    + constant_hunk("app/retry.py", "MAX_RETRIES = 3", "MAX_RETRIES = 3000")
+    + constant_hunk("billing/fees.py", "FEE_PERCENT = 2.5", "FEE_PERCENT = 250")
+    + constant_hunk("app/auth.py", 'SECRET = "hunter2"', 'SECRET = "changeme"')
+    + constant_hunk(
+        "app/db.py", 'DB_URL = "postgres://db/prod"', 'DB_URL = "postgres://db/test"'
+    )
+    + constant_hunk("app/meta.py", 'NAME = "billing"', 'NAME = "billing-v2"')
+)
+
+
+class TestNormalizeHunk:
+    """Tests for normalize_hunk."""
+
+    def test_abstracts_literals_and_shared_names(self) -> None:
+        """Should make hunks from different sites of the same change equal."""
+        first = rename_hunk(1).split("@@ -11")[1]
+        second = rename_hunk(7).split("@@ -17")[1]
+        assert normalize_hunk(first) == normalize_hunk(second)
+
+    def test_keeps_names_the_change_adds_or_removes(self) -> None:
+        """Should tell apart hunks that rename to different names."""
+        a = "@@ -1 +1 @@\n-    log.info(x)\n+    logger.info(x)\n"
+        b = "@@ -1 +1 @@\n-    log.info(x)\n+    audit.info(x)\n"
+        assert "logger" in normalize_hunk(a)
+        assert normalize_hunk(a) != normalize_hunk(b)
+
+    def test_keeps_literals_the_change_sets(self) -> None:
+        """Should keep values that differ between the removed and added side."""
+        tokens = normalize_hunk("@@ -1 +1 @@\n-TIMEOUT = 30\n+TIMEOUT = 0\n")
+        assert tokens == ["-", "ID", "=", "30", "+", "ID", "=", "0"]
+
+
+class TestClusterDiff:
+    """Tests for cluster_diff."""
+
+    def test_mass_rename_collapses_to_one_representative(self) -> None:
+        """Twenty copies of one change should be reviewed once, with the outlier kept."""
+        result = cluster_diff(MASS_RENAME)
+
+        assert len(result.clusters) == 1
+        cluster = result.clusters[0]
+        assert len(cluster.members) == 20
+        assert cluster.representative.location == "pkg/mod0.py:L10"
+        assert result.hunks_collapsed == 19
+
+        assert result.diff.count("+    logger.info") == 1
+        assert "hmac.compare_digest" in result.diff
+        assert "pkg/mod5.py" not in result.diff
+        assert f"{SUMMARY_PREFIX} cluster 1: the change above repeats at 19 other" in result.diff
+        assert len(result.diff) < len(MASS_RENAME) // 10
+
+    def test_member_with_extra_change_is_sent(self) -> None:
+        """Should review a similar hunk in full when it also changes something else."""
+        diff = "".join(logging_hunk(i, verify=i != 3) for i in range(7))
+        result = cluster_diff(diff)
+
+        assert "client.get(url, verify=False)" in result.diff
+        (cluster,) = result.clusters
+        assert "pkg/svc3.py:L23" not in {h.location for h in cluster.members}
+        assert "repeats at 5 other location(s)" in result.diff
+
+    def test_report_section_lists_every_location(self) -> None:
+        """Should list all locations a finding on the representative applies to."""
+        section = cluster_diff(MASS_RENAME).report_section()
+        assert section.startswith("## Repeated Changes")
+        for i in range(20):
+            assert f"`pkg/mod{i}.py:L{i + 10}`" in section
+        assert "app/auth.py" not in section
+
+    def test_dissimilar_hunks_untouched(self) -> None:
+        """Should return the diff unchanged when nothing repeats."""
+        diff = rename_hunk(1) + OUTLIER_DIFF
+        result = cluster_diff(diff)
+        assert result.diff == diff
+        assert result.clusters == []
+        assert result.report_section() == ""
+
+    def test_below_min_cluster_size(self) -> None:
+        """Should not collapse groups smaller than min_cluster_size."""
+        diff = rename_hunk(1) + rename_hunk(2)
+        assert cluster_diff(diff).diff == diff
+
+    def test_constant_edits_are_not_clustered(self) -> None:
+        """Unrelated edits of different constants should each be reviewed."""
+        result = cluster_diff(CONSTANT_EDITS)
+        assert result.clusters == []
+        assert result.diff == CONSTANT_EDITS
+        # Different values alone already keep them apart
+        assert cluster_diff(CONSTANT_EDITS, ClusterSettings(min_tokens=1)).clusters == []
+
+    def test_short_hunks_are_not_clustered(self) -> None:
+        """Should not cluster hunks below min_tokens, even identical ones."""
+        diff = "".join(
+            constant_hunk(f"app/mod{i}.py", "DEBUG = True", "DEBUG = False") for i in range(5)
+        )
+        assert cluster_diff(diff).clusters == []
+        assert len(cluster_diff(diff, ClusterSettings(min_tokens=6)).clusters) == 1
+
+    def test_disabled(self) -> None:
+        """Should leave the diff alone when disabled."""
+        result = cluster_diff(MASS_RENAME, ClusterSettings(enabled=False))
+        assert result.diff == MASS_RENAME
+
+    def test_keeps_diff_filter_summaries(self) -> None:
+        """Should preserve summary lines added by the diff filter."""
+        lock = (
+            "diff --git a/uv.lock b/uv.lock\n--- a/uv.lock\n+++ b/uv.lock\n"
+            '@@ -1 +1 @@\n-version = "1"\n+version = "2"\n'
+        )
+        filtered = classify_diff(MASS_RENAME + lock, FilterRules()).diff
+        result = cluster_diff(filtered)
+        assert f"{SUMMARY_PREFIX} uv.lock" in result.diff
+        assert len(result.clusters) == 1
+
+
+class TestClusterSettings:
+    """Tests for ClusterSettings."""
+
+    def test_rejects_bad_threshold(self) -> None:
+        """Should reject thresholds outside (0, 1]."""
+        with pytest.raises(ValueError, match="threshold"):
+            ClusterSettings.from_config({"threshold": 1.5})
+
+    def test_loads_from_pack(self, tmp_path: Path) -> None:
+        """Should read the hunk_clustering block of pack.yaml."""
+        (tmp_path / "pack.yaml").write_text(
+            "pack:\n  hunk_clustering:\n    min_cluster_size: 5\n", encoding="utf-8"
+        )
+        settings = load_cluster_settings(tmp_path)
+        assert settings.min_cluster_size == 5
+        assert settings.threshold == 0.8
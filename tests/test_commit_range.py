@@ -0,0 +1,244 @@
+"""Tests for the commit_range module."""
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from code_review_pack.cli import main
+from code_review_pack.commit_range import (
+    CACHED,
+    DUPLICATE,
+    EMPTY,
+    FAILED,
+    REVIEWED,
+    Commit,
+    default_commit_cache,
+    review_range,
+)
+from code_review_pack.reviewer import (
+    get_commit_diff,
+    get_git_dir,
+    get_patch_ids,
+    get_range_commits,
+    range_end,
+)
+from code_review_pack.speculative import context_key
+from tests.helpers import FakeChatServer, GitRepo
+
+PACK = "python-azure-ai-agent"
+MODEL = "test-model"
+FEATURE = "def feature():\n    return 42\n"
+
+
+@pytest.fixture
+def repo(git_repo: GitRepo, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """A release branch where a change is reverted, then reapplied."""
+    git_repo.commit("init", {"app.py": "def main():\n    return 1\n"})
+    git_repo.git("checkout", "-q", "-b", "release")
+    git_repo.commit("Add feature", {"feature.py": FEATURE})
+    git_repo.git("revert", "--no-edit", "HEAD")
+    git_repo.commit("Reapply feature", {"feature.py": FEATURE})
+    git_repo.git("commit", "-q", "--allow-empty", "-m", "Empty")
+    git_repo.commit("Change main", {"app.py": "def main():\n    return 2\n"})
+    monkeypatch.chdir(git_repo.path)
+    return git_repo.path
+
+
+def range_commits() -> list[Commit]:
+    return [Commit(sha, subject) for sha, subject in get_range_commits("main..release")]
+
+
+class TestGitHelpers:
+    """Tests for the range git helpers in reviewer."""
+
+    def test_commits_oldest_first(self, repo: Path) -> None:
+        """Should list the range's commits in order."""
+        subjects = [c.subject for c in range_commits()]
+        assert subjects == [
+            "Add feature",
+            'Revert "Add feature"',
+            "Reapply feature",
+            "Empty",
+            "Change main",
+        ]
+
+    def test_reapplied_change_has_same_patch_id(self, repo: Path) -> None:
+        """Should give a reapplied change the patch id of the original."""
+        add, revert, reapply, empty, change = range_commits()
+        patch_ids = get_patch_ids("main..release")
+        assert patch_ids[add.sha] == patch_ids[reapply.sha]
+        assert len({patch_ids[add.sha], patch_ids[revert.sha], patch_ids[change.sha]}) == 3
+        assert empty.sha not in patch_ids
+
+    def test_indentation_change_has_own_patch_id(
+        self, git_repo: GitRepo, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Should not match commits whose changes differ only in indentation."""
+        guarded = "if user.is_admin:\n    check()\n"
+        git_repo.commit("init", {"app.py": guarded})
+        git_repo.git("checkout", "-q", "-b", "release")
+        inside = git_repo.commit("Run for admins", {"app.py": guarded + "    run()\n"})
+        git_repo.git("revert", "--no-edit", "HEAD")
+        outside = git_repo.commit("Run for all", {"app.py": guarded + "run()\n"})
+        monkeypatch.chdir(git_repo.path)
+
+        patch_ids = get_patch_ids("main..release")
+        assert patch_ids[inside] != patch_ids[outside]
+
+    def test_range_end(self) -> None:
+        """Should name the revision a range diff ends at."""
+        assert range_end("main..release") == "release"
+        assert range_end("main...release") == "release"
+        assert range_end("main..") == "HEAD"
+        assert range_end("main") is None
+
+    def test_commit_diff(self, repo: Path) -> None:
+        """Should return the diff a commit introduces."""
+        change = range_commits()[-1]
+        assert "+    return 2" in get_commit_diff(change.sha)
+
+
+class TestReviewRange:
+    """Tests for review_range."""
+
+    def test_duplicates_reviewed_once(self, repo: Path) -> None:
+        """Should review each unique patch once and point duplicates at it."""
+        reviewed: list[str] = []
+
+        def review(commit: Commit) -> str:
+            reviewed.append(commit.subject)
+            return f"Review of {commit.subject}\nRecommendation: Approve"
+
+        commits = range_commits()
+        report = review_range(
+            "main..release",
+            commits,
+            get_patch_ids("main..release"),
+            review,
+            default_commit_cache(get_git_dir()),
+            PACK,
+            MODEL,
+        )
+
+        assert sorted(reviewed) == sorted(["Add feature", 'Revert "Add feature"', "Change main"])
+        statuses = [r.status for r in report.reviews]
+        assert statuses == [REVIEWED, REVIEWED, DUPLICATE, EMPTY, REVIEWED]
+        assert report.reviews[2].duplicate_of == commits[0]
+        assert report.reviews[0].verdict == "Approve"
+
+        rollup = report.rollup()
+        assert "5 commit(s): 3 reviewed, 1 duplicate, 1 empty" in rollup
+        assert f"| {commits[2].short} | Reapply feature | same patch as {commits[0].short} |" in rollup
+
+    def test_bounded_parallelism(self, repo: Path) -> None:
+        """Should run reviews concurrently, but never more than jobs at once."""
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def review(commit: Commit) -> str:
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.1)
+            with lock:
+                running -= 1
+            return "ok"
+
+        review_range(
+            "main..release",
+            range_commits(),
+            get_patch_ids("main..release"),
+            review,
+            default_commit_cache(get_git_dir()),
+            PACK,
+            MODEL,
+            jobs=2,
+        )
+        assert peak == 2
+
+    def test_resumes_after_interruption(self, repo: Path) -> None:
+        """Should only review what an earlier, interrupted run did not finish."""
+        cache = default_commit_cache(get_git_dir())
+        patch_ids = get_patch_ids("main..release")
+
+        def interrupted(commit: Commit) -> str:
+            if commit.subject == "Change main":
+                raise ConnectionError("network down")
+            return "ok"
+
+        first = review_range(
+            "main..release", range_commits(), patch_ids, interrupted, cache, PACK, MODEL
+        )
+        assert first.count(FAILED) == 1
+
+        reviewed: list[str] = []
+
+        def review(commit: Commit) -> str:
+            reviewed.append(commit.subject)
+            return "ok"
+
+        second = review_range(
+            "main..release", range_commits(), patch_ids, review, cache, PACK, MODEL
+        )
+        assert reviewed == ["Change main"]
+        assert second.count(CACHED) == 2
+        assert second.count(REVIEWED) == 1
+
+
+    def test_context_change_reviews_again(self, repo: Path) -> None:
+        """Should not reuse reviews made under another pack context."""
+        cache = default_commit_cache(get_git_dir())
+        patch_ids = get_patch_ids("main..release")
+        reviewed: list[str] = []
+
+        def review(commit: Commit) -> str:
+            reviewed.append(commit.subject)
+            return "ok"
+
+        for context in ("old overlay", "old overlay", "new overlay"):
+            review_range(
+                "main..release",
+                range_commits(),
+                patch_ids,
+                review,
+                cache,
+                PACK,
+                MODEL,
+                context=context_key(context),
+            )
+        assert len(reviewed) == 6
+
+
+class TestReviewRangeCommand:
+    """Tests for `review --range --per-commit`."""
+
+    def test_per_commit_report(
+        self, repo: Path, chat_server: FakeChatServer, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Should print a report per commit and a rollup, and resume on rerun."""
+        monkeypatch.setenv("CODE_REVIEW_PACK_LEDGER", "off")
+        monkeypatch.setenv("CODE_REVIEW_PACK_PROVIDER", "openai-compatible")
+        monkeypatch.setenv("CODE_REVIEW_PACK_BASE_URL", chat_server.base_url)
+        args = ["review", "--pack", PACK, "--range", "main..release", "--per-commit"]
+
+        result = CliRunner().invoke(main, args)
+        assert result.exit_code == 0, result.output
+        assert len(chat_server.requests) == 3
+        assert "# Range review: main..release" in result.output
+        assert "3 reviewed, 1 duplicate, 1 empty" in result.output
+
+        rerun = CliRunner().invoke(main, args)
+        assert rerun.exit_code == 0, rerun.output
+        assert len(chat_server.requests) == 3
+        assert "3 cached, 1 duplicate, 1 empty" in rerun.output
+
+    def test_per_commit_requires_range(self) -> None:
+        """Should refuse --per-commit without --range."""
+        result = CliRunner().invoke(main, ["review", "--per-commit"])
+        assert result.exit_code == 1
+        assert "--per-commit requires --range" in result.output
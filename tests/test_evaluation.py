@@ -0,0 +1,303 @@
+"""Tests for the evaluation module."""
+
+import json
+import re
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from code_review_pack.backends import Completion, ReviewBackend, ReviewSettings
+from code_review_pack.cli import get_packs_dir, main
+from code_review_pack.evaluation import (
+    ConfigResult,
+    Defect,
+    EvalCase,
+    EvalConfig,
+    RecordingBackend,
+    ReplayBackend,
+    StubBackend,
+    findings,
+    load_configs,
+    load_corpus,
+    run_config,
+)
+from code_review_pack.reviewer import build_prompt, load_checklists, load_pack_config
+from tests.helpers import FakeChatServer
+
+PACK = "python-azure-ai-agent"
+SQL_DIFF = """\
+diff --git a/src/storage/feedback.py b/src/storage/feedback.py
+--- a/src/storage/feedback.py
++++ b/src/storage/feedback.py
+@@ -1,1 +1,2 @@
++conn.execute(f"SELECT * FROM feedback WHERE user_id = '{user_id}'")
+"""
+SQL_DEFECT = Defect(
+    "sql-injection", "security", "src/storage/feedback.py", ["sql injection", "parameteri[sz]ed"]
+)
+SQL_FINDING = """\
+**Security** - `src/storage/feedback.py:L1`
+
+The f-string query allows SQL injection.
+
+**Suggestion:** Use bind parameters.
+"""
+
+
+def review(critical: str = "None", major: str = "None", positive: str = "") -> str:
+    """A review in the pack's output format."""
+    return (
+        "## Summary\n\nAdds feedback search to src/storage/feedback.py.\n\n"
+        f"## Findings\n\n### Critical\n\n{critical}\n\n### Major\n\n{major}\n\n"
+        "### Minor\n\nNone\n\n### Info\n\nNone\n\n"
+        "## Recommendation\n\nRequest Changes\n\n"
+        f"## Positive Observations\n\n{positive}\n"
+    )
+
+
+class ChecklistStubBackend:
+    """Finds the SQL injection only when the security checklist is in the prompt."""
+
+    def __init__(self) -> None:
+        self.settings = ReviewSettings(model="stub")
+        self.calls = 0
+
+    def complete(self, prompt: str) -> Completion:
+        self.calls += 1
+        if "## security\n" in prompt:
+            text = review(critical=SQL_FINDING)
+        else:
+            text = review()
+        return Completion(text, "stub", tokens_in=len(prompt) // 4, tokens_out=20, latency_ms=250.0)
+
+
+def pack_path() -> Path:
+    return get_packs_dir() / PACK
+
+
+class TestCorpus:
+    """Tests for the shipped corpus and configurations."""
+
+    def test_covers_every_dimension(self) -> None:
+        """Should seed at least one defect in each of the pack's dimensions."""
+        dimensions = load_pack_config(pack_path())["dimensions"]
+        cases = load_corpus(pack_path() / "evals", dimensions)
+        seeded = {d.dimension for case in cases for d in case.defects}
+        assert seeded == set(dimensions)
+
+    def test_configs_name_existing_checklists(self) -> None:
+        """Should only select checklists the pack ships."""
+        available = {p.stem for p in (pack_path() / "checklists").glob("*.md")}
+        configs = load_configs(pack_path() / "evals")
+        assert configs[0].name == "baseline"
+        for config in configs:
+            assert set(config.checklists or []) <= available
+
+    def test_patterns_do_not_match_dimension_names(self) -> None:
+        """Should not use patterns that a finding's dimension label alone satisfies."""
+        dimensions = load_pack_config(pack_path())["dimensions"]
+        labels = [*dimensions, *(d.replace("-", " ") for d in dimensions)]
+        for case in load_corpus(pack_path() / "evals"):
+            for defect in case.defects:
+                for pattern in defect.patterns:
+                    matched = [label for label in labels if re.search(pattern, label, re.I)]
+                    assert not matched, f"{case.name}: {pattern!r} matches {matched}"
+
+    def test_rejects_unknown_dimension(self, tmp_path: Path) -> None:
+        """Should reject a defect outside the pack's dimensions."""
+        (tmp_path / "cases").mkdir()
+        (tmp_path / "cases" / "bad.yaml").write_text(
+            "diff: x\ndefects:\n  - {id: a, dimension: style, path: a.py, patterns: [x]}\n"
+        )
+        with pytest.raises(ValueError, match="unknown dimension 'style'"):
+            load_corpus(tmp_path, ["correctness"])
+
+    def test_rejects_unknown_config_key(self) -> None:
+        """Should reject misspelled configuration keys."""
+        with pytest.raises(ValueError, match="checklist"):
+            EvalConfig.from_config("typo", {"checklist": ["security"]})
+
+
+class TestDefect:
+    """Tests for Defect.found_in."""
+
+    def test_requires_file_and_pattern(self) -> None:
+        """Should need both the file and a matching pattern in a finding."""
+        assert SQL_DEFECT.found_in(review(critical=SQL_FINDING))
+        assert not SQL_DEFECT.found_in(review(critical=SQL_FINDING.replace("feedback.py", "x.py")))
+        assert not SQL_DEFECT.found_in(review(critical=SQL_FINDING.replace("SQL injection", "bug")))
+
+    def test_dimension_label_alone_does_not_count(self) -> None:
+        """Should not count a finding on the right file and dimension about something else."""
+        (case,) = [c for c in load_corpus(pack_path() / "evals") if c.name.startswith("readab")]
+        finding = "**Readability** - `src/agents/routing.py:L4`\n\nAdd type hints to r()."
+        assert not case.defects[0].found_in(review(major=finding))
+
+    def test_ignores_text_outside_findings(self) -> None:
+        """Should not count praise or a summary that mention the file and a pattern."""
+        text = review(positive="- `feedback.py`: delete() uses a parameterized query.")
+        assert not SQL_DEFECT.found_in(text)
+        assert not SQL_DEFECT.found_in("feedback.py: SQL injection, use bind parameters.")
+
+    def test_file_and_pattern_in_one_finding(self) -> None:
+        """Should not combine the file of one finding with the pattern of another."""
+        text = review(
+            critical="**Security** - `src/api/chat.py:L3`\n\nSQL injection in the query.",
+            major="**Operations** - `src/storage/feedback.py:L9`\n\nErrors are swallowed.",
+        )
+        assert not SQL_DEFECT.found_in(text)
+
+    def test_splits_findings(self) -> None:
+        """Should keep suggestion and body lines with the finding they belong to."""
+        entries = [f for f in findings(review(critical=SQL_FINDING)) if "**Security**" in f]
+        assert len(entries) == 1
+        assert "**Suggestion:** Use bind parameters." in entries[0]
+
+
+class TestRunConfig:
+    """Tests for run_config."""
+
+    def run(self, config: EvalConfig, backend: ReviewBackend) -> ConfigResult:
+        case = EvalCase("sql", "", SQL_DIFF, [SQL_DEFECT])
+        return run_config(
+            [case],
+            config,
+            load_pack_config(pack_path()),
+            "",
+            load_checklists(pack_path(), config.checklists),
+            backend,
+        )
+
+    def test_recall_depends_on_checklists(self) -> None:
+        """Should score a configuration by the defects its reviews mention."""
+        backend = ChecklistStubBackend()
+        baseline = self.run(EvalConfig("baseline"), backend)
+        bare = self.run(EvalConfig("no-checklists", checklists=[]), backend)
+
+        assert baseline.recall() == 1.0
+        assert baseline.recall("security") == 1.0
+        assert baseline.recall("tests") is None
+        assert bare.recall() == 0.0
+        assert bare.tokens_in < baseline.tokens_in
+        assert baseline.model_ms_p50() == 250.0
+
+    def test_record_then_replay(self, tmp_path: Path) -> None:
+        """Should replay recorded responses, usage and latency without the model."""
+        backend = ChecklistStubBackend()
+        config = EvalConfig("baseline")
+        recorded = self.run(config, RecordingBackend(backend, tmp_path))
+        replayed = self.run(config, ReplayBackend(backend.settings, tmp_path))
+
+        assert backend.calls == 1
+        assert replayed.to_dict(["security"]) == {
+            **recorded.to_dict(["security"]),
+            "wall_ms": replayed.wall_ms,
+        }
+
+    def test_missing_recording_is_case_error(self, tmp_path: Path) -> None:
+        """Should report an unrecorded prompt as an error and leave it out of recall."""
+        result = self.run(EvalConfig("baseline"), ReplayBackend(ReviewSettings(), tmp_path))
+        assert result.errors == 1
+        assert "--mode record" in result.cases[0].error
+        assert result.cases[0].found == result.cases[0].missed == []
+        assert result.recall() is None
+
+
+class TestStubBackend:
+    """Tests for StubBackend."""
+
+    def test_reports_findings_in_the_diff(self) -> None:
+        """Should report pattern matches as findings at their new line numbers."""
+        completion = StubBackend(ReviewSettings()).complete(build_prompt(SQL_DIFF))
+        assert "`src/storage/feedback.py:L1`" in completion.text
+        assert SQL_DEFECT.found_in(completion.text)
+        assert completion.model == "stub"
+        assert completion.tokens_in > 0
+
+    def test_clean_diff(self) -> None:
+        """Should report no findings for a harmless change."""
+        diff = SQL_DIFF.replace('f"SELECT', '"SELECT')
+        text = StubBackend(ReviewSettings()).complete(build_prompt(diff)).text
+        assert [f for f in findings(text) if "feedback.py" in f] == []
+        assert "Approve" in text
+
+    def test_measures_only_diff_changes(self) -> None:
+        """Should not score configurations that only change the prompt around the diff."""
+        configs = load_configs(pack_path() / "evals")
+        measured = {c.name for c in configs if StubBackend.measures(c)}
+        assert measured == {"baseline", "truncated-diff"}
+
+    def test_finds_seeded_defects(self) -> None:
+        """Should find some of the shipped corpus's defects without a model."""
+        backend = StubBackend(ReviewSettings())
+        cases = load_corpus(pack_path() / "evals")
+        found = {
+            d.id
+            for case in cases
+            for d in case.defects
+            if d.found_in(backend.complete(build_prompt(case.diff)).text)
+        }
+        assert {"sql-injection", "blocking-requests-in-async", "unpinned-sdk"} <= found
+
+
+class TestEvalCommand:
+    """Tests for `code-review-pack eval`."""
+
+    def test_record_then_replay(
+        self, tmp_path: Path, chat_server: FakeChatServer, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Should record against a local server, then replay without it."""
+        monkeypatch.setenv("CODE_REVIEW_PACK_PROVIDER", "openai-compatible")
+        monkeypatch.setenv("CODE_REVIEW_PACK_BASE_URL", chat_server.base_url)
+        output = tmp_path / "results.json"
+        args = ["eval", "--pack", PACK, "--config", "baseline",
+                "--recordings", str(tmp_path / "rec"), "--output", str(output)]
+
+        recorded = CliRunner().invoke(main, [*args, "--mode", "record"])
+        assert recorded.exit_code == 0, recorded.output
+        cases = len(load_corpus(pack_path() / "evals"))
+        assert len(chat_server.requests) == cases
+
+        replayed = CliRunner().invoke(main, args)
+        assert replayed.exit_code == 0, replayed.output
+        assert len(chat_server.requests) == cases
+        assert "Seeded-defect recall" in replayed.output
+        (result,) = json.loads(output.read_text())
+        assert result["config"]["name"] == "baseline"
+        assert result["tokens_in"] == 120 * cases
+        assert result["recall"] == 0.0
+
+    def test_stub_runs_without_a_model(self, tmp_path: Path) -> None:
+        """Should score diff-shaping configurations offline and leave the rest unscored."""
+        output = tmp_path / "results.json"
+        result = CliRunner().invoke(
+            main,
+            ["eval", "--mode", "stub", "-c", "baseline", "-c", "no-checklists",
+             "-c", "short-output", "-c", "truncated-diff", "-o", str(output)],
+        )
+        assert result.exit_code == 0, result.output
+        assert "cannot measure" in result.output
+        recall = {r["config"]["name"]: r["recall"] for r in json.loads(output.read_text())}
+        assert recall["no-checklists"] is None
+        assert recall["short-output"] is None
+        assert recall["baseline"] > recall["truncated-diff"]
+
+    def test_errors_exit_nonzero(self, tmp_path: Path) -> None:
+        """Should exit with status 1 when a case could not be reviewed."""
+        output = tmp_path / "results.json"
+        result = CliRunner().invoke(
+            main,
+            ["eval", "--config", "baseline", "--mode", "replay",
+             "--recordings", str(tmp_path / "empty"), "-o", str(output)],
+        )
+        assert result.exit_code == 1
+        (scored,) = json.loads(output.read_text())
+        assert scored["errors"] == len(scored["cases"])
+        assert scored["recall"] is None
+
+    def test_unknown_config(self) -> None:
+        """Should refuse a configuration that is not in configs.yaml."""
+        result = CliRunner().invoke(main, ["eval", "--config", "nope"])
+        assert result.exit_code == 1
+        assert "Unknown eval config: nope" in result.output
@@ -0,0 +1,81 @@
+"""Tests for the gitobjects module."""
+
+import threading
+from pathlib import Path
+
+import pytest
+
+from code_review_pack.gitobjects import GitError, GitObjectReader
+from tests.helpers import GitRepo
+
+
+@pytest.fixture
+def repo(git_repo: GitRepo) -> Path:
+    """A git repository with a small and a large committed file."""
+    git_repo.commit(
+        "init",
+        {"small.py": "print('hi')\n", "large file.txt": bytes(range(256)) * 1000},
+    )
+    return git_repo.path
+
+
+class TestGitObjectReader:
+    """Tests for GitObjectReader."""
+
+    def test_read_by_revision_and_blob_id(self, repo: Path, git_repo: GitRepo) -> None:
+        """Should read blobs by HEAD:path and by object id from one process."""
+        blob_id = git_repo.git("rev-parse", "HEAD:small.py")
+
+        with GitObjectReader(repo) as reader:
+            assert reader.read_text("HEAD:small.py") == "print('hi')\n"
+            assert reader.read(blob_id) == b"print('hi')\n"
+            assert reader.read("HEAD:large file.txt") == bytes(range(256)) * 1000
+            assert len(reader._procs) == 1
+
+    def test_missing_object(self, repo: Path) -> None:
+        """Should raise GitError for missing objects and keep working after."""
+        with GitObjectReader(repo) as reader:
+            with pytest.raises(GitError, match="missing"):
+                reader.read("HEAD:no such file.py")
+            assert reader.read_text("HEAD:small.py") == "print('hi')\n"
+
+    def test_stream(self, repo: Path) -> None:
+        """Should stream large blobs in bounded chunks."""
+        with GitObjectReader(repo) as reader:
+            chunks = [bytes(c) for c in reader.stream("HEAD:large file.txt", chunk_size=4096)]
+            assert max(len(c) for c in chunks) <= 4096
+            assert b"".join(chunks) == bytes(range(256)) * 1000
+
+    def test_partially_consumed_stream(self, repo: Path) -> None:
+        """Should drain an abandoned stream so the next read is aligned."""
+        with GitObjectReader(repo) as reader:
+            stream = reader.stream("HEAD:large file.txt", chunk_size=1024)
+            next(stream)
+            stream.close()
+            assert reader.read_text("HEAD:small.py") == "print('hi')\n"
+
+    def test_not_a_repository(self, tmp_path: Path) -> None:
+        """Should raise GitError when git cannot start."""
+        with GitObjectReader(tmp_path) as reader:
+            with pytest.raises(GitError, match="git cat-file --batch failed"):
+                reader.read("HEAD:anything")
+
+    def test_open_stream_does_not_block_other_threads(self, repo: Path) -> None:
+        """Should serve other threads while a stream is left open."""
+        with GitObjectReader(repo) as reader:
+            stream = reader.stream("HEAD:large file.txt", chunk_size=1024)
+            next(stream)
+            result: list[str] = []
+            thread = threading.Thread(target=lambda: result.append(reader.read_text("HEAD:small.py")))
+            thread.start()
+            thread.join(timeout=10)
+            assert result == ["print('hi')\n"]
+            stream.close()
+
+    def test_head_reader(self, repo: Path) -> None:
+        """Should read the top of files at a revision and None for missing ones."""
+        with GitObjectReader(repo) as reader:
+            read_head = reader.head_reader("HEAD")
+            assert read_head("small.py") == "print('hi')\n"
+            assert read_head("deleted.py") is None
+            assert len(reader.read_head("HEAD:large file.txt", size=100)) == 100
@@ -0,0 +1,156 @@
+"""Tests for the ledger module."""
+
+import time
+from pathlib import Path
+
+import pytest
+
+from code_review_pack import ledger
+from code_review_pack.ledger import ReviewRecord
+
+
+def make_record(**overrides) -> ReviewRecord:
+    fields = {
+        "source": "cli",
+        "repo": "demo",
+        "pack": "python-azure-ai-agent",
+        "model": "claude-opus-4-5-20250514",
+        "tokens_in": 1000,
+        "tokens_out": 200,
+        "timings": {"diff": 10.0, "model": 990.0},
+    }
+    fields.update(overrides)
+    return ReviewRecord(**fields)
+
+
+class TestReviewRecord:
+    """Tests for ReviewRecord."""
+
+    def test_phase_accumulates_timings(self) -> None:
+        """Should add elapsed milliseconds to the named phase."""
+        record = ReviewRecord(source="cli")
+        with record.phase("model"):
+            pass
+        with record.phase("model"):
+            pass
+        assert set(record.timings) == {"model"}
+        assert record.duration_ms == record.timings["model"]
+
+
+class TestAppend:
+    """Tests for appending records."""
+
+    def test_round_trip(self, tmp_path: Path) -> None:
+        """Should store one row per appended record."""
+        path = tmp_path / "ledger.sqlite3"
+        ledger.append(make_record(), path)
+        ledger.append(make_record(outcome="too_large"), path)
+
+        conn = ledger.connect(path)
+        rows = conn.execute("SELECT outcome, duration_ms, timings FROM reviews").fetchall()
+        conn.close()
+
+        assert [r[0] for r in rows] == ["ok", "too_large"]
+        assert rows[0][1] == 1000.0
+        assert '"model": 990.0' in rows[0][2]
+
+    def test_disabled_by_env(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Should not write anything when the ledger is turned off."""
+        monkeypatch.setenv(ledger.LEDGER_ENV, "off")
+        monkeypatch.setenv("HOME", str(tmp_path))
+        ledger.append(make_record())
+        assert ledger.default_ledger_path() is None
+        assert not any(tmp_path.rglob("*.sqlite3"))
+
+    def test_write_failure_is_not_fatal(
+        self, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Should warn instead of raising when the database cannot be written."""
+        blocker = tmp_path / "file"
+        blocker.write_text("", encoding="utf-8")
+        ledger.append(make_record(), blocker / "ledger.sqlite3")
+        assert "could not write review ledger" in capsys.readouterr().err
+
+    def test_compact_removes_expired_rows(self, tmp_path: Path) -> None:
+        """Should delete records older than the retention window."""
+        path = tmp_path / "ledger.sqlite3"
+        ledger.append(make_record(created_at=time.time() - 400 * 86400), path)
+        ledger.append(make_record(), path)
+
+        conn = ledger.connect(path)
+        assert ledger.compact(conn) == 1
+        assert conn.execute("SELECT COUNT(*) FROM reviews").fetchone()[0] == 1
+        conn.close()
+
+
+class TestStats:
+    """Tests for ledger aggregation."""
+
+    def test_percentiles_and_totals(self, tmp_path: Path) -> None:
+        """Should aggregate successful latencies and all token usage."""
+        path = tmp_path / "ledger.sqlite3"
+        for ms in range(1, 21):
+            ledger.append(make_record(timings={"model": ms * 100.0}), path)
+        ledger.append(make_record(outcome="error:APIError", tokens_in=0, tokens_out=0), path)
+
+        conn = ledger.connect(path)
+        (row,) = ledger.stats(conn, by=("pack",))
+        conn.close()
+
+        assert row.group == ("python-azure-ai-agent",)
+        assert row.runs == 21
+        assert row.failures == 1
+        assert row.p50_ms == 1000.0
+        assert row.p95_ms == 1900.0
+        assert row.tokens_in == 20_000
+        assert row.tokens_out == 4_000
+
+    def test_group_by_model_and_since(self, tmp_path: Path) -> None:
+        """Should group by several keys and honour the time window."""
+        path = tmp_path / "ledger.sqlite3"
+        ledger.append(make_record(model="a"), path)
+        ledger.append(make_record(model="b"), path)
+        ledger.append(make_record(model="b", created_at=time.time() - 10 * 86400), path)
+
+        conn = ledger.connect(path)
+        rows = ledger.stats(conn, by=("pack", "model"), since=ledger.parse_since("7d"))
+        conn.close()
+
+        assert [(r.group[1], r.runs) for r in rows] == [("a", 1), ("b", 1)]
+
+    def test_combine_ledgers(self, tmp_path: Path) -> None:
+        """Should aggregate records from several ledger files together."""
+        paths = [tmp_path / f"run{i}.sqlite3" for i in range(3)]
+        for path in paths:
+            ledger.append(make_record(), path)
+
+        conn = ledger.combine(paths)
+        (row,) = ledger.stats(conn, by=("pack",))
+        conn.close()
+
+        assert row.runs == 3
+        assert row.tokens_in == 3_000
+
+    def test_unknown_group_key(self, tmp_path: Path) -> None:
+        """Should reject unknown group keys."""
+        conn = ledger.connect(tmp_path / "ledger.sqlite3")
+        with pytest.raises(ValueError, match="Unknown group key"):
+            ledger.stats(conn, by=("colour",))
+        conn.close()
+
+
+class TestParseSince:
+    """Tests for parse_since function."""
+
+    def test_relative(self) -> None:
+        """Should subtract relative windows from now."""
+        assert abs(ledger.parse_since("2d") - (time.time() - 2 * 86400)) < 5
+
+    def test_iso_date(self) -> None:
+        """Should accept ISO dates as UTC."""
+        assert ledger.parse_since("1970-01-02") == 86400
+
+    def test_invalid(self) -> None:
+        """Should raise ValueError for unparseable values."""
+        with pytest.raises(ValueError, match="Invalid --since"):
+            ledger.parse_since("last week")
@@ -1,5 +1,6 @@
 """Tests for the reviewer module."""
 
+import asyncio
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -8,12 +9,17 @@ import pytest
 from code_review_pack.reviewer import (
     MAX_DIFF_SIZE,
     GitError,
+    ReviewSession,
     get_staged_diff,
+    get_staged_diff_async,
     get_working_diff,
+    get_working_diff_async,
     load_checklists,
     load_overlay,
     review_code,
+    review_code_async,
 )
+from tests.helpers import FakeChatServer, GitRepo
 
 
 class TestGitDiffFunctions:
@@ -156,3 +162,150 @@ class TestReviewCode:
             assert checklists in call_kwargs["messages"][0]["content"]
 
             assert result == "LGTM"
+
+    def test_review_code_fills_record(self) -> None:
+        """Should record model, token usage and retries in the ledger record."""
+        from anthropic import APIConnectionError
+
+        from code_review_pack.ledger import ReviewRecord
+
+        mock_message = MagicMock()
+        mock_message.content = [MagicMock(text="LGTM")]
+        mock_message.usage = MagicMock(
+            input_tokens=1200, output_tokens=300, cache_read_input_tokens=None
+        )
+
+        mock_client = MagicMock()
+        mock_client.messages.create.side_effect = [
+            APIConnectionError(request=MagicMock()),
+            mock_message,
+        ]
+
+        record = ReviewRecord(source="test")
+        with patch("code_review_pack.reviewer.Anthropic", return_value=mock_client), patch(
+            "code_review_pack.backends.time.sleep"
+        ):
+            result = review_code("diff", record=record)
+
+        assert result == "LGTM"
+        assert record.model == "claude-opus-4-5-20250514"
+        assert record.tokens_in == 1200
+        assert record.tokens_out == 300
+        assert record.tokens_cached == 0
+        assert record.retries == 1
+        assert "model" in record.timings
+
+    def test_review_code_with_backend(self) -> None:
+        """Should use a given backend and record its usage."""
+        from code_review_pack.backends import Completion, ReviewSettings
+        from code_review_pack.ledger import ReviewRecord
+
+        backend = MagicMock()
+        backend.settings = ReviewSettings(model="local-model")
+        backend.complete.return_value = Completion(
+            text="Looks fine", model="local-model", tokens_in=50, tokens_out=10, retries=2
+        )
+
+        record = ReviewRecord(source="test")
+        result = review_code("diff --git a/x b/x", backend=backend, record=record)
+
+        assert result == "Looks fine"
+        assert "diff --git a/x b/x" in backend.complete.call_args.args[0]
+        assert (record.model, record.tokens_in, record.retries) == ("local-model", 50, 2)
+
+
+class TestReviewSession:
+    """Tests for ReviewSession and review_code_async."""
+
+    def test_reuses_client_across_reviews(self) -> None:
+        """Should build one client for all reviews in a session and close it."""
+        mock_message = MagicMock()
+        mock_message.content = [MagicMock(text="LGTM")]
+        mock_client = MagicMock()
+        mock_client.messages.create.return_value = mock_message
+
+        with patch("code_review_pack.reviewer.Anthropic", return_value=mock_client) as factory:
+            with ReviewSession() as session:
+                review_code("diff one", session=session)
+                review_code("diff two", session=session)
+
+        factory.assert_called_once_with(max_retries=0)
+        assert mock_client.messages.create.call_count == 2
+        mock_client.close.assert_called_once()
+
+    def test_review_code_async_fills_record(self) -> None:
+        """Should await the async backend and record its usage."""
+        from code_review_pack.backends import Completion, ReviewSettings
+        from code_review_pack.ledger import ReviewRecord
+
+        class StubBackend:
+            settings = ReviewSettings(model="local-model")
+
+            async def complete(self, prompt: str) -> Completion:
+                return Completion(text="Looks fine", model="local-model", tokens_in=50)
+
+        record = ReviewRecord(source="test")
+        result = asyncio.run(review_code_async("diff", backend=StubBackend(), record=record))
+
+        assert result == "Looks fine"
+        assert (record.model, record.tokens_in) == ("local-model", 50)
+        assert "model" in record.timings
+
+    def test_review_code_async_size_limit(self) -> None:
+        """Should reject oversized diffs before calling the model."""
+        with pytest.raises(ValueError, match="Diff too large"):
+            asyncio.run(review_code_async("x" * (MAX_DIFF_SIZE + 1)))
+
+    def test_concurrent_async_reviews_share_session(self, chat_server: FakeChatServer) -> None:
+        """Should run concurrent reviews over the session's pooled connections."""
+        from code_review_pack.backends import ReviewSettings
+
+        settings = ReviewSettings(ai_provider="openai-compatible", base_url=chat_server.base_url)
+
+        async def run() -> list[str]:
+            async with ReviewSession(settings) as session:
+                return await asyncio.gather(
+                    *(review_code_async(f"diff {i}", session=session) for i in range(12))
+                )
+
+        assert asyncio.run(run()) == ["Looks fine"] * 12
+        assert len(chat_server.requests) == 12
+        assert chat_server.connections <= 10
+
+    def test_sync_with_closes_async_backend(self, chat_server: FakeChatServer) -> None:
+        """A plain ``with`` around async reviews should still close the async client."""
+        from code_review_pack.backends import ReviewSettings
+
+        settings = ReviewSettings(ai_provider="openai-compatible", base_url=chat_server.base_url)
+
+        async def run() -> object:
+            with ReviewSession(settings) as session:
+                await session.review_async("diff")
+                client = session.async_backend.client
+            await asyncio.sleep(0.1)  # the close was scheduled on this loop
+            return client
+
+        assert asyncio.run(run()).is_closed
+
+
+class TestAsyncGitDiffFunctions:
+    """Tests for the async git diff helpers."""
+
+    def test_diffs_of_repository(self, git_repo: GitRepo) -> None:
+        """Should read working and staged diffs of the repository at cwd."""
+        git_repo.commit("init", {"a.py": "a = 1\n"})
+        git_repo.write("a.py", "a = 2\n")
+
+        async def run() -> tuple[str, str]:
+            return await asyncio.gather(
+                get_working_diff_async(git_repo.path), get_staged_diff_async(git_repo.path)
+            )
+
+        working, staged = asyncio.run(run())
+        assert "+a = 2" in working
+        assert staged == ""
+
+    def test_failure(self, tmp_path: Path) -> None:
+        """Should raise GitError outside a repository."""
+        with pytest.raises(GitError, match="git diff failed"):
+            asyncio.run(get_working_diff_async(tmp_path))
@@ -0,0 +1,343 @@
+"""Tests for the service module, end to end with a fake GitHub and model server."""
+
+import hashlib
+import hmac
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections.abc import Callable, Iterator
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+import pytest
+
+from code_review_pack.backends import Completion, ReviewSettings
+from code_review_pack.service import (
+    CANCELLED,
+    DONE,
+    QUEUED,
+    RUNNING,
+    SUPERSEDED,
+    GitHubClient,
+    JobQueue,
+    ReviewService,
+    WebhookServer,
+)
+from tests.helpers import FakeChatServer, GitRepo
+
+REPO = "octo/demo"
+PR = 7
+
+
+class FakeGitHub(HTTPServer):
+    """Records PR comments posted through the REST API."""
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), FakeGitHubHandler)
+        self.comments: list[tuple[str, str]] = []
+
+    @property
+    def api_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    server: FakeGitHub
+
+    def do_POST(self) -> None:  # noqa: N802
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.comments.append((self.path, body["body"]))
+        self.send_response(201)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def serve(server: HTTPServer) -> Iterator[HTTPServer]:
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def github() -> Iterator[FakeGitHub]:
+    yield from serve(FakeGitHub())
+
+
+@pytest.fixture(autouse=True)
+def no_ledger(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("CODE_REVIEW_PACK_LEDGER", "off")
+
+
+class Remote:
+    """A local repository standing in for the GitHub remote of a PR.
+
+    It lives at ``<server_url>/octo/demo.git``, where the service fetches it.
+    """
+
+    def __init__(self, root: Path, make_git_repo: Callable[..., GitRepo]) -> None:
+        self.server_url = root.as_uri()
+        self.repo = make_git_repo(root / f"{REPO}.git")
+        self.repo.commit("init", {"app.py": "def main():\n    return 1\n"})
+        self.repo.git("checkout", "-q", "-b", "feature")
+
+    def push(self, content: str) -> str:
+        """Commit to the PR branch and move refs/pull/<n>/head like GitHub does."""
+        sha = self.repo.commit("update", {"app.py": content})
+        self.repo.git("update-ref", f"refs/pull/{PR}/head", sha)
+        return sha
+
+
+@pytest.fixture
+def remote(tmp_path: Path, make_git_repo: Callable[..., GitRepo]) -> Remote:
+    return Remote(tmp_path / "github", make_git_repo)
+
+
+@pytest.fixture
+def queue(tmp_path: Path) -> Iterator[JobQueue]:
+    queue = JobQueue(tmp_path / "state" / "queue.sqlite3")
+    yield queue
+    queue.close()
+
+
+def make_service(
+    queue: JobQueue, tmp_path: Path, github: FakeGitHub, remote: Remote, **kwargs: object
+) -> ReviewService:
+    return ReviewService(
+        queue,
+        tmp_path / "state" / "mirrors",
+        GitHubClient(token=None, api_url=github.api_url, server_url=remote.server_url),
+        pack="python-azure-ai-agent",
+        **kwargs,
+    )
+
+
+def wait_idle(queue: JobQueue, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        counts = queue.counts()
+        if not counts.get(QUEUED) and not counts.get(RUNNING):
+            return
+        time.sleep(0.05)
+    raise AssertionError(f"queue did not drain: {queue.counts()}")
+
+
+def webhook_payload(remote: Remote, sha: str, action: str = "synchronize") -> dict:
+    return {
+        "action": action,
+        "number": PR,
+        "pull_request": {"number": PR, "head": {"sha": sha}, "base": {"ref": "main"}},
+        "repository": {
+            "full_name": REPO,
+            "html_url": f"{remote.server_url}/{REPO}",
+            "clone_url": f"{remote.server_url}/{REPO}.git",
+        },
+    }
+
+
+def deliver(server: WebhookServer, payload: dict, secret: str | None = None) -> int:
+    """POST a pull_request event, signed if ``secret`` is given; return the status."""
+    body = json.dumps(payload).encode()
+    headers = {"X-GitHub-Event": "pull_request", "Content-Type": "application/json"}
+    if secret is not None:
+        digest = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        headers["X-Hub-Signature-256"] = f"sha256={digest}"
+    req = urllib.request.Request(
+        f"http://127.0.0.1:{server.server_address[1]}/webhook",
+        data=body,
+        headers=headers,
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+@pytest.fixture
+def webhook_server(queue: JobQueue, remote: Remote) -> Iterator[WebhookServer]:
+    """A WebhookServer requiring the secret ``s3cret``."""
+    yield from serve(
+        WebhookServer(("127.0.0.1", 0), queue, secret="s3cret", server_url=remote.server_url)
+    )
+
+
+class TestJobQueue:
+    """Tests for JobQueue."""
+
+    def test_newer_push_supersedes_queued_jobs(self, queue: JobQueue) -> None:
+        """Should keep only the latest queued job per PR."""
+        first = queue.enqueue(REPO, PR, "a" * 40, "main")
+        queue.enqueue(REPO, PR, "b" * 40, "main")
+        assert queue.status(first.id) == SUPERSEDED
+        assert queue.counts() == {QUEUED: 1, SUPERSEDED: 1}
+
+    def test_redelivery_is_coalesced(self, queue: JobQueue) -> None:
+        """Should not queue the same head twice."""
+        first = queue.enqueue(REPO, PR, "a" * 40, "main")
+        again = queue.enqueue(REPO, PR, "a" * 40, "main")
+        assert again.id == first.id
+        assert queue.counts() == {QUEUED: 1}
+
+    def test_newer_push_cancels_running_job(self, queue: JobQueue) -> None:
+        """Should cancel the in-flight job for the same PR."""
+        queue.enqueue(REPO, PR, "a" * 40, "main")
+        running = queue.claim(max_per_repo=1)
+        queue.enqueue(REPO, PR, "b" * 40, "main")
+        assert queue.status(running.id) == CANCELLED
+        queue.finish(running, DONE)
+        assert queue.status(running.id) == CANCELLED
+
+    def test_per_repo_limit(self, queue: JobQueue) -> None:
+        """Should not run more than max_per_repo jobs of one repository at once."""
+        queue.enqueue(REPO, 1, "a" * 40, "main")
+        queue.enqueue(REPO, 2, "b" * 40, "main")
+        queue.enqueue("octo/other", 3, "c" * 40, "main")
+
+        first = queue.claim(max_per_repo=1)
+        second = queue.claim(max_per_repo=1)
+        assert (first.repo, second.repo) == (REPO, "octo/other")
+        assert queue.claim(max_per_repo=1) is None
+
+        queue.finish(first, DONE)
+        assert queue.claim(max_per_repo=1).pr_number == 2
+
+    def test_cancelled_job_holds_slot_until_finished(self, queue: JobQueue) -> None:
+        """Should not start a newer push's review while the cancelled one is still running."""
+        queue.enqueue(REPO, PR, "a" * 40, "main")
+        running = queue.claim(max_per_repo=1)
+        queue.enqueue(REPO, PR, "b" * 40, "main")
+        queue.enqueue(REPO, PR, "c" * 40, "main")
+        assert queue.status(running.id) == CANCELLED
+        assert queue.claim(max_per_repo=1) is None
+
+        queue.finish(running, CANCELLED)
+        assert queue.claim(max_per_repo=1).head_sha == "c" * 40
+
+    def test_running_jobs_recovered_on_restart(self, tmp_path: Path) -> None:
+        """Should requeue jobs left running by a previous process."""
+        path = tmp_path / "queue.sqlite3"
+        queue = JobQueue(path)
+        queue.enqueue(REPO, PR, "a" * 40, "main")
+        queue.claim(max_per_repo=1)
+        queue.close()
+
+        reopened = JobQueue(path)
+        assert reopened.counts() == {QUEUED: 1}
+        reopened.close()
+
+
+class TestReviewServiceEndToEnd:
+    """Webhook → queue → fetch → model → PR comment."""
+
+    def test_webhooks_reviewed_once_per_latest_push(
+        self,
+        tmp_path: Path,
+        remote: Remote,
+        queue: JobQueue,
+        github: FakeGitHub,
+        webhook_server: WebhookServer,
+        chat_server: FakeChatServer,
+    ) -> None:
+        """Three quick pushes should produce a single review of the last one."""
+        for content in ("return 2", "return 3", "return 4"):
+            sha = remote.push(f"def main():\n    {content}\n")
+            assert deliver(webhook_server, webhook_payload(remote, sha), "s3cret") == 202
+
+        settings = ReviewSettings(ai_provider="openai-compatible", base_url=chat_server.base_url)
+        service = make_service(queue, tmp_path, github, remote, settings=settings)
+        service.start()
+        wait_idle(queue)
+        service.stop()
+
+        assert queue.counts() == {DONE: 1, SUPERSEDED: 2}
+        assert len(chat_server.requests) == 1
+        prompt = chat_server.requests[0]["body"]["messages"][0]["content"]
+        assert "+    return 4" in prompt
+        assert github.comments == [
+            (f"/repos/{REPO}/issues/{PR}/comments", "## 🤖 AI Code Review\n\nLooks fine")
+        ]
+
+    def test_push_during_review_cancels_stale_result(
+        self, tmp_path: Path, remote: Remote, queue: JobQueue, github: FakeGitHub
+    ) -> None:
+        """A push that lands while the model is running should drop the old review."""
+        first_sha = remote.push("def main():\n    return 2\n")
+
+        class PushDuringReview:
+            settings = ReviewSettings(model="stub")
+            calls = 0
+
+            def complete(self, prompt: str) -> Completion:
+                PushDuringReview.calls += 1
+                if PushDuringReview.calls == 1:
+                    sha = remote.push("def main():\n    return 3\n")
+                    queue.enqueue(REPO, PR, sha, "main")
+                return Completion(text=f"review {PushDuringReview.calls}", model="stub")
+
+        queue.enqueue(REPO, PR, first_sha, "main")
+        service = make_service(queue, tmp_path, github, remote, backend=PushDuringReview())
+        service.process(queue.claim(max_per_repo=1))
+        service.process(queue.claim(max_per_repo=1))
+
+        assert queue.counts() == {CANCELLED: 1, DONE: 1}
+        assert [body for _, body in github.comments] == ["## 🤖 AI Code Review\n\nreview 2"]
+
+    def test_rejects_bad_signature(
+        self, remote: Remote, queue: JobQueue, webhook_server: WebhookServer
+    ) -> None:
+        """Should refuse deliveries that are unsigned or signed with another secret."""
+        payload = webhook_payload(remote, "a" * 40)
+        assert deliver(webhook_server, payload) == 401
+        assert deliver(webhook_server, payload, "guess") == 401
+        assert queue.counts() == {}
+
+    def test_rejects_foreign_host(
+        self, remote: Remote, queue: JobQueue, webhook_server: WebhookServer
+    ) -> None:
+        """Should refuse events for repositories that are not on the configured host."""
+        payload = webhook_payload(remote, "a" * 40)
+        payload["repository"]["clone_url"] = "https://attacker.example/octo/demo.git"
+        assert deliver(webhook_server, payload, "s3cret") == 400
+        payload = webhook_payload(remote, "a" * 40)
+        payload["repository"]["full_name"] = "../../elsewhere"
+        assert deliver(webhook_server, payload, "s3cret") == 400
+        assert queue.counts() == {}
+
+    def test_requires_secret(self, queue: JobQueue) -> None:
+        """Should not start without a secret unless explicitly insecure."""
+        with pytest.raises(ValueError, match="secret is required"):
+            WebhookServer(("127.0.0.1", 0), queue)
+        WebhookServer(("127.0.0.1", 0), queue, insecure=True).server_close()
+
+
+class TestGitHubClient:
+    """Tests for GitHubClient."""
+
+    def test_clone_url_uses_configured_host(self) -> None:
+        """Should fetch from the server that goes with the API root."""
+        assert GitHubClient(None).clone_url(REPO) == "https://github.com/octo/demo.git"
+        enterprise = GitHubClient(None, "https://ghe.example.com/api/v3")
+        assert enterprise.clone_url(REPO) == "https://ghe.example.com/octo/demo.git"
+
+    @pytest.mark.parametrize("repo", ["octo", "octo/demo/x", "../demo", "octo/..", "-x/demo"])
+    def test_clone_url_rejects_invalid_names(self, repo: str) -> None:
+        """Should only accept owner/name."""
+        with pytest.raises(ValueError, match="Invalid repository name"):
+            GitHubClient(None).clone_url(repo)
+
+    def test_token_not_on_command_line(self) -> None:
+        """Should pass the token in the environment, scoped to the GitHub host."""
+        env = GitHubClient("t0ken").git_env()
+        count = int(env["GIT_CONFIG_COUNT"])
+        key, value = env[f"GIT_CONFIG_KEY_{count - 1}"], env[f"GIT_CONFIG_VALUE_{count - 1}"]
+        assert key == "http.https://github.com/.extraHeader"
+        assert value.startswith("Authorization: Basic ")
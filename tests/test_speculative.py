@@ -0,0 +1,176 @@
+"""Tests for the speculative module."""
+
+from pathlib import Path
+
+import pytest
+
+from code_review_pack.reviewer import (
+    get_head_changed_files,
+    get_head_diff,
+    get_staged_diff,
+    get_working_diff,
+)
+from code_review_pack.speculative import (
+    ReviewCache,
+    Watcher,
+    cache_key,
+    context_key,
+    split_cached,
+)
+from tests.helpers import GitRepo
+
+PACK = "python-azure-ai-agent"
+MODEL = "test-model"
+
+
+@pytest.fixture
+def repo(git_repo: GitRepo, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """A git repository with two committed files."""
+    git_repo.commit("init", {"a.py": "a = 1\n", "b.py": "b = 1\n"})
+    monkeypatch.chdir(git_repo.path)
+    return git_repo.path
+
+
+def make_watcher(repo: Path, cache: ReviewCache, reviews: list[str]) -> Watcher:
+    def review(file_diff: str) -> str:
+        reviews.append(file_diff)
+        return f"review #{len(reviews)}"
+
+    return Watcher(
+        cache,
+        PACK,
+        MODEL,
+        get_diff=get_head_diff,
+        get_changed_files=get_head_changed_files,
+        review=review,
+        debounce=2.0,
+        root=repo,
+    )
+
+
+class TestReviewCache:
+    """Tests for ReviewCache."""
+
+    def test_put_get(self, tmp_path: Path) -> None:
+        """Should return stored reviews by key."""
+        cache = ReviewCache(tmp_path / "cache")
+        key = cache_key(PACK, MODEL, "diff")
+        assert cache.get(key) is None
+        cache.put(key, "LGTM")
+        assert key in cache
+        assert cache.get(key) == "LGTM"
+
+    def test_key_depends_on_model_and_pack(self) -> None:
+        """Should not share reviews across models or packs."""
+        assert cache_key(PACK, "m1", "diff") != cache_key(PACK, "m2", "diff")
+        assert cache_key("p1", MODEL, "diff") != cache_key("p2", MODEL, "diff")
+
+    def test_key_depends_on_context(self) -> None:
+        """Should not reuse reviews made with another overlay or checklist."""
+        before = context_key("overlay", "checklists")
+        after = context_key("overlay", "checklists, edited")
+        assert cache_key(PACK, MODEL, "diff", before) != cache_key(PACK, MODEL, "diff", after)
+
+
+class TestWatcher:
+    """Tests for the Watcher."""
+
+    def test_debounces_edits(self, repo: Path, tmp_path: Path) -> None:
+        """Should wait for the working tree to settle before a pass."""
+        watcher = make_watcher(repo, ReviewCache(tmp_path / "cache"), [])
+        (repo / "a.py").write_text("a = 2\n", encoding="utf-8")
+
+        assert not watcher.poll(now=0.0)  # first change seen
+        assert not watcher.poll(now=1.0)  # still within debounce
+        assert watcher.poll(now=2.5)
+        watcher.run_pass()
+        assert not watcher.poll(now=10.0)  # nothing new since the pass
+
+    def test_only_changed_files_are_reviewed(self, repo: Path, tmp_path: Path) -> None:
+        """Should not re-review files whose diff is already cached."""
+        reviews: list[str] = []
+        watcher = make_watcher(repo, ReviewCache(tmp_path / "cache"), reviews)
+
+        (repo / "a.py").write_text("a = 2\n", encoding="utf-8")
+        assert watcher.run_pass() == 1
+
+        (repo / "b.py").write_text("b = 2\n", encoding="utf-8")
+        statuses: list[tuple[str, str]] = []
+        assert watcher.run_pass(on_review=lambda p, s: statuses.append((p, s))) == 1
+        assert statuses == [("a.py", "cached"), ("b.py", "reviewed")]
+        assert len(reviews) == 2
+
+    def test_oversized_file_is_skipped(self, repo: Path, tmp_path: Path) -> None:
+        """Should skip files whose review raises ValueError and keep going."""
+        cache = ReviewCache(tmp_path / "cache")
+
+        def review(file_diff: str) -> str:
+            if "a.py" in file_diff:
+                raise ValueError("Diff too large")
+            return "ok"
+
+        watcher = make_watcher(repo, cache, [])
+        watcher.review = review
+        (repo / "a.py").write_text("a = 2\n", encoding="utf-8")
+        (repo / "b.py").write_text("b = 2\n", encoding="utf-8")
+
+        assert watcher.run_pass() == 1
+
+
+class TestSplitCached:
+    """Tests for split_cached function."""
+
+    def test_cached_for_working_and_staged_review(
+        self, repo: Path, git_repo: GitRepo, tmp_path: Path
+    ) -> None:
+        """Pre-reviews keyed on HEAD diffs should match both review modes."""
+        cache = ReviewCache(tmp_path / "cache")
+        watcher = make_watcher(repo, cache, [])
+        (repo / "a.py").write_text("a = 2\n", encoding="utf-8")
+        watcher.run_pass()
+
+        split = split_cached(get_working_diff(), cache, PACK, MODEL)
+        assert split.cached == [("a.py", "review #1")]
+        assert split.remaining == ""
+
+        git_repo.git("add", "a.py")
+        split = split_cached(get_staged_diff(), cache, PACK, MODEL)
+        assert split.cached == [("a.py", "review #1")]
+
+    def test_changed_since_pass_is_sent_live(self, repo: Path, tmp_path: Path) -> None:
+        """Files edited after the last pass should remain in the live diff."""
+        cache = ReviewCache(tmp_path / "cache")
+        watcher = make_watcher(repo, cache, [])
+        (repo / "a.py").write_text("a = 2\n", encoding="utf-8")
+        watcher.run_pass()
+        (repo / "a.py").write_text("a = 3\n", encoding="utf-8")
+        (repo / "b.py").write_text("b = 2\n", encoding="utf-8")
+
+        split = split_cached(get_working_diff(), cache, PACK, MODEL)
+        assert split.cached == []
+        assert "+a = 3" in split.remaining
+        assert "+b = 2" in split.remaining
+
+    def test_context_change_is_sent_live(self, repo: Path, tmp_path: Path) -> None:
+        """Files pre-reviewed under another pack context should be reviewed again."""
+        cache = ReviewCache(tmp_path / "cache")
+        watcher = make_watcher(repo, cache, [])
+        watcher.context = context_key("old overlay")
+        (repo / "a.py").write_text("a = 2\n", encoding="utf-8")
+        watcher.run_pass()
+
+        split = split_cached(get_working_diff(), cache, PACK, MODEL, context=context_key("new"))
+        assert split.cached == []
+        assert "+a = 2" in split.remaining
+
+    def test_keeps_filter_summaries(self, repo: Path, git_repo: GitRepo, tmp_path: Path) -> None:
+        """Should keep summaries of filtered files apart from the files to review."""
+        cache = ReviewCache(tmp_path / "cache")
+        git_repo.commit("lock", {"uv.lock": "version = 1\n"})
+        (repo / "uv.lock").write_text("version = 2\n", encoding="utf-8")
+        (repo / "a.py").write_text("a = 2\n", encoding="utf-8")
+
+        split = split_cached(get_working_diff(), cache, PACK, MODEL)
+        assert "uv.lock: lockfile omitted" in split.summaries
+        assert "uv.lock" not in split.remaining
+        assert "+a = 2" in split.remaining